@@ -3,18 +3,21 @@ import logging
 import os
 import datetime
 import traceback
-import boto3
-import google.generativeai as genai
 from decimal import Decimal
+from taskbot_core import clients, metrics, rate_limit
+from taskbot_core.auth import InitDataValidator
+from taskbot_core.secret_cache import SecretCache
+from taskbot_core.sessions import SessionCache
+from taskbot_core.tables import USER_INDEX_TABLE
 
-# Initialize AWS clients
-secrets_client = boto3.client('secretsmanager')
-dynamodb = boto3.resource('dynamodb')
-users_table = dynamodb.Table(os.environ.get('USERS_TABLE_NAME', 'telegram-bot-user-settings'))
+# Initialize AWS clients (built on first use)
+user_index_table = clients.lazy_table(USER_INDEX_TABLE)
+metrics_table = clients.lazy_table(metrics.METRICS_TABLE)
 
 # Environment variables
 GEMINI_KEY_SECRET = os.environ.get('GEMINI_KEY_SECRET', 'GEMINI_API_KEY')
 RATE_LIMIT_DAILY = int(os.environ.get('AI_RATE_LIMIT', '10'))
+RATE_LIMIT_PER_MINUTE = int(os.environ.get('AI_BURST_LIMIT', '3'))
 
 class JsonFormatter(logging.Formatter):
     """JSON log formatter for structured logging"""
@@ -41,86 +44,61 @@ handler = logging.StreamHandler()
 handler.setFormatter(JsonFormatter())
 logger.addHandler(handler)
 
-# Imports for validation
-import hashlib
-import hmac
-
 BOT_TOKEN_SECRET = os.environ.get('BOT_TOKEN_SECRET', 'telegram-bot-token')
 
-def get_bot_token() -> str:
-    """Get bot token from Secrets Manager"""
-    try:
-        response = secrets_client.get_secret_value(SecretId=BOT_TOKEN_SECRET)
-        return response['SecretString']
-    except Exception as e:
-        logger.error(f"Error getting bot token: {e}")
-        return ""
-
-def validate_telegram_auth(init_data: str) -> int:
-    """Validate Telegram WebApp initData and return user_id"""
-    try:
-        # Parse init_data
-        params = dict(p.split('=') for p in init_data.split('&') if '=' in p)
-
-        if 'hash' not in params:
-            return None
+# Warm containers reuse secrets, the derived HMAC key and the Gemini config
+secret_cache = SecretCache()
+sessions = SessionCache()
+auth = InitDataValidator(secret_cache, BOT_TOKEN_SECRET, sessions)
+_genai = None  # google.generativeai, imported on the first AI request
+_configured_api_key = None
 
-        received_hash = params.pop('hash')
-        data_check_string = '\\n'.join(
-            f"{k}={params[k]}" for k in sorted(params.keys())
-        )
 
-        bot_token = get_bot_token()
-        secret_key = hmac.new(b'WebAppData', bot_token.encode(), hashlib.sha256).digest()
-        calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
 
-        if calculated_hash == received_hash:
-            import urllib.parse
-            user_data = json.loads(urllib.parse.unquote(params.get('user', '{}')))
-            return user_data.get('id')
-        return None
-    except Exception as e:
-        logger.error(f"Auth validation error: {e}")
-        return None
+def validate_telegram_auth(init_data: str) -> int:
+    """Validate Telegram WebApp initData and return user_id"""
+    return auth.validate(init_data)
 
 def get_api_key():
-    """Retrieve API key from Secrets Manager"""
+    """Retrieve API key from Secrets Manager (cached)"""
     try:
-        response = secrets_client.get_secret_value(SecretId=GEMINI_KEY_SECRET)
-        return response['SecretString']
+        return secret_cache.get(GEMINI_KEY_SECRET)
     except Exception as e:
         logger.error(f"Failed to retrieve secret: {e}")
         return None
 
+
+def configure_gemini(api_key: str):
+    """Import the Gemini SDK on first use; genai.configure once per key"""
+    global _genai, _configured_api_key
+    if _genai is None:
+        import google.generativeai as genai
+        _genai = genai
+    if api_key != _configured_api_key:
+        _genai.configure(api_key=api_key)
+        _configured_api_key = api_key
+    return _genai
+
 def check_rate_limit(user_id):
     """
-    Check and update daily rate limit for user.
-    Returns (allowed: bool, remaining: int)
+    Check and update the daily and per-minute rate limits for user.
+    Returns (allowed: bool, remaining: int, limit_hit: 'daily' | 'burst' | None)
     """
     if not user_id:
-        return True, RATE_LIMIT_DAILY  # Fail open if no user_id (shouldn't happen)
-        
-    today = datetime.datetime.utcnow().strftime('%Y-%m-%d')
-    key = f"ai_usage_{today}"
-    
+        # Fail open if no user_id (shouldn't happen)
+        return True, RATE_LIMIT_DAILY, None
+
     try:
-        response = users_table.update_item(
-            Key={'userId': int(user_id)},
-            UpdateExpression="SET #usage = if_not_exists(#usage, :zero) + :inc",
-            ExpressionAttributeNames={'#usage': key},
-            ExpressionAttributeValues={':inc': 1, ':zero': 0, ':limit': RATE_LIMIT_DAILY},
-            ConditionExpression="attribute_not_exists(#usage) OR #usage < :limit",
-            ReturnValues="UPDATED_NEW"
+        allowed, remaining, limit_hit = rate_limit.consume(
+            user_index_table, int(user_id), RATE_LIMIT_DAILY, RATE_LIMIT_PER_MINUTE
         )
-        used = int(response['Attributes'][key])
-        return True, RATE_LIMIT_DAILY - used
-    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
-        logger.warning(f"Rate limit exceeded for user {user_id}")
-        return False, 0
+        if not allowed:
+            logger.warning(f"Rate limit ({limit_hit}) exceeded for user {user_id}")
+        return allowed, remaining, limit_hit
     except Exception as e:
         logger.error(f"Rate limit check failed: {e}")
         # Fail closed or open? Let's fail open for reliability unless DB is down
-        return True, 0
+        return True, 0, None
 
 def lambda_handler(event, context):
     """
@@ -151,6 +129,7 @@ def lambda_handler(event, context):
         user_id = None
         if init_data:
             user_id = validate_telegram_auth(init_data)
+            logger.info(f"Session cache stats: {sessions.stats()}")
         
         if not user_id:
              # For MVP, maybe fail? Or allow limited anonymous? 
@@ -168,14 +147,25 @@ def lambda_handler(event, context):
         
         # 2. Rate Limit Check
         if user_id:
-            allowed, remaining = check_rate_limit(user_id)
+            allowed, remaining, limit_hit = check_rate_limit(user_id)
+            if not allowed and limit_hit == rate_limit.BURST:
+                return {
+                    'statusCode': 429,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*', 'Retry-After': '60'
+                    },
+                    'body': json.dumps(
+                        {'error': 'Too many AI requests. Try again in a minute.'}
+                    )
+                }
             if not allowed:
                 return {
                     'statusCode': 429,
                     'headers': { 'Access-Control-Allow-Origin': '*' },
                     'body': json.dumps({'error': 'Daily AI limit reached. Upgrade to Premium for more.'})
                 }
-        
+            metrics.increment_daily(metrics_table, {'aiCalls': 1})
+
         api_key = get_api_key()
         if not api_key:
             return {
@@ -184,7 +174,7 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Checking API configuration'})
             }
 
-        genai.configure(api_key=api_key)
+        genai = configure_gemini(api_key)
 
         if action == 'parse_task':
             # NLP Task Parsing
@@ -2,17 +2,39 @@
 Mini App API Lambda Handler
 Provides REST API for Telegram Mini App task management
 """
-import hashlib
-import hmac
+import base64
 import json
 import logging
 import os
-import uuid
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
-
-import boto3
+from typing import Any, Dict, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import Key
+from taskbot_core import clients, gamification, metrics
+from taskbot_core.activity import DEFAULT_DAYS, MAX_DAYS, activity_writes, get_activity
+from taskbot_core.auth import InitDataValidator
+from taskbot_core.dynamo import iter_query
+from taskbot_core.gamification import ACHIEVEMENTS, XP_DELETE_PENALTY
+from taskbot_core.reminders import (
+    bucket_dispatch_enabled,
+    bucket_fields,
+    reminder_target_arn,
+)
+from taskbot_core.secret_cache import SecretCache
+from taskbot_core.sessions import SessionCache
+from taskbot_core.stats import stats_writes
+from taskbot_core.status_index import status_key, status_query
+from taskbot_core.sync import (
+    DELETED_STATUS,
+    TOMBSTONE_TTL_SECONDS,
+    UPDATED_AT_INDEX,
+    change_feed_enabled,
+    change_version,
+    tombstone_write,
+)
+from taskbot_core.tables import USER_INDEX_TABLE
+from taskbot_core.tag_index import tag_index_writes, write_task
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -21,64 +43,31 @@ logger.setLevel(logging.INFO)
 TASKS_TABLE_NAME = os.environ.get('TASKS_TABLE_NAME', 'telegram-bot-tasks')
 USERS_TABLE_NAME = os.environ.get('USERS_TABLE_NAME', 'telegram-bot-user-settings')
 
-# DynamoDB
-dynamodb = boto3.resource('dynamodb')
-tasks_table = dynamodb.Table(TASKS_TABLE_NAME)
-users_table = dynamodb.Table(USERS_TABLE_NAME)
+# DynamoDB (tables and clients are built on first use)
+tasks_table = clients.lazy_table(TASKS_TABLE_NAME)
+users_table = clients.lazy_table(USERS_TABLE_NAME)
+user_index_table = clients.lazy_table(USER_INDEX_TABLE)
+metrics_table = clients.lazy_table(metrics.METRICS_TABLE)
 
 # Scheduler
-scheduler = boto3.client('scheduler')
+scheduler = clients.lazy_client('scheduler')
 REMINDER_LAMBDA_ARN = os.environ.get('REMINDER_LAMBDA_ARN')
 SCHEDULER_ROLE_ARN = os.environ.get('SCHEDULER_ROLE_ARN')
 
 # Bot token for validation
 BOT_TOKEN_SECRET = os.environ.get('BOT_TOKEN_SECRET', 'telegram-bot-token')
 
+# Warm containers reuse the token and its derived HMAC key across requests
+secret_cache = SecretCache()
 
-def get_bot_token() -> str:
-    """Get bot token from Secrets Manager"""
-    try:
-        secrets_client = boto3.client('secretsmanager')
-        response = secrets_client.get_secret_value(SecretId=BOT_TOKEN_SECRET)
-        return response['SecretString']
-    except Exception as e:
-        logger.error(f"Error getting bot token: {e}")
-        return ""
+# ...and remember initData strings that already passed validation
+sessions = SessionCache()
+auth = InitDataValidator(secret_cache, BOT_TOKEN_SECRET, sessions)
 
 
 def validate_telegram_auth(init_data: str) -> Optional[int]:
     """Validate Telegram WebApp initData and return user_id"""
-    try:
-        # Parse init_data
-        params = dict(p.split('=') for p in init_data.split('&') if '=' in p)
-
-        if 'hash' not in params:
-            return None
-
-        received_hash = params.pop('hash')
-
-        # Create data check string
-        data_check_string = '\n'.join(
-            f"{k}={params[k]}" for k in sorted(params.keys())
-        )
-
-        # Get bot token and create secret key
-        bot_token = get_bot_token()
-        secret_key = hmac.new(b'WebAppData', bot_token.encode(), hashlib.sha256).digest()
-
-        # Calculate hash
-        calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
-
-        if calculated_hash == received_hash:
-            # Extract user_id from user parameter
-            import urllib.parse
-            user_data = json.loads(urllib.parse.unquote(params.get('user', '{}')))
-            return user_data.get('id')
-
-        return None
-    except Exception as e:
-        logger.error(f"Auth validation error: {e}")
-        return None
+    return auth.validate(init_data)
 
 
 def cors_response(status_code: int, body: Any) -> Dict:
@@ -96,182 +85,39 @@ def cors_response(status_code: int, body: Any) -> Dict:
 
 
 # ========================================
-# GAMIFICATION (same as webhook_handler)
+# GAMIFICATION (engine in taskbot_core.gamification)
 # ========================================
 
-XP_REWARDS = {'low': 10, 'medium': 20, 'high': 30}
-XP_STREAK_BONUS = 5
-XP_DELETE_PENALTY = 10
-
-ACHIEVEMENTS = {
-    'first_task': {'name': '🎯 First Task', 'description': 'Complete your first task'},
-    'week_streak': {'name': '🔥 Week Warrior', 'description': '7-day streak'},
-    'early_bird': {'name': '🌅 Early Bird', 'description': 'Complete task before 8:00'},
-    'night_owl': {'name': '🦉 Night Owl', 'description': 'Complete task after 22:00'},
-    'century': {'name': '💯 Centurion', 'description': 'Complete 100 tasks'},
-    'priority_master': {'name': '⚡ Priority Master', 'description': '10 high priority tasks'},
-    'no_quit': {'name': '💪 No Quit', 'description': '30 days without deleting tasks'}
-}
-
-
 def get_user_profile(user_id: int) -> Dict[str, Any]:
     """Get user profile, create if not exists"""
     try:
-        response = users_table.get_item(Key={'userId': user_id})
-        if 'Item' in response:
-            return response['Item']
-
-        default_profile = {
-            'userId': user_id,
-            'level': 1,
-            'totalXP': 0,
-            'streak': 0,
-            'tasksCompleted': 0,
-            'highPriorityCompleted': 0,
-            'achievements': [],
-            'lastCompletedDate': None,
-            'daysWithoutDelete': 0
-        }
-        users_table.put_item(Item=default_profile)
-        return default_profile
+        profile, created = gamification.get_profile(users_table, user_id)
+        if created:
+            metrics.increment(metrics_table, {'users': 1})
+        return profile
     except Exception as e:
         logger.error(f"Error getting profile: {e}")
-        # Ensure userId is returned even in error case if possible, or at least the input userId
-        return {
-            'userId': user_id,
-            'level': 1,
-            'totalXP': 0,
-            'streak': 0,
-            'tasksCompleted': 0,
-            'achievements': []
-        }
-
-
-def check_achievements(profile: Dict[str, Any], current_hour: int = None) -> List[str]:
-    """Check and unlock new achievements"""
-    unlocked = []
-    current_achievements = profile.get('achievements', [])
-
-    tasks_completed = profile.get('tasksCompleted', 0)
-    streak = profile.get('streak', 0)
-    high_priority = profile.get('highPriorityCompleted', 0)
-    days_no_delete = profile.get('daysWithoutDelete', 0)
-
-    if current_hour is None:
-        current_hour = datetime.utcnow().hour
-
-    if 'first_task' not in current_achievements and tasks_completed >= 1:
-        unlocked.append('first_task')
-    if 'week_streak' not in current_achievements and streak >= 7:
-        unlocked.append('week_streak')
-    if 'early_bird' not in current_achievements and current_hour < 8:
-        unlocked.append('early_bird')
-    if 'night_owl' not in current_achievements and current_hour >= 22:
-        unlocked.append('night_owl')
-    if 'century' not in current_achievements and tasks_completed >= 100:
-        unlocked.append('century')
-    if 'priority_master' not in current_achievements and high_priority >= 10:
-        unlocked.append('priority_master')
-    if 'no_quit' not in current_achievements and days_no_delete >= 30:
-        unlocked.append('no_quit')
+        return gamification.default_profile(user_id)
 
-    return unlocked
 
+def complete_and_award(user_id: int, priority: str,
+                       writes: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Commit a task completion together with its XP award
 
-def award_xp(user_id: int, priority: str = 'medium') -> Dict[str, Any]:
-    """Award XP for completing a task"""
-    try:
-        profile = get_user_profile(user_id)
-        base_xp = XP_REWARDS.get(priority, 20)
-
-        today = datetime.utcnow().date().isoformat()
-        last_date = profile.get('lastCompletedDate')
-        yesterday = (datetime.utcnow() - timedelta(days=1)).date().isoformat()
-
-        if last_date == yesterday:
-            new_streak = profile.get('streak', 0) + 1
-        elif last_date == today:
-            new_streak = profile.get('streak', 1)
-        else:
-            new_streak = 1
-
-        streak_bonus = XP_STREAK_BONUS * (new_streak - 1) if new_streak > 1 else 0
-        total_earned = base_xp + streak_bonus
-
-        new_total_xp = int(profile.get('totalXP', 0)) + total_earned
-        new_tasks_completed = profile.get('tasksCompleted', 0) + 1
-        new_high_priority = profile.get('highPriorityCompleted', 0) + (1 if priority == 'high' else 0)
-
-        old_level = profile.get('level', 1)
-        new_level = (new_total_xp // 100) + 1
-        level_up = new_level > old_level
-
-        days_no_delete = profile.get('daysWithoutDelete', 0) + 1
-
-        temp_profile = {
-            **profile,
-            'tasksCompleted': new_tasks_completed,
-            'streak': new_streak,
-            'highPriorityCompleted': new_high_priority,
-            'daysWithoutDelete': days_no_delete
-        }
-        unlocked = check_achievements(temp_profile)
-        achievement_xp = len(unlocked) * 50
-        new_total_xp += achievement_xp
-
-        # Activity Log
-        activity_log = profile.get('activityLog', {})
-        current_activity = int(activity_log.get(today, 0))
-        activity_log[today] = current_activity + 1
-
-        users_table.update_item(
-            Key={'userId': user_id},
-            UpdateExpression='''SET 
-                totalXP = :xp, #lvl = :level, streak = :streak,
-                tasksCompleted = :tasks, highPriorityCompleted = :high,
-                lastCompletedDate = :today, daysWithoutDelete = :noDelete,
-                achievements = list_append(if_not_exists(achievements, :empty), :unlocked),
-                activityLog = :activityLog
-            ''',
-            ExpressionAttributeNames={'#lvl': 'level'},
-            ExpressionAttributeValues={
-                ':xp': new_total_xp, ':level': new_level, ':streak': new_streak,
-                ':tasks': new_tasks_completed, ':high': new_high_priority,
-                ':today': today, ':noDelete': days_no_delete,
-                ':unlocked': unlocked, ':empty': [],
-                ':activityLog': activity_log
-            }
-        )
-
-        return {
-            'xp_earned': base_xp,
-            'streak_bonus': streak_bonus,
-            'achievement_xp': achievement_xp,
-            'total_xp': new_total_xp,
-            'new_level': new_level,
-            'level_up': level_up,
-            'streak': new_streak,
-            'unlocked_achievements': [ACHIEVEMENTS[a]['name'] for a in unlocked]
-        }
-    except Exception as e:
-        logger.error(f"Error awarding XP: {e}")
-        return {'xp_earned': 0, 'total_xp': 0, 'streak': 0, 'unlocked_achievements': []}
+    Returns None when the task was no longer pending (nothing is written).
+    """
+    outcome = gamification.complete_task(users_table, user_id, priority, writes)
+    if outcome is not None:
+        gamification.record_metrics(metrics_table, outcome, completed=True)
+    return outcome
 
 
 def penalize_xp(user_id: int) -> Dict[str, Any]:
     """Penalize XP for deleting task"""
     try:
-        profile = get_user_profile(user_id)
-        current_xp = int(profile.get('totalXP', 0))
-        new_xp = max(0, current_xp - XP_DELETE_PENALTY)
-
-        users_table.update_item(
-            Key={'userId': user_id},
-            UpdateExpression='SET totalXP = :xp, daysWithoutDelete = :zero',
-            ExpressionAttributeValues={':xp': new_xp, ':zero': 0}
-        )
-
-        return {'xp_lost': XP_DELETE_PENALTY, 'total_xp': new_xp}
+        outcome = gamification.penalize_xp(users_table, user_id, XP_DELETE_PENALTY)
+        gamification.record_metrics(metrics_table, outcome)
+        return {'xp_lost': outcome['xp_lost'], 'total_xp': outcome['total_xp']}
     except Exception as e:
         logger.error(f"Error penalizing XP: {e}")
         return {'xp_lost': 0, 'total_xp': 0}
@@ -301,7 +147,7 @@ def create_reminder(user_id: int, task_id: str, text: str, remind_at: int):
             Name=schedule_name,
             ScheduleExpression=at_expression,
             Target={
-                'Arn': REMINDER_LAMBDA_ARN,
+                'Arn': reminder_target_arn(),
                 'RoleArn': SCHEDULER_ROLE_ARN,
                 'Input': json.dumps({
                     'userId': user_id,
@@ -329,31 +175,195 @@ def delete_reminder(task_id: str):
 # API HANDLERS
 # ========================================
 
-def handle_get_tasks(user_id: int) -> Dict:
-    """Get all tasks for user"""
-    try:
-        response = tasks_table.query(
-            KeyConditionExpression=boto3.dynamodb.conditions.Key('userId').eq(user_id)
+# GET /tasks: API field -> DynamoDB attribute
+TASK_FIELDS = {
+    'id': 'taskId',
+    'text': 'text',
+    'priority': 'priority',
+    'status': 'status',
+    'remindAt': 'remindAt',
+    'tags': 'tags',
+    'completedAt': 'completedAt'
+}
+MAX_PAGE_SIZE = 100
+
+# GET /tasks/changes
+MAX_CHANGES = 500
+SYNC_OVERLAP_MS = 5000
+
+
+def encode_cursor(last_key: Dict[str, Any]) -> str:
+    """Opaque cursor for a LastEvaluatedKey"""
+    plain = {k: int(v) if isinstance(v, Decimal) else v for k, v in last_key.items()}
+    return base64.urlsafe_b64encode(json.dumps(plain).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, user_id: int) -> Dict[str, Any]:
+    """LastEvaluatedKey from a cursor; rejects cursors from another user's partition"""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    last_key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    if not isinstance(last_key, dict) or last_key.get('userId') != user_id:
+        raise ValueError('Cursor does not belong to this user')
+    return last_key
+
+
+def format_task(item: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """API representation of a task item, limited to the requested fields"""
+    task = {
+        'id': item.get('taskId'),
+        'text': item.get('text', ''),
+        'priority': item.get('priority', 'medium'),
+        'status': item.get('status', 'pending'),
+        'remindAt': int(item.get('remindAt', 0)),
+        'tags': item.get('tags', []),
+        'completedAt': (
+            int(item['completedAt']) if item.get('completedAt') else None
         )
-        tasks = []
-        for item in response.get('Items', []):
-            tasks.append({
-                'id': item.get('taskId'),
-                'text': item.get('text', ''),
-                'priority': item.get('priority', 'medium'),
-                'status': item.get('status', 'pending'),
-                'remindAt': int(item.get('remindAt', 0)),
-                'tags': item.get('tags', []),
-                'completedAt': int(item.get('completedAt', 0)) if item.get('completedAt') else None
-            })
-        return cors_response(200, {'tasks': tasks})
+    }
+    return {field: task[field] for field in fields}
+
+
+def handle_get_tasks(user_id: int, params: Optional[Dict[str, str]] = None) -> Dict:
+    """Get tasks for user
+
+    Optional query parameters:
+    - limit: page size (1-100); without it every task is returned
+    - cursor: nextCursor from the previous page
+    - status: only tasks with this status
+    - fields: comma-separated subset of TASK_FIELDS (id is always included)
+    """
+    params = params or {}
+    try:
+        fields = list(TASK_FIELDS)
+        if params.get('fields'):
+            requested = [f.strip() for f in params['fields'].split(',') if f.strip()]
+            unknown = [f for f in requested if f not in TASK_FIELDS]
+            if unknown:
+                return cors_response(
+                    400, {'error': f"Unknown fields: {', '.join(unknown)}"}
+                )
+            fields = ['id'] + [f for f in requested if f != 'id']
+
+        limit = None
+        if params.get('limit'):
+            limit = int(params['limit'])
+            if not 1 <= limit <= MAX_PAGE_SIZE:
+                raise ValueError('limit out of range')
+
+        # Read only what the response needs
+        projection = {
+            'ProjectionExpression': ', '.join(f'#f{i}' for i in range(len(fields))),
+            'ExpressionAttributeNames': {
+                f'#f{i}': TASK_FIELDS[f] for i, f in enumerate(fields)
+            }
+        }
+        if params.get('status'):
+            # Status index range (in list order) once enabled, no filtered-out reads
+            query = status_query(user_id, params['status'], **projection)
+        else:
+            # Hide delete tombstones (they only exist for /tasks/changes)
+            query = {
+                'KeyConditionExpression': Key('userId').eq(user_id),
+                'FilterExpression': '#st <> :deleted',
+                'ExpressionAttributeValues': {':deleted': DELETED_STATUS},
+                **projection
+            }
+            query['ExpressionAttributeNames']['#st'] = 'status'
+        if params.get('cursor'):
+            query['ExclusiveStartKey'] = decode_cursor(params['cursor'], user_id)
+    except (ValueError, TypeError):
+        return cors_response(400, {'error': 'Invalid pagination parameters'})
+
+    try:
+        # Taken before reading so clients can delta-sync from here without gaps
+        version = int(change_version())
+
+        if limit is None:
+            tasks = [
+                format_task(item, fields) for item in iter_query(tasks_table, **query)
+            ]
+            return cors_response(
+                200, {'tasks': tasks, 'nextCursor': None, 'version': version}
+            )
+
+        # Ask each page only for what is still missing so the cursor lands
+        # on a page edge
+        tasks, last_key = [], None
+        while len(tasks) < limit:
+            response = tasks_table.query(Limit=limit - len(tasks), **query)
+            tasks.extend(
+                format_task(item, fields) for item in response.get('Items', [])
+            )
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                break
+            query['ExclusiveStartKey'] = last_key
+
+        return cors_response(200, {
+            'tasks': tasks,
+            'nextCursor': encode_cursor(last_key) if last_key else None,
+            'version': version
+        })
     except Exception as e:
         logger.error(f"Error getting tasks: {e}")
         return cors_response(500, {'error': 'Failed to get tasks'})
 
 
+def handle_get_changes(user_id: int, params: Optional[Dict[str, str]] = None) -> Dict:
+    """Tasks changed since a client version (GET /tasks/changes?since=)
+
+    Returns changed tasks, ids of deleted ones and the version to send next
+    time. `reset` tells the client to reload everything: its version is older
+    than tombstone retention, or too much changed to be worth a delta.
+    """
+    params = params or {}
+    try:
+        since = int(params['since'])
+    except (KeyError, TypeError, ValueError):
+        return cors_response(400, {'error': 'since is required'})
+
+    try:
+        version = int(change_version())
+        # Without the change-feed index clients simply reload everything
+        if not change_feed_enabled() or since < version - TOMBSTONE_TTL_SECONDS * 1000:
+            return cors_response(200, {'reset': True, 'version': version})
+
+        # Overlap the window a little: the index is eventually consistent
+        changed = iter_query(
+            tasks_table,
+            max_items=MAX_CHANGES + 1,
+            IndexName=UPDATED_AT_INDEX,
+            KeyConditionExpression=(
+                Key('userId').eq(user_id)
+                & Key('updatedAt').gt(max(0, since - SYNC_OVERLAP_MS))
+            )
+        )
+
+        changes, deleted = [], []
+        for item in changed:
+            if item.get('status') == DELETED_STATUS:
+                deleted.append(item['taskId'])
+            else:
+                changes.append(format_task(item, list(TASK_FIELDS)))
+
+        if len(changes) + len(deleted) > MAX_CHANGES:
+            return cors_response(200, {'reset': True, 'version': version})
+
+        return cors_response(200, {
+            'changes': changes,
+            'deleted': deleted,
+            'version': version,
+            'reset': False
+        })
+    except Exception as e:
+        logger.error(f"Error getting task changes: {e}")
+        return cors_response(500, {'error': 'Failed to get changes'})
+
+
 def handle_create_task(user_id: int, body: Dict) -> Dict:
     """Create new task"""
+    import uuid
+
     try:
         task_id = str(uuid.uuid4())[:8]
         text = body.get('text', '')
@@ -366,19 +376,31 @@ def handle_create_task(user_id: int, body: Dict) -> Dict:
             # Default to 1 hour from now if missing or invalid
             remind_at = int(datetime.utcnow().timestamp()) + 3600
 
-        tasks_table.put_item(Item={
+        tags = body.get('tags', [])
+        task_item = {
             'userId': user_id,
             'taskId': task_id,
             'text': text,
             'priority': priority,
             'status': 'pending',
             'remindAt': Decimal(str(remind_at)),
-            'tags': body.get('tags', []),
-            'createdAt': Decimal(str(datetime.utcnow().timestamp()))
-        })
+            'tags': tags,
+            'createdAt': Decimal(str(datetime.utcnow().timestamp())),
+            'updatedAt': change_version(),
+            'statusKey': status_key('pending', priority, remind_at),
+            **bucket_fields(user_id, remind_at)
+        }
+        write_task(
+            tasks_table,
+            {'Put': {'TableName': TASKS_TABLE_NAME, 'Item': task_item}},
+            tag_index_writes(user_id, task_id, tags, 1)
+            + stats_writes(user_id, pending=1)
+        )
+        metrics.increment_daily(metrics_table, {'tasksCreated': 1})
 
-        if remind_at:
-             create_reminder(user_id, task_id, text, int(remind_at))
+        # Bucket mode is picked up by the per-minute dispatcher instead
+        if remind_at and not bucket_dispatch_enabled():
+            create_reminder(user_id, task_id, text, int(remind_at))
 
         return cors_response(201, {'taskId': task_id, 'message': 'Task created'})
     except Exception as e:
@@ -390,30 +412,46 @@ def handle_complete_task(user_id: int, task_id: str) -> Dict:
     """Complete task and award XP"""
     try:
         response = tasks_table.get_item(Key={'userId': user_id, 'taskId': task_id})
-        if 'Item' not in response:
+        task = response.get('Item')
+        if not task or task.get('status') == DELETED_STATUS:
             return cors_response(404, {'error': 'Task not found'})
-
-        task = response['Item']
+        if task.get('status') != 'pending':
+            return cors_response(409, {'error': 'Task already completed'})
         priority = task.get('priority', 'medium')
 
-        tasks_table.update_item(
-            Key={'userId': user_id, 'taskId': task_id},
-            UpdateExpression='SET #status = :done, completedAt = :now',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={
+        completed_at = Decimal(str(datetime.utcnow().timestamp()))
+        completion = {'Update': {
+            'TableName': TASKS_TABLE_NAME,
+            'Key': {'userId': user_id, 'taskId': task_id},
+            'UpdateExpression': (
+                'SET #status = :done, completedAt = :now, updatedAt = :version, '
+                'statusKey = :status_key '
+                'REMOVE remindBucket'
+            ),
+            'ConditionExpression': '#status = :pending',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': {
+                ':pending': 'pending',
                 ':done': 'done',
-                ':now': Decimal(str(datetime.utcnow().timestamp()))
+                ':now': completed_at,
+                ':version': change_version(),
+                ':status_key': status_key('done', priority, task.get('remindAt'))
             }
-        )
-        
-        # Cleanup reminder
-        delete_reminder(task_id)
-
-        gamification = award_xp(user_id, priority)
+        }}
+        tags = task.get('tags', [])
+        index_writes = tag_index_writes(user_id, task_id, tags, -1) + stats_writes(
+            user_id, pending=-1, completed=1, tags=tags
+        ) + activity_writes(user_id, completed_at)
+        outcome = complete_and_award(user_id, priority, [completion, *index_writes])
+        if outcome is None:
+            return cors_response(409, {'error': 'Task already completed'})
+
+        # The reminder schedule is left to fire: the reminder handler skips
+        # non-pending tasks and the schedule deletes itself afterwards
 
         return cors_response(200, {
             'message': 'Task completed',
-            'gamification': gamification
+            'gamification': outcome
         })
     except Exception as e:
         logger.error(f"Error completing task: {e}")
@@ -424,18 +462,27 @@ def handle_delete_task(user_id: int, task_id: str) -> Dict:
     """Delete task and penalize XP if not completed"""
     try:
         response = tasks_table.get_item(Key={'userId': user_id, 'taskId': task_id})
-        if 'Item' not in response:
+        task = response.get('Item')
+        if not task or task.get('status') == DELETED_STATUS:
             return cors_response(404, {'error': 'Task not found'})
 
-        task = response['Item']
+        # Tombstone so delta-syncing clients see the delete
+        tags = task.get('tags', [])
+        if task.get('status') == 'pending':
+            index_writes = tag_index_writes(user_id, task_id, tags, -1) + stats_writes(
+                user_id, pending=-1
+            )
+        else:
+            index_writes = stats_writes(user_id, completed=-1, tags=tags)
+        tombstone = tombstone_write(TASKS_TABLE_NAME, user_id, task_id, task['status'])
+        if not write_task(tasks_table, tombstone, index_writes):
+            return cors_response(409, {'error': 'Task was changed, reload and retry'})
+        delete_reminder(task_id)
 
         penalty = None
         if task.get('status') != 'done':
             penalty = penalize_xp(user_id)
 
-        tasks_table.delete_item(Key={'userId': user_id, 'taskId': task_id})
-        delete_reminder(task_id)
-
         return cors_response(200, {
             'message': 'Task deleted',
             'penalty': penalty
@@ -445,8 +492,26 @@ def handle_delete_task(user_id: int, task_id: str) -> Dict:
         return cors_response(500, {'error': 'Failed to delete task'})
 
 
-def handle_get_profile(user_id: int) -> Dict:
-    """Get user profile with XP and achievements"""
+def activity_range(query_params: Dict[str, str]) -> Tuple[date, date]:
+    """`from`/`to` ISO dates for the heatmap, defaulting to the last DEFAULT_DAYS"""
+    end = datetime.utcnow().date()
+    if query_params.get('to'):
+        end = date.fromisoformat(query_params['to'])
+    if query_params.get('from'):
+        earliest = end - timedelta(days=MAX_DAYS - 1)
+        start = max(date.fromisoformat(query_params['from']), earliest)
+    else:
+        start = end - timedelta(days=DEFAULT_DAYS - 1)
+    return start, end
+
+
+def handle_get_profile(user_id: int, query_params: Dict[str, str]) -> Dict:
+    """Get user profile with XP, achievements and activity for the requested range"""
+    try:
+        start, end = activity_range(query_params)
+    except ValueError:
+        return cors_response(400, {'error': 'Invalid date range'})
+
     try:
         profile = get_user_profile(user_id)
 
@@ -470,7 +535,7 @@ def handle_get_profile(user_id: int) -> Dict:
                 for a in profile.get('achievements', [])
             ],
             'totalAchievements': len(ACHIEVEMENTS),
-            'activityLog': profile.get('activityLog', {})
+            'activityLog': get_activity(user_index_table, user_id, start, end)
         })
     except Exception as e:
         logger.error(f"Error getting profile: {e}")
@@ -486,27 +551,18 @@ def handle_admin_stats(user_id: int) -> Dict:
         return cors_response(403, {'error': 'Forbidden'})
 
     try:
-        # Scan users table (ok for MVP)
-        response = users_table.scan(
-            ProjectionExpression='totalXP, tasksCompleted'
-        )
-        items = response.get('Items', [])
-
-        while 'LastEvaluatedKey' in response:
-            response = users_table.scan(
-                ProjectionExpression='totalXP, tasksCompleted',
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            items.extend(response.get('Items', []))
-
-        total_users = len(items)
-        total_xp = sum(int(i.get('totalXP', 0)) for i in items)
-        total_tasks = sum(int(i.get('tasksCompleted', 0)) for i in items)
+        # Sharded counters: two small queries however many users there are
+        totals = metrics.read(metrics_table)
+        today = metrics.read(metrics_table, metrics.day_metric())
 
         return cors_response(200, {
-            'totalUsers': total_users,
-            'totalXP': total_xp,
-            'totalTasks': total_tasks
+            'totalUsers': totals.get('users', 0),
+            'totalXP': totals.get('totalXP', 0),
+            'totalTasks': totals.get('tasksCompleted', 0),
+            'dailyActiveUsers': today.get('activeUsers', 0),
+            'tasksCreatedToday': today.get('tasksCreated', 0),
+            'tasksCompletedToday': today.get('tasksCompleted', 0),
+            'aiCallsToday': today.get('aiCalls', 0)
         })
     except Exception as e:
         logger.error(f"Error getting admin stats: {e}")
@@ -529,6 +585,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict:
     user_id = None
     if init_data:
         user_id = validate_telegram_auth(init_data)
+        logger.info(f"Session cache stats: {sessions.stats()}")
 
     # Fallback for development (Restoring per user request for browser testing)
     if not user_id and query_params and query_params.get('userId'):
@@ -541,6 +598,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict:
     if not user_id:
         return cors_response(401, {'error': 'Unauthorized'})
 
+    metrics.mark_active(user_index_table, metrics_table, user_id)
+
     # Route requests
     path = event.get('path', '')
     method = event.get('httpMethod', '')
@@ -559,7 +618,9 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict:
 
     # Routing
     if path == '/tasks' and method == 'GET':
-        return handle_get_tasks(user_id)
+        return handle_get_tasks(user_id, query_params)
+    elif path == '/tasks/changes' and method == 'GET':
+        return handle_get_changes(user_id, query_params)
     elif path == '/tasks' and method == 'POST':
         return handle_create_task(user_id, body)
     elif '/tasks/' in path and '/complete' in path and method == 'PUT':
@@ -569,7 +630,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict:
         task_id = path.split('/tasks/')[1].rstrip('/')
         return handle_delete_task(user_id, task_id)
     elif path == '/profile' and method == 'GET':
-        return handle_get_profile(user_id)
+        return handle_get_profile(user_id, query_params)
     elif path == '/admin/stats' and method == 'GET':
         return handle_admin_stats(user_id)
     else:
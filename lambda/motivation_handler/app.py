@@ -7,30 +7,43 @@ import json
 import logging
 import os
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
+from typing import Dict, List
 
-import boto3
+from taskbot_core import clients
+from taskbot_core.dynamo import iter_scan
+from taskbot_core.secret_cache import SecretCache
+from taskbot_core.telegram import TelegramSender
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-secrets_client = boto3.client('secretsmanager')
+# AWS clients, built on first use
+# Clients are thread-safe (resources are not); this one still (de)serializes
+# native Python types, so scan/write workers share it
+dynamodb_client = clients.Lazy(lambda: clients.resource().meta.client)
 
 # Environment variables
 USERS_TABLE_NAME = os.environ['USERS_TABLE_NAME']
 MOTIVATION_TABLE_NAME = os.environ['MOTIVATION_TABLE_NAME']
 BOT_TOKEN_SECRET = os.environ['BOT_TOKEN_SECRET']
 
+# Broadcast tuning
+SCAN_SEGMENTS = int(os.environ.get('MOTIVATION_SCAN_SEGMENTS', '4'))
+SEND_WORKERS = int(os.environ.get('MOTIVATION_SEND_WORKERS', '16'))
+SEND_BATCH_SIZE = SEND_WORKERS  # Users sent between two remaining-time checks
+TIMEOUT_MARGIN_MS = 10000  # Stop starting new batches this close to the timeout
+
 # DynamoDB tables
-users_table = dynamodb.Table(USERS_TABLE_NAME)
-motivation_table = dynamodb.Table(MOTIVATION_TABLE_NAME)
+motivation_table = clients.lazy_table(MOTIVATION_TABLE_NAME)
 
-# Cache bot token
-_bot_token_cache = None
+# Bot token, cached per warm container (thread-safe for the send workers)
+secret_cache = SecretCache()
 
 DEFAULT_MESSAGES = [
     "Small steps lead to big achievements. Keep going! 🌟",
@@ -48,114 +61,187 @@ DEFAULT_MESSAGES = [
 
 def get_bot_token() -> str:
     """Get bot token from Secrets Manager (with caching)"""
-    global _bot_token_cache
+    return secret_cache.get(BOT_TOKEN_SECRET)
 
-    if _bot_token_cache is None:
-        response = secrets_client.get_secret_value(SecretId=BOT_TOKEN_SECRET)
-        _bot_token_cache = response['SecretString']
 
-    return _bot_token_cache
+# Shared rate-limited sender; one keep-alive pool sized for the send workers
+telegram = TelegramSender(get_bot_token, pool_size=SEND_WORKERS)
+telegram.warm()  # Handshake with api.telegram.org while the rest of init runs
 
 
 def send_telegram_message(chat_id: int, text: str) -> bool:
     """Send message to Telegram user"""
-    import urllib3
-    http = urllib3.PoolManager()
-
-    bot_token = get_bot_token()
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    return telegram.send_message(chat_id, text, parse_mode='Markdown')
 
-    data = {
-        "chat_id": chat_id,
-        "text": text,
-        "parse_mode": "Markdown"
-    }
 
+def load_messages() -> List[str]:
+    """Load all motivational messages once per invocation"""
     try:
-        response = http.request(
-            'POST',
-            url,
-            body=json.dumps(data),
-            headers={'Content-Type': 'application/json'}
-        )
-        return response.status == 200
+        items = iter_scan(motivation_table, ProjectionExpression='#text',
+                          ExpressionAttributeNames={'#text': 'text'})
+        messages = [item['text'] for item in items if item.get('text')]
+
+        return messages or DEFAULT_MESSAGES
     except Exception as e:
-        logger.error(f"Failed to send message: {e}")
-        return False
+        logger.error(f"Error fetching messages: {e}")
+        return DEFAULT_MESSAGES
 
 
-def get_random_message() -> str:
+def get_random_message(messages: List[str] = None) -> str:
     """Get random motivational message"""
-    try:
-        # Try to get from DynamoDB
-        response = motivation_table.scan(Limit=50)
-        messages = response.get('Items', [])
-
-        if messages:
-            return random.choice(messages)['text']
-        else:
-            # Fallback to default
-            return random.choice(DEFAULT_MESSAGES)
-    except Exception as e:
-        logger.error(f"Error fetching messages: {e}")
-        return random.choice(DEFAULT_MESSAGES)
+    return random.choice(messages or DEFAULT_MESSAGES)
 
 
-def lambda_handler(event, context):
-    """
-    Daily motivation sender triggered by EventBridge
+def send_motivation(user_id: int, messages: List[str], now_ts: Decimal) -> bool:
+    """Send one daily motivation message and stamp the user as done for today"""
+    message_text = get_random_message(messages)
+    if not send_telegram_message(user_id, f"💪 **Daily Motivation**\n\n{message_text}"):
+        return False
+    mark_sent(user_id, now_ts)
+    return True
+
+
+def mark_sent(user_id: int, now_ts: Decimal) -> None:
+    """Stamp lastMotivationAt for one user
+
+    One small write per user: unrelated users never share a write, so a
+    concurrent profile update cannot undo anyone else's stamp.
     """
     try:
-        logger.info("Starting daily motivation send")
-
-        # Scan users with motivation enabled
-        response = users_table.scan(
-            FilterExpression='motivationEnabled = :true',
-            ExpressionAttributeValues={':true': True}
+        dynamodb_client.update_item(
+            TableName=USERS_TABLE_NAME,
+            Key={'userId': user_id},
+            UpdateExpression='SET lastMotivationAt = :now',
+            ConditionExpression='attribute_exists(userId)',
+            ExpressionAttributeValues={':now': now_ts}
         )
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        pass  # Profile deleted meanwhile; nothing to stamp
+    except Exception as e:
+        logger.error(f"Failed to mark motivation sent for {user_id}: {e}")
 
-        users = response.get('Items', [])
-        logger.info(f"Found {len(users)} users with motivation enabled")
 
-        now_ts = Decimal(str(datetime.utcnow().timestamp()))
-        yesterday_ts = Decimal(str((datetime.utcnow() - timedelta(days=1)).timestamp()))
+class BroadcastStats:
+    """Thread-safe counters for a single broadcast run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.due = 0
+        self.sent = 0
+        self.failed = 0
+        self.deferred_segments = 0
 
-        sent_count = 0
+    def add(self, due: int = 0, sent: int = 0, failed: int = 0,
+            deferred_segments: int = 0):
+        with self._lock:
+            self.due += due
+            self.sent += sent
+            self.failed += failed
+            self.deferred_segments += deferred_segments
 
-        for user in users:
-            user_id = int(user['userId'])
-            last_motivation_at = user.get('lastMotivationAt', 0)
 
-            # Check if already sent today
-            if last_motivation_at > yesterday_ts:
-                logger.info(f"Skipping user {user_id} - already sent today")
-                continue
+def broadcast_segment(segment: int, messages: List[str], cutoff_ts: Decimal,
+                      now_ts: Decimal, send_pool: ThreadPoolExecutor,
+                      stats: BroadcastStats, context) -> None:
+    """Scan one segment page by page, fan each page out to the send pool
 
-            # Get random message
-            message_text = get_random_message()
-            full_message = f"💪 **Daily Motivation**\n\n{message_text}"
+    A 1 MB scan page can hold thousands of users, so the remaining time is
+    checked before every SEND_BATCH_SIZE users rather than once per page.
+    """
+    paginator = dynamodb_client.get_paginator('scan')
+    pages = paginator.paginate(
+        TableName=USERS_TABLE_NAME,
+        Segment=segment,
+        TotalSegments=SCAN_SEGMENTS,
+        ProjectionExpression='userId',
+        FilterExpression=(
+            'motivationEnabled = :true AND '
+            '(attribute_not_exists(lastMotivationAt) OR lastMotivationAt <= :cutoff)'
+        ),
+        ExpressionAttributeValues={
+            ':true': True,
+            ':cutoff': cutoff_ts
+        }
+    )
+
+    for page in pages:
+        user_ids = [int(item['userId']) for item in page.get('Items', [])]
+
+        for start in range(0, len(user_ids), SEND_BATCH_SIZE):
+            # Stop cleanly rather than dying mid-batch; users not reached stay
+            # unstamped and get their message from tomorrow's run
+            if context and context.get_remaining_time_in_millis() < TIMEOUT_MARGIN_MS:
+                logger.warning(f"Segment {segment} stopping early, close to timeout")
+                stats.add(deferred_segments=1)
+                return
+
+            batch = user_ids[start:start + SEND_BATCH_SIZE]
+            results = list(send_pool.map(
+                lambda uid: send_motivation(uid, messages, now_ts), batch
+            ))
+            sent = sum(results)
+            stats.add(due=len(batch), sent=sent, failed=len(batch) - sent)
+
+
+def broadcast_summary(stats: BroadcastStats, elapsed: float, throughput: float,
+                      telegram_stats: Dict[str, int]) -> Dict:
+    """Build the invocation result reported back to EventBridge/CloudWatch"""
+    return {
+        'sent_count': stats.sent,
+        'total_users': stats.due,
+        'failed_count': stats.failed,
+        'deferred_segments': stats.deferred_segments,
+        'elapsed_seconds': round(elapsed, 2),
+        'messages_per_second': round(throughput, 1),
+        'telegram': telegram_stats
+    }
+
+
+@telegram.log_connection_reuse
+def lambda_handler(event, context):
+    """
+    Daily motivation sender triggered by EventBridge
+    """
+    try:
+        logger.info("Starting daily motivation send")
+        started = time.monotonic()
 
-            # Send message
-            success = send_telegram_message(user_id, full_message)
+        messages = load_messages()
 
-            if success:
-                # Update last_motivation_at
-                users_table.update_item(
-                    Key={'userId': user_id},
-                    UpdateExpression='SET lastMotivationAt = :now',
-                    ExpressionAttributeValues={':now': now_ts}
-                )
-                sent_count += 1
-                logger.info(f"Sent motivation to user {user_id}")
+        now_ts = Decimal(str(datetime.utcnow().timestamp()))
+        cutoff_ts = Decimal(str((datetime.utcnow() - timedelta(days=1)).timestamp()))
+
+        stats = BroadcastStats()
+        telegram_before = telegram.stats()
+
+        # Segment scanners feed a shared, bounded pool of senders
+        with ThreadPoolExecutor(max_workers=SEND_WORKERS) as send_pool:
+            with ThreadPoolExecutor(max_workers=SCAN_SEGMENTS) as scan_pool:
+                futures = [
+                    scan_pool.submit(broadcast_segment, segment, messages, cutoff_ts,
+                                     now_ts, send_pool, stats, context)
+                    for segment in range(SCAN_SEGMENTS)
+                ]
+                for future in futures:
+                    future.result()
+
+        elapsed = time.monotonic() - started
+        telegram_stats = {
+            k: v - telegram_before[k] for k, v in telegram.stats().items()
+        }
+        throughput = stats.sent / elapsed if elapsed > 0 else 0.0
 
-        logger.info(f"Motivation send complete. Sent to {sent_count} users")
+        logger.info(
+            f"Motivation send complete. Sent {stats.sent}/{stats.due} "
+            f"({stats.failed} failed) in {elapsed:.1f}s, {throughput:.1f} msg/s, "
+            f"telegram: {telegram_stats}"
+        )
 
         return {
             'statusCode': 200,
-            'body': json.dumps({
-                'sent_count': sent_count,
-                'total_users': len(users)
-            })
+            'body': json.dumps(
+                broadcast_summary(stats, elapsed, throughput, telegram_stats)
+            )
         }
 
     except Exception as e:
@@ -164,3 +250,4 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
+
@@ -3,72 +3,273 @@ Reminder Handler - EventBridge-triggered Lambda
 Sends task reminders when scheduled time arrives
 """
 
+import calendar
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List
 
-import boto3
+from boto3.dynamodb.conditions import Key
+from taskbot_core import clients
+from taskbot_core.dynamo import iter_batch_get, iter_pages
+from taskbot_core.reminders import REMIND_BUCKET_INDEX, due_buckets
+from taskbot_core.secret_cache import SecretCache
+from taskbot_core.telegram import TelegramSender
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-secrets_client = boto3.client('secretsmanager')
-scheduler_client = boto3.client('scheduler')
+# AWS clients, built on first use
+dynamodb = clients.Lazy(clients.resource)
+# Thread-safe; (de)serializes native types
+dynamodb_client = clients.Lazy(lambda: clients.resource().meta.client)
+scheduler_client = clients.lazy_client('scheduler')
 
 # Environment variables
 TASKS_TABLE_NAME = os.environ['TASKS_TABLE_NAME']
 BOT_TOKEN_SECRET = os.environ['BOT_TOKEN_SECRET']
+DISPATCH_LOOKBACK_MINUTES = int(os.environ.get('DISPATCH_LOOKBACK_MINUTES', '5'))
+
+# Batch tuning
+SEND_WORKERS = int(os.environ.get('REMINDER_SEND_WORKERS', '16'))
+WRITE_BATCH_SIZE = 100  # TransactWriteItems limit
+MAX_BATCH_ATTEMPTS = 3
 
 # DynamoDB table
-tasks_table = dynamodb.Table(TASKS_TABLE_NAME)
+tasks_table = clients.lazy_table(TASKS_TABLE_NAME)
+
+# Bot token, cached per warm container
+secret_cache = SecretCache()
 
-# Cache bot token
-_bot_token_cache = None
 
 def get_bot_token() -> str:
     """Get bot token from Secrets Manager (with caching)"""
-    global _bot_token_cache
+    return secret_cache.get(BOT_TOKEN_SECRET)
 
-    if _bot_token_cache is None:
-        response = secrets_client.get_secret_value(SecretId=BOT_TOKEN_SECRET)
-        _bot_token_cache = response['SecretString']
 
-    return _bot_token_cache
+# Shared rate-limited sender; one keep-alive pool sized for the send workers
+telegram = TelegramSender(get_bot_token, pool_size=SEND_WORKERS)
+telegram.warm()  # Handshake with api.telegram.org while the rest of init runs
 
 
 def send_telegram_message(chat_id: int, text: str) -> bool:
     """Send message to Telegram user"""
-    import urllib3
-    http = urllib3.PoolManager()
+    return telegram.send_message(chat_id, text, parse_mode='Markdown')
+
+
+def format_reminder(task: Dict[str, Any]) -> str:
+    """Reminder message body for a task"""
+    return (
+        f"🔔 **Reminder**\n\n"
+        f"{task['text']}\n\n"
+        f"Mark as done: /done {task['taskId'][:8]}"
+    )
+
+
+def batch_get_tasks(keys: List[Dict[str, Any]],
+                    unprocessed: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fetch tasks with BatchGetItem (100 keys per call, unprocessed keys retried)
+
+    Keys DynamoDB still left unprocessed after the retries go to `unprocessed`.
+    """
+    return list(iter_batch_get(dynamodb, TASKS_TABLE_NAME, [
+        {'userId': int(key['userId']), 'taskId': key['taskId']} for key in keys
+    ], unprocessed=unprocessed))
 
-    bot_token = get_bot_token()
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
 
-    data = {
-        "chat_id": chat_id,
-        "text": text,
-        "parse_mode": "Markdown"
+def notified_update(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Transaction item flagging a task notified if it is still due as sent"""
+    values = {':true': True, ':pending': 'pending'}
+    if 'remindAt' in task:
+        remind_condition = 'remindAt = :remind_at'
+        values[':remind_at'] = task['remindAt']
+    else:
+        remind_condition = 'attribute_not_exists(remindAt)'
+
+    return {
+        'Update': {
+            'TableName': TASKS_TABLE_NAME,
+            'Key': {'userId': task['userId'], 'taskId': task['taskId']},
+            'UpdateExpression': 'SET notified = :true REMOVE remindBucket',
+            'ConditionExpression': f'#status = :pending AND {remind_condition}',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': values
+        }
     }
 
+
+def mark_notified(tasks: List[Dict[str, Any]]) -> None:
+    """Set notified flags in bulk, one transaction per 100 tasks
+
+    Each update is conditioned on the task still being pending at the same
+    remindAt, so a task completed or snoozed meanwhile is left alone; those
+    are dropped from the transaction and the rest retried. The reminders are
+    already delivered by now, so other write errors are logged, not raised.
+    """
+    for start in range(0, len(tasks), WRITE_BATCH_SIZE):
+        pending = tasks[start:start + WRITE_BATCH_SIZE]
+
+        for _ in range(MAX_BATCH_ATTEMPTS):
+            if not pending:
+                break
+            try:
+                dynamodb_client.transact_write_items(
+                    TransactItems=[notified_update(task) for task in pending]
+                )
+                break
+            except dynamodb_client.exceptions.TransactionCanceledException as e:
+                reasons = e.response.get('CancellationReasons', [])
+                pending = [
+                    task for task, reason in zip(pending, reasons)
+                    if reason.get('Code') != 'ConditionalCheckFailed'
+                ]
+            except Exception as e:
+                logger.error(
+                    f"Failed to mark {len(pending)} tasks as notified: {e}",
+                    exc_info=True
+                )
+                break
+        else:
+            logger.error(f"Failed to mark {len(pending)} tasks as notified")
+
+
+def send_reminders(tasks: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Send due reminders concurrently and flag the delivered ones"""
+    due, skipped = [], []
+    for task in tasks:
+        if not task.get('notified') and task.get('status') == 'pending':
+            due.append(task)
+        else:
+            skipped.append(task)
+
+    def send(task: Dict[str, Any]) -> bool:
+        try:
+            return send_telegram_message(int(task['userId']), format_reminder(task))
+        except Exception as e:
+            logger.error(f"Failed to send reminder {task['taskId']}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=SEND_WORKERS) as pool:
+        results = list(pool.map(send, due))
+
+    sent = [task for task, ok in zip(due, results) if ok]
+    failed = [task for task, ok in zip(due, results) if not ok]
+
+    mark_notified(sent)
+    return {'sent': sent, 'failed': failed, 'skipped': skipped}
+
+
+def delete_schedules(task_ids: List[str]) -> None:
+    """Best-effort cleanup of per-task EventBridge schedules"""
+    def delete(task_id: str) -> None:
+        try:
+            scheduler_client.delete_schedule(Name=f'reminder-{task_id}')
+        except Exception as e:
+            logger.info(f"Could not delete schedule/not found: {e}")
+
+    with ThreadPoolExecutor(max_workers=SEND_WORKERS) as pool:
+        list(pool.map(delete, task_ids))
+
+
+def process_reminder_batch(keys: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fetch, send and flag a batch of {userId, taskId} reminders
+
+    Keys that could not be read are returned as 'unprocessed' and keep their
+    schedules, so the caller can retry them.
+    """
+    unprocessed = []
+    tasks = batch_get_tasks(keys, unprocessed)
+    result = send_reminders(tasks)
+
+    found = {(int(t['userId']), t['taskId']) for t in tasks}
+    retry = {(int(k['userId']), k['taskId']) for k in unprocessed}
+    missing = [
+        k for k in keys if (int(k['userId']), k['taskId']) not in found | retry
+    ]
+
+    delete_schedules([
+        k['taskId'] for k in keys if (int(k['userId']), k['taskId']) not in retry
+    ])
+    result['missing'] = missing
+    result['unprocessed'] = unprocessed
+    return result
+
+
+def handle_sqs_batch(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """SQS batch: report only records whose reminder failed to send"""
+    keys_by_message = {}
+
+    for record in records:
+        try:
+            body = json.loads(record['body'])
+            keys_by_message[record['messageId']] = (int(body['userId']), body['taskId'])
+        except (KeyError, TypeError, ValueError) as e:
+            # Malformed messages will never succeed; drop instead of retrying forever
+            logger.error(
+                f"Dropping malformed reminder message {record.get('messageId')}: {e}"
+            )
+
+    keys = [{'userId': u, 'taskId': t} for u, t in keys_by_message.values()]
     try:
-        response = http.request(
-            'POST',
-            url,
-            body=json.dumps(data),
-            headers={'Content-Type': 'application/json'}
-        )
-        return response.status == 200
+        result = process_reminder_batch(keys)
     except Exception as e:
-        logger.error(f"Failed to send message: {e}")
-        return False
+        logger.error(f"Reminder batch failed: {e}", exc_info=True)
+        return {'batchItemFailures': [{'itemIdentifier': m} for m in keys_by_message]}
+
+    failed = {
+        (int(t['userId']), t['taskId'])
+        for t in result['failed'] + result['unprocessed']
+    }
+    failures = [
+        {'itemIdentifier': m} for m, key in keys_by_message.items() if key in failed
+    ]
 
+    logger.info(
+        f"Reminder batch: {len(result['sent'])} sent, "
+        f"{len(result['failed'])} failed, "
+        f"{len(result['skipped'])} skipped, {len(result['missing'])} missing, "
+        f"{len(result['unprocessed'])} unprocessed, telegram: {telegram.stats()}"
+    )
+    return {'batchItemFailures': failures}
 
+
+def dispatch_due_reminders() -> Dict[str, int]:
+    """Send every pending reminder in the current (and recent) minute buckets"""
+    totals = {'sent': 0, 'failed': 0}
+    now = datetime.utcnow()
+    now_ts = calendar.timegm(now.timetuple())
+
+    for bucket in due_buckets(now, DISPATCH_LOOKBACK_MINUTES):
+        pages = iter_pages(tasks_table.query, IndexName=REMIND_BUCKET_INDEX,
+                           KeyConditionExpression=Key('remindBucket').eq(bucket))
+        for page in pages:
+            # The index projects everything needed, so no BatchGetItem here.
+            # The current minute's bucket also holds reminders due later in
+            # that minute; they stay indexed for the next run
+            due = [
+                task for task in page.get('Items', [])
+                if int(task.get('remindAt', 0)) <= now_ts
+            ]
+            result = send_reminders(due)
+            totals['sent'] += len(result['sent'])
+            totals['failed'] += len(result['failed'])
+
+    return totals
+
+
+@telegram.log_connection_reuse
 def lambda_handler(event, context):
     """
     EventBridge-triggered Lambda handler for sending reminders
+
+    Per-minute dispatcher (bucket mode): a Scheduled Event sends all due
+    reminders from the remindBucket index in one invocation.
+
+    Batches: an SQS event (one {userId, taskId} per record, partial failures
+    reported via batchItemFailures) or {"reminders": [{userId, taskId}, ...]}.
     
     Event format:
     {
@@ -79,6 +280,29 @@ def lambda_handler(event, context):
     try:
         logger.info(f"Received event: {json.dumps(event)}")
 
+        if event.get('detail-type') == 'Scheduled Event':
+            result = dispatch_due_reminders()
+            logger.info(f"Dispatched reminders: {result}, telegram: {telegram.stats()}")
+            return {'statusCode': 200, 'body': json.dumps(result)}
+
+        if 'Records' in event:
+            return handle_sqs_batch(event['Records'])
+
+        if 'reminders' in event:
+            result = process_reminder_batch(event['reminders'])
+            summary = {name: len(items) for name, items in result.items()}
+            logger.info(f"Reminder batch: {summary}, telegram: {telegram.stats()}")
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    **summary,
+                    'failed_reminders': [
+                        {'userId': int(t['userId']), 'taskId': t['taskId']}
+                        for t in result['failed'] + result['unprocessed']
+                    ]
+                })
+            }
+
         user_id = event['userId']
         task_id = event['taskId']
 
@@ -102,13 +326,7 @@ def lambda_handler(event, context):
             return {'statusCode': 200, 'body': 'Already processed'}
 
         # Send reminder
-        reminder_text = (
-            f"🔔 **Reminder**\n\n"
-            f"{task['text']}\n\n"
-            f"Mark as done: /done {task_id[:8]}"
-        )
-
-        success = send_telegram_message(user_id, reminder_text)
+        success = send_telegram_message(user_id, format_reminder(task))
 
         if success:
             # Mark task as notified
@@ -131,6 +349,8 @@ def lambda_handler(event, context):
         except Exception as e:
             logger.warning(f"Failed to delete schedule: {e}")
 
+        logger.info(f"Telegram sender stats: {telegram.stats()}")
+
         return {
             'statusCode': 200,
             'body': json.dumps({'success': success})
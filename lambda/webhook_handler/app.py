@@ -5,6 +5,7 @@ Enhanced with: tags, priorities, snooze, smart parsing, stats, recurring
 Phase 1 + Phase 2 features
 """
 
+import hashlib
 import json
 import logging
 import os
@@ -12,19 +13,43 @@ import re
 import secrets
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
-
-import boto3
+from typing import Any, Dict, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import Key
+from taskbot_core import clients, gamification, metrics
+from taskbot_core.activity import activity_writes
+from taskbot_core.dedupe import PROCESSED_UPDATES_TABLE, UpdateDeduper
+from taskbot_core.dynamo import iter_batch_get, iter_pages, iter_query
+from taskbot_core.gamification import ACHIEVEMENTS, XP_DELETE_PENALTY, XP_IGNORE_PENALTY
+from taskbot_core.reminders import (
+    bucket_dispatch_enabled,
+    bucket_fields,
+    remind_bucket,
+    reminder_target_arn,
+)
+from taskbot_core.secret_cache import SecretCache
+from taskbot_core.stats import get_stats, stats_writes
+from taskbot_core.status_index import status_index_enabled, status_key, status_query
+from taskbot_core.sync import DELETED_STATUS, change_version, tombstone_write
+from taskbot_core.tables import USER_INDEX_TABLE
+from taskbot_core.tag_index import (
+    tag_counts,
+    tag_index_writes,
+    tagged_task_ids,
+    write_task,
+)
+from taskbot_core.telegram import TelegramSender, message_payload, webhook_reply
+from taskbot_core.timeparse import parse_smart_time, parse_snooze_delay
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-secretsmanager_client = boto3.client('secretsmanager')
-scheduler_client = boto3.client('scheduler')
-lambda_client = boto3.client('lambda')  # NEW: For AI processor
+# AWS clients, built on first use
+dynamodb = clients.Lazy(clients.resource)
+scheduler_client = clients.lazy_client('scheduler')
+lambda_client = clients.lazy_client('lambda')  # NEW: For AI processor
+sqs_client = clients.lazy_client('sqs')
 
 # Environment variables
 TASKS_TABLE_NAME = os.environ['TASKS_TABLE_NAME']
@@ -35,24 +60,43 @@ REMINDER_LAMBDA_ARN = os.environ['REMINDER_LAMBDA_ARN']
 AI_PROCESSOR_ARN = os.environ.get('AI_PROCESSOR_ARN', 'arn:aws:lambda:us-east-1:577713924485:function:ai-processor')
 GAMIFICATION_ARN = os.environ.get('GAMIFICATION_ARN', 'arn:aws:lambda:us-east-1:577713924485:function:gamification-handler')  # NEW
 SCHEDULER_ROLE_ARN = os.environ.get('SCHEDULER_ROLE_ARN', 'arn:aws:iam::577713924485:role/EventBridgeSchedulerRole')
+UPDATE_QUEUE_URL = os.environ.get('UPDATE_QUEUE_URL', '')
+
+# Answer in the webhook response body instead of a separate sendMessage call.
+# Telegram never reports whether such a reply was delivered, so only commands
+# with a fixed single-message reply are answered this way
+INLINE_REPLIES = os.environ.get('WEBHOOK_INLINE_REPLY', 'true') == 'true'
+INLINE_COMMANDS = ('/start', '/help')
+
+# Telegram messages are capped at 4096 chars; list at most this many tasks
+MAX_LISTED_TASKS = 30
+
+# Task ids are shown to users as their first 8 characters
+SHORT_ID_LENGTH = 8
+MAX_PREFIX_MATCHES = 5
 
 # DynamoDB tables
-tasks_table = dynamodb.Table(TASKS_TABLE_NAME)
-users_table = dynamodb.Table(USERS_TABLE_NAME)
-motivation_table = dynamodb.Table(MOTIVATION_TABLE_NAME)
+tasks_table = clients.lazy_table(TASKS_TABLE_NAME)
+users_table = clients.lazy_table(USERS_TABLE_NAME)
+motivation_table = clients.lazy_table(MOTIVATION_TABLE_NAME)
+user_index_table = clients.lazy_table(USER_INDEX_TABLE)
+metrics_table = clients.lazy_table(metrics.METRICS_TABLE)
+
+# Telegram retries a slow or failed webhook; each update_id is handled once
+updates = UpdateDeduper(clients.lazy_table(PROCESSED_UPDATES_TABLE))
+
+# Bot token, cached per warm container
+secret_cache = SecretCache()
 
-# Cache bot token
-_bot_token_cache = None
 
 def get_bot_token() -> str:
     """Get bot token from Secrets Manager (with caching)"""
-    global _bot_token_cache
+    return secret_cache.get(BOT_TOKEN_SECRET)
 
-    if _bot_token_cache is None:
-        response = secretsmanager_client.get_secret_value(SecretId=BOT_TOKEN_SECRET)
-        _bot_token_cache = response['SecretString']
 
-    return _bot_token_cache
+# Shared rate-limited sender (pooled connection, 429 backoff)
+telegram = TelegramSender(get_bot_token)
+telegram.warm()  # Handshake with api.telegram.org while the rest of init runs
 
 
 def schedule_reminder(user_id: int, task_id: str, remind_at: int) -> bool:
@@ -76,14 +120,15 @@ def schedule_reminder(user_id: int, task_id: str, remind_at: int) -> bool:
             ScheduleExpressionTimezone='UTC',
             FlexibleTimeWindow={'Mode': 'OFF'},
             Target={
-                'Arn': REMINDER_LAMBDA_ARN,
+                'Arn': reminder_target_arn(),
                 'RoleArn': scheduler_role_arn,
                 'Input': json.dumps({
                     'userId': user_id,
                     'taskId': task_id
                 })
             },
-            State='ENABLED'
+            State='ENABLED',
+            ActionAfterCompletion='DELETE'
         )
 
         logger.info(f"Created reminder schedule {schedule_name} for {schedule_time} UTC")
@@ -131,319 +176,54 @@ def get_priority_emoji(priority: str) -> str:
     }.get(priority, '⚪')
 
 
-def parse_snooze_delay(delay_str: str) -> int:
-    """Parse snooze delay to timestamp"""
-    now = datetime.utcnow()
-    delay_str = delay_str.lower().strip()
-
-    if match := re.match(r'(\d+)h', delay_str):
-        target = now + timedelta(hours=int(match.group(1)))
-    elif match := re.match(r'(\d+)m(?:in)?', delay_str):
-        target = now + timedelta(minutes=int(match.group(1)))
-    elif 'tomorrow' in delay_str or 'завтра' in delay_str:
-        target = now + timedelta(days=1)
-    elif 'week' in delay_str:
-        target = now + timedelta(days=7)
-    else:
-        target = now + timedelta(hours=1)
-
-    return int(target.timestamp())
-
-
-def parse_smart_time(text: str) -> Optional[datetime]:
-    """Enhanced time parsing"""
-    text_lower = text.lower()
-    now = datetime.utcnow()
-
-    # "in X hours/minutes"
-    if match := re.search(r'in (\d+) ?(h|hour|hours)', text_lower):
-        return now + timedelta(hours=int(match.group(1)))
-
-    if match := re.search(r'in (\d+) ?(m|min|minute|minutes)', text_lower):
-        return now + timedelta(minutes=int(match.group(1)))
-
-    # Days of week
-    days_map = {
-        'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-        'friday': 4, 'saturday': 5, 'sunday': 6,
-        'понедельник': 0, 'вторник': 1, 'среда': 2, 'четверг': 3,
-        'пятница': 4, 'суббота': 5, 'воскресенье': 6
-    }
-
-    for day_name, day_num in days_map.items():
-        if day_name in text_lower:
-            current_day = now.weekday()
-            days_ahead = (day_num - current_day) % 7 or 7
-            target_date = now + timedelta(days=days_ahead)
-
-            time_match = re.search(r'(\d{1,2}):(\d{2})', text)
-            if time_match:
-                hour, minute = int(time_match.group(1)), int(time_match.group(2))
-                return target_date.replace(hour=hour, minute=minute, second=0)
-            return target_date.replace(hour=9, minute=0, second=0)
-
-    # Tomorrow
-    if 'tomorrow' in text_lower or 'завтра' in text_lower:
-        target = now + timedelta(days=1)
-        time_match = re.search(r'(\d{1,2}):(\d{2})', text)
-        if time_match:
-            hour, minute = int(time_match.group(1)), int(time_match.group(2))
-            return target.replace(hour=hour, minute=minute, second=0)
-        return target.replace(hour=9, minute=0, second=0)
-
-    # Just time (HH:MM)
-    if time_match := re.search(r'(\d{1,2}):(\d{2})', text):
-        hour, minute = int(time_match.group(1)), int(time_match.group(2))
-        target = now.replace(hour=hour, minute=minute, second=0)
-        if target < now:
-            target += timedelta(days=1)
-        return target
-
-    return None
-
-
 # ========================================
 # GAMIFICATION SYSTEM (Integrated)
 # ========================================
 
-XP_REWARDS = {
-    'low': 10,
-    'medium': 20,
-    'high': 30
-}
-XP_STREAK_BONUS = 5
-XP_DELETE_PENALTY = 10
-XP_IGNORE_PENALTY = 15
-
-ACHIEVEMENTS = {
-    'first_task': {'name': '🎯 First Task', 'description': 'Complete your first task'},
-    'week_streak': {'name': '🔥 Week Warrior', 'description': '7-day streak'},
-    'early_bird': {'name': '🌅 Early Bird', 'description': 'Complete task before 8:00'},
-    'night_owl': {'name': '🦉 Night Owl', 'description': 'Complete task after 22:00'},
-    'century': {'name': '💯 Centurion', 'description': 'Complete 100 tasks'},
-    'priority_master': {'name': '⚡ Priority Master', 'description': '10 high priority tasks'},
-    'no_quit': {'name': '💪 No Quit', 'description': '30 days without deleting tasks'}
-}
-
-
 def get_user_profile(user_id: int) -> Dict[str, Any]:
     """Get user profile, create if not exists"""
     try:
-        response = users_table.get_item(Key={'userId': user_id})
-        if 'Item' in response:
-            return response['Item']
-
-        # Create default profile
-        default_profile = {
-            'userId': user_id,
-            'level': 1,
-            'totalXP': 0,
-            'streak': 0,
-            'tasksCompleted': 0,
-            'highPriorityCompleted': 0,
-            'achievements': [],
-            'lastCompletedDate': None,
-            'lastDeleteDate': None,
-            'daysWithoutDelete': 0
-        }
-        users_table.put_item(Item=default_profile)
-        return default_profile
+        profile, created = gamification.get_profile(users_table, user_id)
+        if created:
+            metrics.increment(metrics_table, {'users': 1})
+        return profile
     except Exception as e:
         logger.error(f"Error getting profile: {e}")
-        return {'userId': user_id, 'level': 1, 'totalXP': 0, 'streak': 0, 'tasksCompleted': 0, 'achievements': []}
-
-
-def check_achievements(user_id: int, profile: Dict[str, Any], current_hour: int = None) -> List[str]:
-    """Check and unlock new achievements"""
-    unlocked = []
-    current_achievements = profile.get('achievements', [])
-
-    tasks_completed = profile.get('tasksCompleted', 0)
-    streak = profile.get('streak', 0)
-    high_priority = profile.get('highPriorityCompleted', 0)
-    days_no_delete = profile.get('daysWithoutDelete', 0)
-
-    if current_hour is None:
-        current_hour = datetime.utcnow().hour
-
-    # First Task
-    if 'first_task' not in current_achievements and tasks_completed >= 1:
-        unlocked.append('first_task')
-
-    # Week Warrior (7 day streak)
-    if 'week_streak' not in current_achievements and streak >= 7:
-        unlocked.append('week_streak')
-
-    # Early Bird (before 8 AM)
-    if 'early_bird' not in current_achievements and current_hour < 8:
-        unlocked.append('early_bird')
+        return gamification.default_profile(user_id)
 
-    # Night Owl (after 10 PM)
-    if 'night_owl' not in current_achievements and current_hour >= 22:
-        unlocked.append('night_owl')
 
-    # Centurion (100 tasks)
-    if 'century' not in current_achievements and tasks_completed >= 100:
-        unlocked.append('century')
+def complete_and_award(user_id: int, priority: str,
+                       writes: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Commit a task completion together with its XP award
 
-    # Priority Master (10 high priority)
-    if 'priority_master' not in current_achievements and high_priority >= 10:
-        unlocked.append('priority_master')
-
-    # No Quit (30 days without delete)
-    if 'no_quit' not in current_achievements and days_no_delete >= 30:
-        unlocked.append('no_quit')
-
-    return unlocked
-
-
-def award_xp(user_id: int, priority: str = 'medium') -> Dict[str, Any]:
-    """Award XP for completing a task"""
-    try:
-        profile = get_user_profile(user_id)
-
-        # Calculate XP
-        base_xp = XP_REWARDS.get(priority, 20)
-
-        # Update streak
-        today = datetime.utcnow().date().isoformat()
-        last_date = profile.get('lastCompletedDate')
-        yesterday = (datetime.utcnow() - timedelta(days=1)).date().isoformat()
-
-        if last_date == yesterday:
-            new_streak = profile.get('streak', 0) + 1
-        elif last_date == today:
-            new_streak = profile.get('streak', 1)  # Same day, keep streak
-        else:
-            new_streak = 1  # Streak broken
-
-        streak_bonus = XP_STREAK_BONUS * (new_streak - 1) if new_streak > 1 else 0
-        total_earned = base_xp + streak_bonus
-
-        new_total_xp = int(profile.get('totalXP', 0)) + total_earned
-        new_tasks_completed = profile.get('tasksCompleted', 0) + 1
-        new_high_priority = profile.get('highPriorityCompleted', 0) + (1 if priority == 'high' else 0)
-
-        # Calculate level (100 XP per level)
-        old_level = profile.get('level', 1)
-        new_level = (new_total_xp // 100) + 1
-        level_up = new_level > old_level
-
-        # Days without delete
-        days_no_delete = profile.get('daysWithoutDelete', 0) + 1
-
-        # Check achievements
-        temp_profile = {
-            **profile,
-            'tasksCompleted': new_tasks_completed,
-            'streak': new_streak,
-            'highPriorityCompleted': new_high_priority,
-            'daysWithoutDelete': days_no_delete
-        }
-        unlocked = check_achievements(user_id, temp_profile)
-
-        # Achievement XP bonus
-        achievement_xp = len(unlocked) * 50
-        new_total_xp += achievement_xp
-
-        # Update profile
-        users_table.update_item(
-            Key={'userId': user_id},
-            UpdateExpression='''SET 
-                totalXP = :xp,
-                #lvl = :level,
-                streak = :streak,
-                tasksCompleted = :tasks,
-                highPriorityCompleted = :high,
-                lastCompletedDate = :today,
-                daysWithoutDelete = :noDelete,
-                achievements = list_append(if_not_exists(achievements, :empty), :unlocked)
-            ''',
-            ExpressionAttributeNames={'#lvl': 'level'},
-            ExpressionAttributeValues={
-                ':xp': new_total_xp,
-                ':level': new_level,
-                ':streak': new_streak,
-                ':tasks': new_tasks_completed,
-                ':high': new_high_priority,
-                ':today': today,
-                ':noDelete': days_no_delete,
-                ':unlocked': unlocked,
-                ':empty': []
-            }
-        )
-
-        return {
-            'xp_earned': base_xp,
-            'streak_bonus': streak_bonus,
-            'achievement_xp': achievement_xp,
-            'total_xp': new_total_xp,
-            'new_level': new_level,
-            'level_up': level_up,
-            'streak': new_streak,
-            'unlocked_achievements': [ACHIEVEMENTS[a]['name'] for a in unlocked]
-        }
-    except Exception as e:
-        logger.error(f"Error awarding XP: {e}")
-        return {'xp_earned': 0, 'total_xp': 0, 'streak': 0, 'unlocked_achievements': []}
+    Returns None when the task was no longer pending (nothing is written).
+    """
+    outcome = gamification.complete_task(users_table, user_id, priority, writes)
+    if outcome is not None:
+        gamification.record_metrics(metrics_table, outcome, completed=True)
+    return outcome
 
 
 def penalize_xp(user_id: int, reason: str = 'delete') -> Dict[str, Any]:
     """Penalize XP for deleting task or ignoring reminder"""
     try:
-        profile = get_user_profile(user_id)
-
         penalty = XP_DELETE_PENALTY if reason == 'delete' else XP_IGNORE_PENALTY
-        current_xp = int(profile.get('totalXP', 0))
-        new_xp = max(0, current_xp - penalty)
-
-        # Reset days without delete counter
-        users_table.update_item(
-            Key={'userId': user_id},
-            UpdateExpression='SET totalXP = :xp, daysWithoutDelete = :zero, lastDeleteDate = :today',
-            ExpressionAttributeValues={
-                ':xp': new_xp,
-                ':zero': 0,
-                ':today': datetime.utcnow().date().isoformat()
-            }
-        )
-
-        return {
-            'xp_lost': penalty,
-            'total_xp': new_xp,
-            'reason': reason
-        }
+        outcome = gamification.penalize_xp(users_table, user_id, penalty)
+        gamification.record_metrics(metrics_table, outcome)
+        return {**outcome, 'reason': reason}
     except Exception as e:
         logger.error(f"Error penalizing XP: {e}")
         return {'xp_lost': 0, 'total_xp': 0}
 
 
-def send_telegram_message(user_id: int, text: str, keyboard: dict = None) -> bool:
-    """Send message to Telegram user"""
-    import urllib3
+def reply_payload(user_id: int, text: str, keyboard: dict = None) -> Dict[str, Any]:
+    """sendMessage parameters for a reply to the user"""
+    return message_payload(user_id, text, parse_mode='HTML', reply_markup=keyboard)
 
-    bot_token = get_bot_token()
-    http = urllib3.PoolManager()
 
-    data = {
-        'chat_id': user_id,
-        'text': text,
-        'parse_mode': 'HTML'
-    }
-
-    if keyboard:
-        data['reply_markup'] = json.dumps(keyboard)
-
-    try:
-        response = http.request(
-            'POST',
-            f'https://api.telegram.org/bot{bot_token}/sendMessage',
-            fields=data
-        )
-        return response.status == 200
-    except Exception as e:
-        logger.error(f"Error sending message: {e}")
-        return False
+def send_telegram_message(payload: Dict[str, Any]) -> bool:
+    """Send a reply through the Bot API"""
+    return telegram.call('sendMessage', payload) is not None
 
 
 # Command Handlers
@@ -545,30 +325,50 @@ def handle_help(user_id: int) -> str:
 def handle_tasks_list(user_id: int, filter_tag: str = None) -> str:
     """List tasks with optional tag filter"""
     try:
-        query_params = {
-            'KeyConditionExpression': 'userId = :uid',
-            'FilterExpression': '#status = :status',
-            'ExpressionAttributeNames': {'#status': 'status'},
-            'ExpressionAttributeValues': {':uid': user_id, ':status': 'pending'}
-        }
-
         if filter_tag:
+            # Tag index entries, then one batch read of just those tasks
             tag = filter_tag.replace('#', '')
-            query_params['FilterExpression'] += ' AND contains(tags, :tag)'
-            query_params['ExpressionAttributeValues'][':tag'] = tag
-
-        response = tasks_table.query(**query_params)
-        tasks = response.get('Items', [])
+            keys = [
+                {'userId': user_id, 'taskId': task_id}
+                for task_id in tagged_task_ids(user_index_table, user_id, tag)
+            ]
+            tagged = iter_batch_get(
+                dynamodb, TASKS_TABLE_NAME, keys,
+                ProjectionExpression='taskId, #status, #text, priority, remindAt, tags',
+                ExpressionAttributeNames={'#status': 'status', '#text': 'text'}
+            )
+            pending = sorted(
+                (task for task in tagged if task.get('status') == 'pending'),
+                key=lambda x: status_key('pending', x.get('priority'), x['remindAt'])
+            )
+            total = len(pending)
+            tasks = pending[:MAX_LISTED_TASKS]
+        elif not status_index_enabled():
+            # No status index yet: read every pending task and order it here
+            pending = sorted(
+                iter_query(tasks_table, **status_query(user_id, 'pending')),
+                key=lambda x: status_key('pending', x.get('priority'), x['remindAt'])
+            )
+            total = len(pending)
+            tasks = pending[:MAX_LISTED_TASKS]
+        else:
+            # Pending tasks come back from the status index already ordered
+            # by priority then time, so only the first page or so is read
+            query_params = status_query(user_id, 'pending')
+            tasks = list(iter_query(
+                tasks_table, max_items=MAX_LISTED_TASKS, **query_params
+            ))
+
+            total = len(tasks)
+            if total == MAX_LISTED_TASKS:
+                counts = iter_pages(tasks_table.query, Select='COUNT', **query_params)
+                total = sum(page['Count'] for page in counts)
 
         if not tasks:
             tag_msg = f" with tag {filter_tag}" if filter_tag else ""
             return f"📋 No pending tasks{tag_msg}.\n\nCreate one!"
 
-        # Sort by priority then time
-        priority_order = {'high': 0, 'medium': 1, 'low': 2}
-        tasks.sort(key=lambda x: (priority_order.get(x.get('priority', 'medium'), 1), x['remindAt']))
-
-        output = f"📋 **Your Tasks** ({len(tasks)}):\n\n"
+        output = f"📋 **Your Tasks** ({total}):\n\n"
 
         for task in tasks:
             remind_dt = datetime.fromtimestamp(int(task['remindAt']))
@@ -576,11 +376,15 @@ def handle_tasks_list(user_id: int, filter_tag: str = None) -> str:
             tags = task.get('tags', [])
             tags_str = ' ' + ' '.join(f'#{t}' for t in tags) if tags else ''
 
+            task_ref = task['taskId'][:SHORT_ID_LENGTH]
             output += (
-                f"{priority_emoji} **{task['taskId'][:8]}** {task['text']}{tags_str}\n"
+                f"{priority_emoji} **{task_ref}** {task['text']}{tags_str}\n"
                 f"   ⏰ {remind_dt.strftime('%d.%m.%Y at %H:%M')}\n\n"
             )
 
+        if total > len(tasks):
+            output += f"…and {total - len(tasks)} more\n"
+
         return output
     except Exception as e:
         logger.error(f"Error listing tasks: {e}")
@@ -625,39 +429,107 @@ def handle_profile(user_id: int) -> str:
         return "❌ Error getting profile"
 
 
-def handle_done(user_id: int, task_id: str) -> str:
+def short_id(task_id: str, others: List[str] = ()) -> str:
+    """Shortest prefix (at least SHORT_ID_LENGTH chars) telling task_id apart
+    from others"""
+    length = SHORT_ID_LENGTH
+    while length < len(task_id) and any(
+        other != task_id and other.startswith(task_id[:length]) for other in others
+    ):
+        length += 1
+    return task_id[:length]
+
+
+def resolve_task(user_id: int,
+                 task_ref: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Find a live task by full id or id prefix with one key-range query
+
+    Returns (task, None) on a unique match, otherwise (None, reply) with a
+    not-found message or a list of the candidates to pick from.
+    """
+    task_ref = task_ref.strip().lower()
+    if not task_ref:
+        return None, "⚠️ Task not found"
+
+    matches = list(iter_query(
+        tasks_table,
+        max_items=MAX_PREFIX_MATCHES + 1,
+        KeyConditionExpression=(
+            Key('userId').eq(user_id)
+            & Key('taskId').begins_with(task_ref)
+        ),
+        FilterExpression='#status <> :deleted',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={':deleted': DELETED_STATUS}
+    ))
+
+    if not matches:
+        return None, "⚠️ Task not found"
+    if len(matches) == 1 or matches[0]['taskId'] == task_ref:
+        return matches[0], None
+
+    ids = [task['taskId'] for task in matches]
+    lines = [
+        f"• **{short_id(task['taskId'], ids)}** {task.get('text', '')}"
+        for task in matches[:MAX_PREFIX_MATCHES]
+    ]
+    more = "\n…and more" if len(matches) > MAX_PREFIX_MATCHES else ""
+    return None, (
+        f"🤔 Several tasks start with {task_ref}:\n\n"
+        + '\n'.join(lines) + more
+        + "\n\nPlease use a longer ID."
+    )
+
+
+def handle_done(user_id: int, task_ref: str) -> str:
     """Mark task as complete and award XP"""
     try:
-        # Get task first to know priority
-        response = tasks_table.get_item(Key={'userId': user_id, 'taskId': task_id})
-        if 'Item' not in response:
-            return "⚠️ Task not found"
-
-        task = response['Item']
+        task, reply = resolve_task(user_id, task_ref)
+        if not task:
+            return reply
+        task_id = task['taskId']
         priority = task.get('priority', 'medium')
-
-        # Mark as done
-        tasks_table.update_item(
-            Key={'userId': user_id, 'taskId': task_id},
-            UpdateExpression='SET #status = :done, completedAt = :now',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={
+        if task.get('status') != 'pending':
+            return "✅ Task is already completed"
+
+        # Mark as done; tag index, stats rollup and XP change in one transaction
+        completed_at = Decimal(str(datetime.utcnow().timestamp()))
+        completion = {'Update': {
+            'TableName': TASKS_TABLE_NAME,
+            'Key': {'userId': user_id, 'taskId': task_id},
+            'UpdateExpression': (
+                'SET #status = :done, completedAt = :now, updatedAt = :version, '
+                'statusKey = :status_key '
+                'REMOVE remindBucket'
+            ),
+            'ConditionExpression': '#status = :pending',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': {
+                ':pending': 'pending',
                 ':done': 'done',
-                ':now': Decimal(str(datetime.utcnow().timestamp()))
+                ':now': completed_at,
+                ':version': change_version(),
+                ':status_key': status_key(
+                    'done', task.get('priority'), task.get('remindAt')
+                )
             }
-        )
-
-        # Award XP using local gamification system
-        gamification = award_xp(user_id, priority)
-
-        xp_earned = gamification.get('xp_earned', 0)
-        streak_bonus = gamification.get('streak_bonus', 0)
-        achievement_xp = gamification.get('achievement_xp', 0)
-        total_xp = gamification.get('total_xp', 0)
-        new_level = gamification.get('new_level', 1)
-        level_up = gamification.get('level_up', False)
-        streak = gamification.get('streak', 0)
-        unlocked = gamification.get('unlocked_achievements', [])
+        }}
+        tags = task.get('tags', [])
+        index_writes = tag_index_writes(user_id, task_id, tags, -1) + stats_writes(
+            user_id, pending=-1, completed=1, tags=tags
+        ) + activity_writes(user_id, completed_at)
+        outcome = complete_and_award(user_id, priority, [completion, *index_writes])
+        if outcome is None:
+            return "✅ Task is already completed"
+
+        xp_earned = outcome.get('xp_earned', 0)
+        streak_bonus = outcome.get('streak_bonus', 0)
+        achievement_xp = outcome.get('achievement_xp', 0)
+        total_xp = outcome.get('total_xp', 0)
+        new_level = outcome.get('new_level', 1)
+        level_up = outcome.get('level_up', False)
+        streak = outcome.get('streak', 0)
+        unlocked = outcome.get('unlocked_achievements', [])
 
         response_msg = "✅ Task completed!\n\n"
         response_msg += f"+{xp_earned} XP"
@@ -685,15 +557,25 @@ def handle_done(user_id: int, task_id: str) -> str:
         return "⚠️ Error completing task"
 
 
-def handle_delete_task(user_id: int, task_id: str) -> str:
+def handle_delete_task(user_id: int, task_ref: str) -> str:
     """Delete task and penalize XP"""
     try:
-        # Check if task exists
-        response = tasks_table.get_item(Key={'userId': user_id, 'taskId': task_id})
-        if 'Item' not in response:
-            return "⚠️ Task not found"
-
-        task = response['Item']
+        task, reply = resolve_task(user_id, task_ref)
+        if not task:
+            return reply
+        task_id = task['taskId']
+
+        # Delete the task (tombstone, so the mini app's delta sync sees it)
+        tags = task.get('tags', [])
+        if task.get('status') == 'pending':
+            index_writes = tag_index_writes(user_id, task_id, tags, -1) + stats_writes(
+                user_id, pending=-1
+            )
+        else:
+            index_writes = stats_writes(user_id, completed=-1, tags=tags)
+        tombstone = tombstone_write(TASKS_TABLE_NAME, user_id, task_id, task['status'])
+        if not write_task(tasks_table, tombstone, index_writes):
+            return "⚠️ Task was just changed, try again"
 
         # Only penalize if task was not completed
         if task.get('status') != 'done':
@@ -704,9 +586,6 @@ def handle_delete_task(user_id: int, task_id: str) -> str:
             xp_lost = 0
             total_xp = None
 
-        # Delete the task
-        tasks_table.delete_item(Key={'userId': user_id, 'taskId': task_id})
-
         if xp_lost > 0:
             return f"🗑️ Task deleted\n\n⚠️ -{xp_lost} XP penalty\n\n💎 Total XP: {total_xp}"
         else:
@@ -717,15 +596,46 @@ def handle_delete_task(user_id: int, task_id: str) -> str:
         return "⚠️ Error deleting task"
 
 
-def handle_snooze(user_id: int, task_id: str, delay: str) -> str:
+def handle_snooze(user_id: int, task_ref: str, delay: str) -> str:
     """Snooze task"""
     try:
+        task, reply = resolve_task(user_id, task_ref)
+        if not task:
+            return reply
+        task_id = task['taskId']
+
         new_timestamp = parse_snooze_delay(delay)
-        tasks_table.update_item(
-            Key={'userId': user_id, 'taskId': task_id},
-            UpdateExpression='SET remindAt = :new_time',
-            ExpressionAttributeValues={':new_time': Decimal(str(new_timestamp))}
+        update_expression = (
+            'SET remindAt = :new_time, updatedAt = :version, statusKey = :status_key'
         )
+        values = {
+            ':new_time': Decimal(str(new_timestamp)),
+            ':version': change_version(),
+            ':status_key': status_key(
+                task['status'], task.get('priority'), new_timestamp
+            ),
+            ':status': task['status']
+        }
+
+        # Only pending tasks go back into a dispatch bucket; a done task in
+        # one would never be flagged notified and would stay indexed for good
+        if bucket_dispatch_enabled() and task['status'] == 'pending':
+            update_expression += ', remindBucket = :bucket, notified = :false'
+            values[':bucket'] = remind_bucket(new_timestamp, user_id)
+            values[':false'] = False
+
+        try:
+            tasks_table.update_item(
+                Key={'userId': user_id, 'taskId': task_id},
+                UpdateExpression=update_expression,
+                # Still the task that was read: never conjure one up from a
+                # mistyped id, nor re-bucket one completed or deleted meanwhile
+                ConditionExpression='#status = :status',
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues=values
+            )
+        except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+            return "⚠️ Task was just changed, try again"
         new_dt = datetime.fromtimestamp(new_timestamp)
         return f"⏰ Task snoozed!\nNew time: {new_dt.strftime('%d.%m.%Y в %H:%M')}"
     except Exception as e:
@@ -736,21 +646,14 @@ def handle_snooze(user_id: int, task_id: str, delay: str) -> str:
 def handle_tags_list(user_id: int) -> str:
     """List all user tags"""
     try:
-        response = tasks_table.query(
-            KeyConditionExpression='userId = :uid',
-            FilterExpression='#status = :status',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={':uid': user_id, ':status': 'pending'}
-        )
+        counts = tag_counts(user_index_table, user_id)
 
-        all_tags = set()
-        for task in response.get('Items', []):
-            all_tags.update(task.get('tags', []))
-
-        if not all_tags:
+        if not counts:
             return "🏷️ No tags yet.\nAdd #tag in task text!"
 
-        tags_list = ' '.join(f'#{tag}' for tag in sorted(all_tags))
+        tags_list = ' '.join(
+            f'#{tag} ({count})' for tag, count in sorted(counts.items())
+        )
         return f"🏷️ Your tags:\n{tags_list}\n\nUse: /tasks #tag"
     except Exception as e:
         logger.error(f"Error listing tags: {e}")
@@ -760,32 +663,20 @@ def handle_tags_list(user_id: int) -> str:
 def handle_stats(user_id: int) -> str:
     """Show user statistics (Phase 2)"""
     try:
-        # Get all tasks
-        response = tasks_table.query(KeyConditionExpression='userId = :uid',
-                                     ExpressionAttributeValues={':uid': user_id})
-
-        all_tasks = response.get('Items', [])
-        completed = [t for t in all_tasks if t['status'] == 'done']
-        pending = [t for t in all_tasks if t['status'] == 'pending']
-
-        # This week
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        week_completed = [t for t in completed
-                         if datetime.fromtimestamp(int(t.get('completedAt', 0))) > week_ago]
+        # Precomputed rollup: one read however many tasks the user has
+        stats = get_stats(user_index_table, user_id)
+        completed = stats['completed']
+        pending = stats['pending']
+        week_completed = stats['week_completed']
 
-        # By tags
-        tag_counts = {}
-        for task in completed:
-            for tag in task.get('tags', []):
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
-
-        tags_str = '\n'.join(f"#{tag}: {count}" for tag, count in sorted(tag_counts.items(), key=lambda x: -x[1])[:5])
+        top_tags = sorted(stats['tags'].items(), key=lambda x: -x[1])[:5]
+        tags_str = '\n'.join(f"#{tag}: {count}" for tag, count in top_tags)
 
         return (
             f"📊 **Your Statistics**\n\n"
-            f"✅ Total completed: {len(completed)}\n"
-            f"⏳ Pending: {len(pending)}\n"
-            f"📈 This week: {len(week_completed)}\n\n"
+            f"✅ Total completed: {completed}\n"
+            f"⏳ Pending: {pending}\n"
+            f"📈 This week: {week_completed}\n\n"
             f"**Top tags:**\n{tags_str if tags_str else 'No tags yet'}\n\n"
             f"Keep it up! 💪"
         )
@@ -855,14 +746,24 @@ def handle_create_task(user_id: int, text: str, priority: str = 'medium') -> str
             'createdAt': int(datetime.utcnow().timestamp()),
             'priority': priority,
             'tags': tags if tags else [],
-            'notified': False
+            'notified': False,
+            'updatedAt': change_version(),
+            'statusKey': status_key('pending', priority, remind_at),
+            **bucket_fields(user_id, remind_at)
         }
 
-        # Save to DynamoDB
-        tasks_table.put_item(Item=task_item)
+        # Save to DynamoDB together with its tag index entries
+        write_task(
+            tasks_table,
+            {'Put': {'TableName': TASKS_TABLE_NAME, 'Item': task_item}},
+            tag_index_writes(user_id, task_id, task_item['tags'], 1)
+            + stats_writes(user_id, pending=1)
+        )
+        metrics.increment_daily(metrics_table, {'tasksCreated': 1})
 
-        # NEW: Schedule reminder via EventBridge
-        schedule_reminder(user_id, task_id, remind_at)
+        # Bucket mode is picked up by the per-minute dispatcher instead
+        if not bucket_dispatch_enabled():
+            schedule_reminder(user_id, task_id, remind_at)
 
         # Send confirmation with task details
         priority_emoji = get_priority_emoji(priority)
@@ -872,15 +773,137 @@ def handle_create_task(user_id: int, text: str, priority: str = 'medium') -> str
             f"✅ Task created!\n\n"
             f"{priority_emoji} **{text}**{tags_str}\n"
             f"⏰ {parsed_dt.strftime('%d.%m.%Y at %H:%M')}\n\n"
-            f"ID: {task_id[:8]}"
+            f"ID: {task_id[:SHORT_ID_LENGTH]}"
         )
     except Exception as e:
         logger.error(f"Error creating task: {e}", exc_info=True)
         return "❌ Error creating task"
 
 
+def process_update(user_id: int, text: str) -> Dict[str, Any]:
+    """Route one text message; returns the reply as sendMessage parameters"""
+    metrics.mark_active(user_index_table, metrics_table, user_id)
+
+    # Route commands
+    if text.startswith('/start'):
+        response = handle_start(user_id)
+    elif text.startswith('/help'):
+        response = handle_help(user_id)
+    elif text.startswith('/app'):
+        app_data = handle_app(user_id)
+        return reply_payload(user_id, app_data['text'], app_data.get('keyboard'))
+    elif text.startswith('/tasks'):
+        parts = text.split()
+        filter_tag = parts[1] if len(parts) > 1 and parts[1].startswith('#') else None
+        response = handle_tasks_list(user_id, filter_tag)
+    elif text.startswith('/done'):
+        task_id = text.replace('/done', '').strip()
+        response = handle_done(user_id, task_id)
+    elif text.startswith('/urgent'):
+        task_text = text.replace('/urgent', '').strip()
+        response = handle_create_task(user_id, task_text, priority='high')
+    elif text.startswith('/snooze'):
+        parts = text.split()
+        if len(parts) >= 3:
+            task_id = parts[1]
+            delay = ' '.join(parts[2:])  # "2 дня", "in 2 hours"...
+            response = handle_snooze(user_id, task_id, delay)
+        else:
+            response = "Usage: /snooze <task_id> <delay>\nExample: /snooze abc123 1h"
+    elif text.startswith('/delete'):
+        task_id = text.replace('/delete', '').strip()
+        if task_id:
+            response = handle_delete_task(user_id, task_id)
+        else:
+            response = "Usage: /delete <task_id>\nExample: /delete abc123"
+    elif text.startswith('/tags'):
+        response = handle_tags_list(user_id)
+    elif text.startswith('/stats'):
+        response = handle_stats(user_id)
+    elif text.startswith('/profile'):
+        response = handle_profile(user_id)
+    elif text.startswith('/ai'):
+        task_text = text.replace('/ai', '').strip()
+        if task_text:
+            response = handle_ai_analyze(user_id, task_text)
+        else:
+            response = (
+                "Usage: /ai <task description>\n"
+                "Example: /ai Prepare presentation for Monday"
+            )
+    else:
+        response = handle_create_task(user_id, text)
+
+    return reply_payload(user_id, response)
+
+
+def queue_processing_enabled() -> bool:
+    """True when webhook calls are acked at once and processed by the queue worker"""
+    mode = os.environ.get('WEBHOOK_PROCESSING_MODE', 'sync')
+    return mode == 'queue' and bool(UPDATE_QUEUE_URL)
+
+
+def enqueue_update(body: Dict[str, Any], user_id: int) -> None:
+    """Hand an update to the worker; one message group per chat keeps its order"""
+    dedupe_id = body.get('update_id')
+    if dedupe_id is None:
+        encoded = json.dumps(body, sort_keys=True).encode()
+        dedupe_id = hashlib.sha256(encoded).hexdigest()
+    sqs_client.send_message(
+        QueueUrl=UPDATE_QUEUE_URL,
+        MessageBody=json.dumps(body),
+        MessageGroupId=str(user_id),
+        MessageDeduplicationId=str(dedupe_id)
+    )
+
+
+def handle_update_batch(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """SQS FIFO batch from the update queue, processed in order
+
+    A failed update (including a reply Telegram did not accept) is retried,
+    and so is every later message of its chat's group in the batch, so none
+    of them overtakes the one being retried. Other chats carry on.
+    """
+    failed_groups = set()
+    failures = []
+    for record in records:
+        group = record.get('attributes', {}).get('MessageGroupId')
+        if group in failed_groups:
+            failures.append({'itemIdentifier': record['messageId']})
+            continue
+
+        try:
+            message = json.loads(record['body'])['message']
+            user_id, text = message['from']['id'], message['text']
+        except (KeyError, TypeError, ValueError) as e:
+            # Malformed messages will never succeed; drop instead of retrying forever
+            logger.error(
+                f"Dropping malformed update message {record.get('messageId')}: {e}"
+            )
+            continue
+
+        try:
+            if not send_telegram_message(process_update(user_id, text)):
+                raise RuntimeError(f"Reply to chat {user_id} was not sent")
+        except Exception as e:
+            logger.error(f"Update processing failed: {e}", exc_info=True)
+            failed_groups.add(group)
+            failures.append({'itemIdentifier': record['messageId']})
+    return {'batchItemFailures': failures}
+
+
+@telegram.log_connection_reuse
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    """Main Lambda handler"""
+    """Main Lambda handler
+
+    API Gateway events are Telegram webhook calls. In `queue` mode they are
+    only de-duplicated and enqueued; the SQS event (Records) is the worker
+    side that does the actual processing.
+    """
+    if 'Records' in event:
+        return handle_update_batch(event['Records'])
+
+    update_id = None
     try:
         logger.info(f"Received event: {json.dumps(event)}")
 
@@ -892,59 +915,24 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if not user_id or not text:
             return {'statusCode': 200, 'body': json.dumps({'ok': True})}
 
-        # Route commands
-        if text.startswith('/start'):
-            response = handle_start(user_id)
-        elif text.startswith('/help'):
-            response = handle_help(user_id)
-        elif text.startswith('/app'):
-            app_data = handle_app(user_id)
-            send_telegram_message(user_id, app_data['text'], app_data.get('keyboard'))
-            return {'statusCode': 200, 'body': json.dumps({'ok': True})}
-        elif text.startswith('/tasks'):
-            parts = text.split()
-            filter_tag = parts[1] if len(parts) > 1 and parts[1].startswith('#') else None
-            response = handle_tasks_list(user_id, filter_tag)
-        elif text.startswith('/done'):
-            task_id = text.replace('/done', '').strip()
-            response = handle_done(user_id, task_id)
-        elif text.startswith('/urgent'):
-            task_text = text.replace('/urgent', '').strip()
-            response = handle_create_task(user_id, task_text, priority='high')
-        elif text.startswith('/snooze'):
-            parts = text.split()
-            if len(parts) >= 3:
-                task_id = parts[1]
-                delay = parts[2]
-                response = handle_snooze(user_id, task_id, delay)
-            else:
-                response = "Usage: /snooze <task_id> <delay>\nExample: /snooze abc123 1h"
-        elif text.startswith('/delete'):
-            task_id = text.replace('/delete', '').strip()
-            if task_id:
-                response = handle_delete_task(user_id, task_id)
-            else:
-                response = "Usage: /delete <task_id>\nExample: /delete abc123"
-        elif text.startswith('/tags'):
-            response = handle_tags_list(user_id)
-        elif text.startswith('/stats'):
-            response = handle_stats(user_id)
-        elif text.startswith('/profile'):
-            response = handle_profile(user_id)
-        elif text.startswith('/ai'):
-            task_text = text.replace('/ai', '').strip()
-            if task_text:
-                response = handle_ai_analyze(user_id, task_text)
-            else:
-                response = "Usage: /ai <task description>\nExample: /ai Prepare presentation for Monday"
-        else:
-            response = handle_create_task(user_id, text)
+        if body.get('update_id') is not None:
+            if not updates.claim(body['update_id']):
+                logger.info(f"Skipping redelivered update {body['update_id']}")
+                return {'statusCode': 200, 'body': json.dumps({'ok': True})}
+            update_id = body['update_id']
 
-        send_telegram_message(user_id, response)
+        if queue_processing_enabled():
+            enqueue_update(body, user_id)
+            return {'statusCode': 200, 'body': json.dumps({'ok': True})}
 
+        reply = process_update(user_id, text)
+        if INLINE_REPLIES and text.startswith(INLINE_COMMANDS):
+            return webhook_reply('sendMessage', reply)
+        send_telegram_message(reply)
         return {'statusCode': 200, 'body': json.dumps({'ok': True})}
 
-
     except Exception as e:
         logger.error(f"Error in lambda_handler: {e}", exc_info=True)
+        if update_id is not None:
+            updates.release(update_id)  # Let Telegram's retry through
         return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
@@ -0,0 +1,4 @@
+"""
+TaskBot Core - shared code for all TaskBot Lambda functions
+Shipped as a Lambda layer and imported as `taskbot_core`
+"""
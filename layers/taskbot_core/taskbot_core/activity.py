@@ -0,0 +1,71 @@
+"""
+Per-month activity items
+Completions per day live in one small item per user and month in the user
+index table (`activity#YYYY-MM`, one `dNN` counter per day). A completion
+is a single ADD on its day slot, the profile item no longer grows, and the
+heatmap reads only the months it shows. Old months expire via TTL
+"""
+
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from boto3.dynamodb.conditions import Key
+
+from taskbot_core.dynamo import iter_query
+from taskbot_core.tables import USER_INDEX_TABLE
+
+ACTIVITY_PREFIX = 'activity#'
+MONTH_FORMAT = '%Y-%m'
+RETENTION_SECONDS = 400 * 24 * 3600  # Counted from the end of the month
+DEFAULT_DAYS = 60  # What the Mini App heatmap shows
+MAX_DAYS = 366
+
+
+def month_key(day: date) -> str:
+    return f"{ACTIVITY_PREFIX}{day.strftime(MONTH_FORMAT)}"
+
+
+def expires_at(day: date) -> int:
+    last_day = calendar.monthrange(day.year, day.month)[1]
+    month_end = datetime(day.year, day.month, last_day) + timedelta(days=1)
+    return int(calendar.timegm(month_end.timetuple())) + RETENTION_SECONDS
+
+
+def activity_writes(user_id: int,
+                    completed_at: Optional[float] = None) -> List[Dict[str, Any]]:
+    """TransactItems counting one completion on its (UTC) day"""
+    if completed_at:
+        day = datetime.utcfromtimestamp(float(completed_at))
+    else:
+        day = datetime.utcnow()
+    return [{'Update': {
+        'TableName': USER_INDEX_TABLE,
+        'Key': {'userId': user_id, 'indexKey': month_key(day)},
+        'UpdateExpression': (
+            'ADD #day :one SET expiresAt = if_not_exists(expiresAt, :expires)'
+        ),
+        'ExpressionAttributeNames': {'#day': f"d{day.day:02d}"},
+        'ExpressionAttributeValues': {':one': 1, ':expires': expires_at(day)}
+    }}]
+
+
+def get_activity(index_table, user_id: int, start: date, end: date) -> Dict[str, int]:
+    """Completions per ISO day in [start, end], reading only the months involved"""
+    items = iter_query(
+        index_table,
+        KeyConditionExpression=Key('userId').eq(user_id) & Key('indexKey').between(
+            month_key(start), month_key(end)
+        )
+    )
+
+    activity = {}
+    for item in items:
+        month = item['indexKey'][len(ACTIVITY_PREFIX):]
+        for name, count in item.items():
+            if not (name.startswith('d') and name[1:].isdigit()) or not count:
+                continue
+            day = f"{month}-{name[1:]}"
+            if start.isoformat() <= day <= end.isoformat():
+                activity[day] = int(count)
+    return activity
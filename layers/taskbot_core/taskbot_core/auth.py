@@ -0,0 +1,87 @@
+"""
+Telegram Mini App authentication
+initData is checked the way Telegram documents it: every received field
+except `hash`, URL-decoded, sorted by key and joined with newlines, signed
+with the WebApp key derived from the bot token. The key comes from the
+shared SecretCache and verified strings are remembered in a SessionCache,
+so a warm container validates a session once
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+from typing import Dict, Optional
+from urllib.parse import parse_qsl
+
+from taskbot_core.secret_cache import SecretCache, webapp_secret_key
+from taskbot_core.sessions import SessionCache
+
+logger = logging.getLogger()
+
+
+def data_check_string(fields: Dict[str, str]) -> str:
+    """String Telegram signs: sorted `key=value` lines, `hash` excluded"""
+    return '\n'.join(f"{k}={fields[k]}" for k in sorted(fields) if k != 'hash')
+
+
+def verify_init_data(init_data: str, secret_key: bytes) -> Optional[Dict[str, str]]:
+    """Decoded initData fields if the signature matches, otherwise None"""
+    fields = dict(parse_qsl(init_data, keep_blank_values=True))
+    received_hash = fields.get('hash')
+    if not received_hash:
+        return None
+
+    calculated_hash = hmac.new(
+        secret_key, data_check_string(fields).encode(), hashlib.sha256
+    ).hexdigest()
+    if not hmac.compare_digest(calculated_hash, received_hash):
+        return None
+    return fields
+
+
+class InitDataValidator:
+    """validate(initData) -> Telegram user id, or None if it must be rejected"""
+
+    def __init__(self, secrets: SecretCache, bot_token_secret: str,
+                 sessions: Optional[SessionCache] = None):
+        self.secrets = secrets
+        self.bot_token_secret = bot_token_secret
+        self.sessions = sessions if sessions is not None else SessionCache()
+
+    def secret_key(self) -> Optional[bytes]:
+        """HMAC key for initData, derived from the cached bot token"""
+        try:
+            return self.secrets.derived(self.bot_token_secret, webapp_secret_key)
+        except Exception as e:
+            logger.error(f"Error getting bot token: {e}")
+            return None
+
+    def validate(self, init_data: str) -> Optional[int]:
+        user_id = self.sessions.get(init_data)
+        if user_id is not None:
+            return user_id
+
+        secret_key = self.secret_key()
+        if secret_key is None:
+            return None
+
+        try:
+            fields = verify_init_data(init_data, secret_key)
+            if fields is None:
+                return None
+
+            auth_date = int(fields.get('auth_date', 0))
+            if not self.sessions.is_fresh(auth_date):
+                logger.warning(
+                    "Rejected stale initData (auth_date outside the freshness window)"
+                )
+                return None
+
+            user_id = json.loads(fields.get('user', '{}')).get('id')
+            if user_id:
+                self.sessions.put(init_data, user_id, auth_date)
+            return user_id
+        except Exception as e:
+            logger.error(f"Auth validation error: {e}")
+            return None
@@ -0,0 +1,88 @@
+"""
+Lazy AWS clients
+boto3 clients, the DynamoDB resource and Table objects are built on first
+use and memoised per container, so a cold start only pays for what the
+first request actually touches. Module-level names stay usable through
+`Lazy` stand-ins (e.g. `tasks_table = lazy_table(TASKS_TABLE_NAME)`)
+"""
+
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+_cache: Dict[Tuple[str, str], Any] = {}
+_lock = threading.RLock()  # boto3's default session is not thread-safe
+
+
+def _memoised(key: Tuple[str, str], build: Callable[[], Any]) -> Any:
+    try:
+        return _cache[key]
+    except KeyError:
+        pass
+    with _lock:
+        if key not in _cache:
+            _cache[key] = build()
+        return _cache[key]
+
+
+def client(service: str) -> Any:
+    """Shared boto3 client for `service`"""
+    def build():
+        import boto3
+        return boto3.client(service)
+    return _memoised(('client', service), build)
+
+
+def resource(service: str = 'dynamodb') -> Any:
+    """Shared boto3 resource for `service`"""
+    def build():
+        import boto3
+        return boto3.resource(service)
+    return _memoised(('resource', service), build)
+
+
+def table(name: str) -> Any:
+    """Shared DynamoDB Table object"""
+    return _memoised(('table', name), lambda: resource('dynamodb').Table(name))
+
+
+class Lazy:
+    """Stand-in that builds the real object on first attribute access"""
+
+    __slots__ = ('_factory', '_target')
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_target', None)
+
+    def _resolve(self) -> Any:
+        target = object.__getattribute__(self, '_target')
+        if target is None:
+            target = object.__getattribute__(self, '_factory')()
+            object.__setattr__(self, '_target', target)
+        return target
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __repr__(self) -> str:
+        target = object.__getattribute__(self, '_target')
+        return f"Lazy({target!r})" if target is not None else 'Lazy(<not built>)'
+
+
+def lazy_client(service: str) -> Any:
+    return Lazy(lambda: client(service))
+
+
+def lazy_table(name: str) -> Any:
+    return Lazy(lambda: table(name))
+
+
+def built() -> Dict[str, int]:
+    """How many clients/resources/tables this container has constructed"""
+    counts = {'client': 0, 'resource': 0, 'table': 0}
+    for kind, _ in list(_cache):
+        counts[kind] += 1
+    return counts
@@ -0,0 +1,66 @@
+"""
+Telegram update de-duplication
+Telegram re-delivers an update when the webhook is slow or fails. Each
+update_id is claimed with a conditional put into a small TTL table before
+it is routed, with an in-memory LRU in front for warm containers, so a
+retry is answered without touching any task or profile
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger()
+
+PROCESSED_UPDATES_TABLE = os.environ.get(
+    'PROCESSED_UPDATES_TABLE_NAME', 'telegram-bot-processed-updates'
+)
+UPDATE_TTL_SECONDS = 2 * 24 * 3600  # Telegram keeps undelivered updates for 24h
+MAX_RECENT_UPDATES = 2048
+
+
+class UpdateDeduper:
+    """claim() an update_id once; release() it again if processing failed"""
+
+    def __init__(self, table, max_recent: int = MAX_RECENT_UPDATES,
+                 ttl: int = UPDATE_TTL_SECONDS):
+        self.table = table
+        self.max_recent = max_recent
+        self.ttl = ttl
+        self._recent: 'OrderedDict[int, None]' = OrderedDict()
+
+    def _remember(self, update_id: int) -> None:
+        self._recent[update_id] = None
+        self._recent.move_to_end(update_id)
+        if len(self._recent) > self.max_recent:
+            self._recent.popitem(last=False)
+
+    def claim(self, update_id: int) -> bool:
+        """True the first time an update is seen, False for a redelivery"""
+        if update_id in self._recent:
+            return False
+
+        try:
+            self.table.put_item(
+                Item={'updateId': update_id, 'expiresAt': int(time.time()) + self.ttl},
+                ConditionExpression='attribute_not_exists(updateId)'
+            )
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            self._remember(update_id)
+            return False
+        except Exception as e:
+            # Without the table we would rather risk a duplicate than drop a message
+            logger.warning(f"Update dedupe unavailable, processing {update_id}: {e}")
+            return True
+
+        self._remember(update_id)
+        return True
+
+    def release(self, update_id: int) -> None:
+        """Forget a claim so Telegram's retry of a failed update is processed"""
+        self._recent.pop(update_id, None)
+        try:
+            self.table.delete_item(Key={'updateId': update_id})
+        except Exception as e:
+            logger.warning(f"Could not release update {update_id}: {e}")
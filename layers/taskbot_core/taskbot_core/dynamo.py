@@ -0,0 +1,90 @@
+"""
+DynamoDB pagination helpers
+Generators that follow LastEvaluatedKey lazily, one page at a time,
+so callers never silently stop at the 1 MB page boundary
+"""
+
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+BATCH_GET_LIMIT = 100
+
+
+def iter_pages(operation: Callable[..., Dict[str, Any]],
+               max_pages: Optional[int] = None, **kwargs) -> Iterator[Dict[str, Any]]:
+    """Yield raw response pages of a query/scan until exhausted or max_pages"""
+    pages = 0
+    while max_pages is None or pages < max_pages:
+        response = operation(**kwargs)
+        pages += 1
+        yield response
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+def iter_items(operation: Callable[..., Dict[str, Any]],
+               max_items: Optional[int] = None, max_pages: Optional[int] = None,
+               **kwargs) -> Iterator[Dict[str, Any]]:
+    """Yield items across pages, stopping after max_items / max_pages if given"""
+    if max_items is not None and max_items <= 0:
+        return
+
+    count = 0
+    for page in iter_pages(operation, max_pages=max_pages, **kwargs):
+        for item in page.get('Items', []):
+            yield item
+            count += 1
+            if max_items is not None and count >= max_items:
+                return
+
+
+def iter_query(table, max_items: Optional[int] = None, max_pages: Optional[int] = None,
+               **kwargs) -> Iterator[Dict[str, Any]]:
+    """Stream every item matching a Table.query"""
+    return iter_items(table.query, max_items=max_items, max_pages=max_pages, **kwargs)
+
+
+def iter_scan(table, max_items: Optional[int] = None, max_pages: Optional[int] = None,
+              **kwargs) -> Iterator[Dict[str, Any]]:
+    """Stream every item of a Table.scan"""
+    return iter_items(table.scan, max_items=max_items, max_pages=max_pages, **kwargs)
+
+
+def iter_batch_get(dynamodb, table_name: str, keys: List[Dict[str, Any]],
+                   max_attempts: int = 5,
+                   unprocessed: Optional[List[Dict[str, Any]]] = None,
+                   **kwargs) -> Iterator[Dict[str, Any]]:
+    """Yield items for `keys` via BatchGetItem, 100 keys per call, retrying
+    unprocessed keys
+
+    Keys still unprocessed after max_attempts are appended to `unprocessed`
+    when given; otherwise a RuntimeError is raised once the rest is yielded.
+    """
+    unique = list({tuple(sorted(key.items())): key for key in keys}.values())
+    leftover = []
+
+    for start in range(0, len(unique), BATCH_GET_LIMIT):
+        chunk = unique[start:start + BATCH_GET_LIMIT]
+        request = {table_name: {'Keys': chunk, **kwargs}}
+        for attempt in range(max_attempts):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            yield from response.get('Responses', {}).get(table_name, [])
+
+            request = response.get('UnprocessedKeys') or {}
+            if not request:
+                break
+            if attempt + 1 < max_attempts:
+                time.sleep(min(0.05 * 2 ** attempt, 1))
+        else:
+            leftover.extend(request.get(table_name, {}).get('Keys', []))
+
+    if not leftover:
+        return
+    if unprocessed is None:
+        raise RuntimeError(
+            f"{len(leftover)} keys still unprocessed after {max_attempts} attempts"
+        )
+    unprocessed.extend(leftover)
@@ -0,0 +1,362 @@
+"""
+XP engine
+Awards and penalties are a single conditional update_item: counters move
+with ADD, the derived fields (level, streak, achievements) are computed
+from the last known profile and guarded by its `version`. A stale guess
+fails the condition, DynamoDB hands back the current item, and we retry
+once from that, so no separate read is ever needed
+"""
+
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+from taskbot_core import metrics
+
+logger = logging.getLogger()
+
+XP_REWARDS = {'low': 10, 'medium': 20, 'high': 30}
+XP_STREAK_BONUS = 5
+XP_DELETE_PENALTY = 10
+XP_IGNORE_PENALTY = 15
+XP_PER_LEVEL = 100
+ACHIEVEMENT_XP = 50
+
+ACHIEVEMENTS = {
+    'first_task': {'name': '🎯 First Task', 'description': 'Complete your first task'},
+    'week_streak': {'name': '🔥 Week Warrior', 'description': '7-day streak'},
+    'early_bird': {'name': '🌅 Early Bird', 'description': 'Complete task before 8:00'},
+    'night_owl': {'name': '🦉 Night Owl', 'description': 'Complete task after 22:00'},
+    'century': {'name': '💯 Centurion', 'description': 'Complete 100 tasks'},
+    'priority_master': {
+        'name': '⚡ Priority Master', 'description': '10 high priority tasks'
+    },
+    'no_quit': {'name': '💪 No Quit', 'description': '30 days without deleting tasks'}
+}
+
+# Stored the first time a user opens their profile
+DEFAULT_PROFILE = {
+    'level': 1,
+    'totalXP': 0,
+    'streak': 0,
+    'tasksCompleted': 0,
+    'highPriorityCompleted': 0,
+    'achievements': [],
+    'lastCompletedDate': None,
+    'lastDeleteDate': None,
+    'daysWithoutDelete': 0
+}
+
+MAX_ATTEMPTS = 4
+MAX_CACHED_PROFILES = 1000
+
+# Last profile this container saw per user: a warm hit makes the first
+# conditional write succeed, so the common case is one round trip
+_profiles: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+_deserializer = TypeDeserializer()
+
+
+def remember_profile(profile: Optional[Dict[str, Any]]) -> None:
+    """Cache a profile read or written elsewhere (e.g. by /profile)"""
+    if not profile or 'userId' not in profile:
+        return
+    user_id = int(profile['userId'])
+    _profiles[user_id] = profile
+    _profiles.move_to_end(user_id)
+    if len(_profiles) > MAX_CACHED_PROFILES:
+        _profiles.popitem(last=False)
+
+
+def default_profile(user_id: int) -> Dict[str, Any]:
+    return {'userId': user_id, **DEFAULT_PROFILE, 'achievements': []}
+
+
+def get_profile(users_table, user_id: int) -> Tuple[Dict[str, Any], bool]:
+    """(profile, created): the stored profile, or a freshly stored default
+
+    The default is only written if no profile exists yet, so a completion
+    racing the first /profile is never overwritten.
+    """
+    item = users_table.get_item(Key={'userId': user_id}).get('Item')
+    created = False
+    if item is None:
+        item = default_profile(user_id)
+        try:
+            users_table.put_item(
+                Item=item, ConditionExpression='attribute_not_exists(userId)'
+            )
+            created = True
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            item = users_table.get_item(
+                Key={'userId': user_id}, ConsistentRead=True
+            )['Item']
+    remember_profile(item)
+    return item, created
+
+
+def check_achievements(profile: Dict[str, Any], current_hour: int = None) -> List[str]:
+    """Achievement ids the profile now qualifies for but has not unlocked"""
+    unlocked = []
+    current_achievements = profile.get('achievements', [])
+
+    tasks_completed = profile.get('tasksCompleted', 0)
+    streak = profile.get('streak', 0)
+    high_priority = profile.get('highPriorityCompleted', 0)
+    days_no_delete = profile.get('daysWithoutDelete', 0)
+
+    if current_hour is None:
+        current_hour = datetime.utcnow().hour
+
+    if 'first_task' not in current_achievements and tasks_completed >= 1:
+        unlocked.append('first_task')
+    if 'week_streak' not in current_achievements and streak >= 7:
+        unlocked.append('week_streak')
+    if 'early_bird' not in current_achievements and current_hour < 8:
+        unlocked.append('early_bird')
+    if 'night_owl' not in current_achievements and current_hour >= 22:
+        unlocked.append('night_owl')
+    if 'century' not in current_achievements and tasks_completed >= 100:
+        unlocked.append('century')
+    if 'priority_master' not in current_achievements and high_priority >= 10:
+        unlocked.append('priority_master')
+    if 'no_quit' not in current_achievements and days_no_delete >= 30:
+        unlocked.append('no_quit')
+
+    return unlocked
+
+
+def _guard(profile: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """Condition that the stored profile is still the one we computed from"""
+    if profile is None:
+        return 'attribute_not_exists(userId)', {}
+    if 'version' in profile:
+        return '#version = :version', {':version': profile['version']}
+    return 'attribute_exists(userId) AND attribute_not_exists(#version)', {}
+
+
+def award_update(
+    profile: Optional[Dict[str, Any]], priority: str = 'medium',
+    now: Optional[datetime] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """update_item arguments and outcome for completing one task
+
+    `profile` is the last known item (None = assume there is none yet). The
+    arguments carry no TableName/Key so they also fit in a transaction.
+    """
+    update, outcome, _ = _award(profile, priority, now)
+    return update, outcome
+
+
+def _award(
+    profile: Optional[Dict[str, Any]], priority: str, now: Optional[datetime]
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """award_update plus the profile as it will be once the update applies"""
+    now = now or datetime.utcnow()
+    known = profile or {}
+    today = now.date().isoformat()
+    yesterday = (now - timedelta(days=1)).date().isoformat()
+
+    last_date = known.get('lastCompletedDate')
+    if last_date == yesterday:
+        streak = int(known.get('streak', 0)) + 1
+    elif last_date == today:
+        streak = int(known.get('streak', 1))  # Same day, keep streak
+    else:
+        streak = 1  # Streak broken
+
+    base_xp = XP_REWARDS.get(priority, 20)
+    streak_bonus = XP_STREAK_BONUS * (streak - 1) if streak > 1 else 0
+    high = 1 if priority == 'high' else 0
+
+    after = {
+        **known,
+        'tasksCompleted': int(known.get('tasksCompleted', 0)) + 1,
+        'streak': streak,
+        'highPriorityCompleted': int(known.get('highPriorityCompleted', 0)) + high,
+        'daysWithoutDelete': int(known.get('daysWithoutDelete', 0)) + 1
+    }
+    unlocked = check_achievements(after, current_hour=now.hour)
+    achievement_xp = len(unlocked) * ACHIEVEMENT_XP
+
+    xp_delta = base_xp + streak_bonus + achievement_xp
+    total_xp = int(known.get('totalXP', 0)) + xp_delta
+    old_level = int(known.get('level', 1))
+    new_level = total_xp // XP_PER_LEVEL + 1
+
+    after.update({
+        'totalXP': total_xp,
+        'level': new_level,
+        'lastCompletedDate': today,
+        'achievements': list(known.get('achievements', [])) + unlocked,
+        'version': int(known.get('version', 0)) + 1
+    })
+
+    condition, guard_values = _guard(profile)
+    update = {
+        'UpdateExpression': (
+            'ADD totalXP :xp, tasksCompleted :one, highPriorityCompleted :high, '
+            'daysWithoutDelete :one, #version :one '
+            'SET #lvl = :level, streak = :streak, lastCompletedDate = :today, '
+            'achievements = list_append(if_not_exists(achievements, :empty), :unlocked)'
+        ),
+        'ConditionExpression': condition,
+        'ExpressionAttributeNames': {'#version': 'version', '#lvl': 'level'},
+        'ExpressionAttributeValues': {
+            ':xp': xp_delta, ':one': 1, ':high': high,
+            ':level': new_level, ':streak': streak, ':today': today,
+            ':unlocked': unlocked, ':empty': [], **guard_values
+        }
+    }
+    outcome = {
+        'xp_earned': base_xp,
+        'streak_bonus': streak_bonus,
+        'achievement_xp': achievement_xp,
+        'xp_delta': xp_delta,
+        'total_xp': total_xp,
+        'new_level': new_level,
+        'level_up': new_level > old_level,
+        'streak': streak,
+        'unlocked_achievements': [ACHIEVEMENTS[a]['name'] for a in unlocked]
+    }
+    return update, outcome, after
+
+
+def penalty_update(
+    profile: Optional[Dict[str, Any]], penalty: int,
+    now: Optional[datetime] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """update_item arguments and outcome for an XP penalty (never below zero)"""
+    now = now or datetime.utcnow()
+    current_xp = int((profile or {}).get('totalXP', 0))
+    new_xp = max(0, current_xp - penalty)
+
+    condition, guard_values = _guard(profile)
+    update = {
+        'UpdateExpression': (
+            'ADD totalXP :xp, #version :one '
+            'SET daysWithoutDelete = :zero, lastDeleteDate = :today'
+        ),
+        'ConditionExpression': condition,
+        'ExpressionAttributeNames': {'#version': 'version'},
+        'ExpressionAttributeValues': {
+            ':xp': new_xp - current_xp, ':one': 1, ':zero': 0,
+            ':today': now.date().isoformat(), **guard_values
+        }
+    }
+    outcome = {'xp_lost': penalty, 'xp_delta': new_xp - current_xp, 'total_xp': new_xp}
+    return update, outcome
+
+
+def current_profile(error: ClientError) -> Optional[Dict[str, Any]]:
+    """Item returned with a failed condition (ReturnValuesOnConditionCheckFailure)"""
+    return _deserialize(error.response.get('Item'))
+
+
+def _deserialize(item: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # Error responses skip the resource layer, so items arrive in wire format
+    if not item:
+        return None
+    return {name: _deserializer.deserialize(value) for name, value in item.items()}
+
+
+def _apply(users_table, user_id: int, build) -> Dict[str, Any]:
+    profile = _profiles.get(user_id)
+    for _ in range(MAX_ATTEMPTS):
+        update, outcome = build(profile)
+        try:
+            response = users_table.update_item(
+                Key={'userId': user_id},
+                ReturnValues='ALL_NEW',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD',
+                **update
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            profile = current_profile(e)
+            continue
+
+        remember_profile(response['Attributes'])
+        outcome['new_profile'] = profile is None
+        return outcome
+
+    raise RuntimeError(
+        f"Profile {user_id} kept changing, gave up after {MAX_ATTEMPTS} attempts"
+    )
+
+
+def award_xp(users_table, user_id: int, priority: str = 'medium',
+             now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Award XP for one completed task; returns the outcome shown to the user"""
+    return _apply(
+        users_table, user_id, lambda profile: award_update(profile, priority, now)
+    )
+
+
+def penalize_xp(users_table, user_id: int, penalty: int = XP_DELETE_PENALTY,
+                now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Take XP away (delete / ignored reminder); returns xp_lost and total_xp"""
+    return _apply(
+        users_table, user_id, lambda profile: penalty_update(profile, penalty, now)
+    )
+
+
+def record_metrics(metrics_table, outcome: Dict[str, Any],
+                   completed: bool = False) -> None:
+    """Roll an award/penalty outcome into the global admin counters"""
+    counters = {'totalXP': outcome['xp_delta'], 'users': int(outcome['new_profile'])}
+    if completed:
+        counters['tasksCompleted'] = 1
+    metrics.increment(metrics_table, counters)
+    if completed:
+        metrics.increment_daily(metrics_table, {'tasksCompleted': 1})
+
+
+def complete_task(users_table, user_id: int, priority: str,
+                  writes: List[Dict[str, Any]],
+                  now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Apply a task's completion `writes` and its XP award in one transaction
+
+    `writes` are TransactItems whose conditions must hold for the completion
+    to count (typically `status = pending` on the task). Returns the award
+    outcome, or None when one of those conditions failed and nothing was
+    written. A stale profile guess is retried from the item DynamoDB returns
+    with the cancellation, exactly as in award_xp.
+    """
+    client = users_table.meta.client
+    profile = _profiles.get(user_id)
+    for _ in range(MAX_ATTEMPTS):
+        update, outcome, after = _award(profile, priority, now)
+        award = {'Update': {
+            'TableName': users_table.name,
+            'Key': {'userId': user_id},
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD',
+            **update
+        }}
+        try:
+            client.transact_write_items(TransactItems=[*writes, award])
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = e.response.get('CancellationReasons', [])
+            codes = [reason.get('Code') for reason in reasons]
+            if 'ConditionalCheckFailed' in codes[:len(writes)]:
+                return None
+            if codes[len(writes):] == ['ConditionalCheckFailed']:
+                profile = _deserialize(reasons[-1].get('Item'))
+                continue
+            if 'TransactionConflict' in codes:
+                continue
+            raise
+
+        remember_profile({**after, 'userId': user_id})
+        outcome['new_profile'] = profile is None
+        return outcome
+
+    raise RuntimeError(
+        f"Profile {user_id} kept changing, gave up after {MAX_ATTEMPTS} attempts"
+    )
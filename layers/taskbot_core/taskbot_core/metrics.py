@@ -0,0 +1,103 @@
+"""
+Global sharded counters
+Admin metrics live in a small table keyed (metric, shard): writers ADD to a
+random one of METRIC_SHARDS items so no single item gets hot, and readers
+sum the shards of one partition with a single query
+"""
+
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from boto3.dynamodb.conditions import Key
+
+logger = logging.getLogger()
+
+METRICS_TABLE = os.environ.get('METRICS_TABLE_NAME', 'telegram-bot-metrics')
+METRIC_SHARDS = int(os.environ.get('METRIC_SHARDS', '10'))
+TOTALS = 'totals'
+DAY_FORMAT = '%Y-%m-%d'
+DAILY_RETENTION_SECONDS = 90 * 24 * 3600
+ACTIVE_KEY = 'active'  # Per-user "last active day" item in the user index table
+
+_active_seen = set()  # (user_id, day) already counted by this container
+
+
+def day_metric(now: Optional[datetime] = None) -> str:
+    """Partition holding one UTC day's counters"""
+    return f"day#{(now or datetime.utcnow()).strftime(DAY_FORMAT)}"
+
+
+def increment(metrics_table, counters: Dict[str, int], metric: str = TOTALS) -> None:
+    """ADD counters to a random shard of `metric`; best effort, never raises"""
+    counters = {name: delta for name, delta in counters.items() if delta}
+    if not counters:
+        return
+
+    names, values = {}, {}
+    for i, (name, delta) in enumerate(counters.items()):
+        names[f"#c{i}"] = name
+        values[f":c{i}"] = delta
+
+    update = 'ADD ' + ', '.join(f"#c{i} :c{i}" for i in range(len(counters)))
+    if metric != TOTALS:
+        update += ' SET expiresAt = if_not_exists(expiresAt, :expires)'
+        values[':expires'] = int(time.time()) + DAILY_RETENTION_SECONDS
+
+    try:
+        metrics_table.update_item(
+            Key={'metric': metric, 'shard': random.randrange(METRIC_SHARDS)},
+            UpdateExpression=update,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except Exception as e:
+        logger.warning(f"Metric update failed for {metric}: {e}")
+
+
+def increment_daily(metrics_table, counters: Dict[str, int],
+                    now: Optional[datetime] = None) -> None:
+    """ADD counters to today's partition"""
+    increment(metrics_table, counters, metric=day_metric(now))
+
+
+def read(metrics_table, metric: str = TOTALS) -> Dict[str, int]:
+    """Sum every shard of `metric` (at most METRIC_SHARDS small items)"""
+    response = metrics_table.query(KeyConditionExpression=Key('metric').eq(metric))
+    totals: Dict[str, int] = {}
+    for item in response.get('Items', []):
+        for name, value in item.items():
+            if name in ('metric', 'shard', 'expiresAt'):
+                continue
+            totals[name] = totals.get(name, 0) + int(value)
+    return totals
+
+
+def mark_active(index_table, metrics_table, user_id: int,
+                now: Optional[datetime] = None) -> None:
+    """Count the user once towards today's active users"""
+    day = (now or datetime.utcnow()).strftime(DAY_FORMAT)
+    if (user_id, day) in _active_seen:
+        return
+
+    try:
+        index_table.update_item(
+            Key={'userId': user_id, 'indexKey': ACTIVE_KEY},
+            UpdateExpression='SET #day = :day',
+            ConditionExpression='attribute_not_exists(#day) OR #day <> :day',
+            ExpressionAttributeNames={'#day': 'day'},
+            ExpressionAttributeValues={':day': day}
+        )
+        increment_daily(metrics_table, {'activeUsers': 1}, now)
+    except index_table.meta.client.exceptions.ConditionalCheckFailedException:
+        pass
+    except Exception as e:
+        logger.warning(f"Active-user tracking failed: {e}")
+        return
+
+    if len(_active_seen) > 10000:
+        _active_seen.clear()
+    _active_seen.add((user_id, day))
@@ -0,0 +1,70 @@
+"""
+Per-user AI rate limits
+One small item per user and UTC day in the user index table (`ai#YYYY-MM-DD`)
+holds the day's total and a counter per minute slot used that day. A request
+is a single conditional ADD that checks the daily cap and the per-minute
+burst limit together; the item expires shortly after its day ends
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+RATE_PREFIX = 'ai#'
+DAY_FORMAT = '%Y-%m-%d'
+RETENTION_SECONDS = 24 * 3600  # Kept one extra day after it closes
+DAILY = 'daily'
+BURST = 'burst'
+
+_deserializer = TypeDeserializer()
+
+
+def consume(index_table, user_id: int, daily_limit: int, burst_limit: int,
+            now: Optional[datetime] = None) -> Tuple[bool, int, Optional[str]]:
+    """Count one call if both limits allow it
+
+    Returns (allowed, remaining today, limit hit: DAILY / BURST / None).
+    """
+    now = now or datetime.utcnow()
+    day_start = datetime(now.year, now.month, now.day)
+    minute = f"m{(now.hour * 60 + now.minute):04d}"
+    day_end = day_start + timedelta(days=1)
+    expires_at = int((day_end - datetime(1970, 1, 1)).total_seconds())
+
+    try:
+        response = index_table.update_item(
+            Key={
+                'userId': user_id,
+                'indexKey': f"{RATE_PREFIX}{now.strftime(DAY_FORMAT)}"
+            },
+            UpdateExpression=(
+                'ADD #total :one, #minute :one '
+                'SET expiresAt = if_not_exists(expiresAt, :expires)'
+            ),
+            ConditionExpression=(
+                '(attribute_not_exists(#total) OR #total < :daily) AND '
+                '(attribute_not_exists(#minute) OR #minute < :burst)'
+            ),
+            ExpressionAttributeNames={'#total': 'total', '#minute': minute},
+            ExpressionAttributeValues={
+                ':one': 1, ':daily': daily_limit, ':burst': burst_limit,
+                ':expires': expires_at + RETENTION_SECONDS
+            },
+            ReturnValues='UPDATED_NEW',
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        item = e.response.get('Item', {})
+        total = int(_deserializer.deserialize(item['total'])) if 'total' in item else 0
+        if total >= daily_limit:
+            return False, 0, DAILY
+        return False, daily_limit - total, BURST
+
+    return True, daily_limit - int(response['Attributes']['total']), None
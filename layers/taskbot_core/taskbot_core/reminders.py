@@ -0,0 +1,51 @@
+"""
+Reminder time buckets
+In `bucket` dispatch mode tasks carry a `remindBucket` key (minute + shard)
+indexed by a sparse GSI, and a per-minute dispatcher sends everything due
+instead of one EventBridge schedule per task
+"""
+
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+REMIND_BUCKET_INDEX = os.environ.get('REMIND_BUCKET_INDEX', 'remindBucket-index')
+REMIND_BUCKET_SHARDS = int(os.environ.get('REMIND_BUCKET_SHARDS', '4'))
+BUCKET_FORMAT = '%Y-%m-%dT%H:%M'
+
+
+def bucket_dispatch_enabled() -> bool:
+    """True when reminders go through the per-minute dispatcher"""
+    return os.environ.get('REMINDER_DISPATCH_MODE', 'schedule') == 'bucket'
+
+
+def reminder_target_arn() -> str:
+    """Scheduler target: the batching reminder queue when configured, else the Lambda"""
+    return (
+        os.environ.get('REMINDER_QUEUE_ARN')
+        or os.environ.get('REMINDER_LAMBDA_ARN', '')
+    )
+
+
+def remind_bucket(remind_at: int, user_id: int) -> str:
+    """Bucket key for a reminder: UTC minute plus a stable per-user shard"""
+    minute = datetime.utcfromtimestamp(int(remind_at)).strftime(BUCKET_FORMAT)
+    shard = zlib.crc32(str(user_id).encode()) % REMIND_BUCKET_SHARDS
+    return f"{minute}#{shard}"
+
+
+def bucket_fields(user_id: int, remind_at: int) -> Dict[str, Any]:
+    """Extra task attributes needed for bucket dispatch (empty in schedule mode)"""
+    if not bucket_dispatch_enabled():
+        return {}
+    return {'remindBucket': remind_bucket(remind_at, user_id)}
+
+
+def due_buckets(now: datetime, lookback_minutes: int = 5) -> List[str]:
+    """All bucket keys from `lookback_minutes` ago up to the current minute"""
+    buckets = []
+    for offset in range(lookback_minutes, -1, -1):
+        minute = (now - timedelta(minutes=offset)).strftime(BUCKET_FORMAT)
+        buckets.extend(f"{minute}#{shard}" for shard in range(REMIND_BUCKET_SHARDS))
+    return buckets
@@ -0,0 +1,117 @@
+"""
+Warm-container Secrets Manager cache
+Secret values are kept for a TTL and refreshed in the background shortly
+before they expire, so steady traffic never waits on GetSecretValue. Values
+derived from a secret (e.g. the WebApp HMAC key) are cached alongside it and
+recomputed only when the secret itself changes
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from taskbot_core import clients
+
+logger = logging.getLogger()
+
+SECRET_TTL_SECONDS = float(os.environ.get('SECRET_CACHE_TTL', '300'))
+REFRESH_AHEAD = 0.8  # Start a background refresh after this fraction of the TTL
+
+
+class _Entry:
+    __slots__ = ('value', 'fetched_at', 'derived', 'refreshing')
+
+    def __init__(self, value: str, fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.derived: Dict[Callable[[str], Any], Any] = {}
+        self.refreshing = False
+
+
+class SecretCache:
+    """TTL cache over GetSecretValue with refresh-ahead and derived values"""
+
+    def __init__(self, client=None, ttl: float = SECRET_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self._client = client
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = clients.client('secretsmanager')
+        return self._client
+
+    def _fetch(self, secret_id: str) -> _Entry:
+        value = self.client.get_secret_value(SecretId=secret_id)['SecretString']
+        entry = _Entry(value, self._clock())
+        with self._lock:
+            old = self._entries.get(secret_id)
+            if old is not None and old.value == value:
+                entry.derived = old.derived  # Unchanged secret: keep derived values
+            self._entries[secret_id] = entry
+        return entry
+
+    def _refresh_in_background(self, secret_id: str) -> None:
+        def refresh():
+            try:
+                self._fetch(secret_id)
+            except Exception as e:
+                logger.warning(f"Background refresh of {secret_id} failed: {e}")
+                with self._lock:
+                    entry = self._entries.get(secret_id)
+                    if entry is not None:
+                        entry.refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _entry(self, secret_id: str) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(secret_id)
+            age = self._clock() - entry.fetched_at if entry else None
+            refresh = (entry is not None and self.ttl * REFRESH_AHEAD <= age < self.ttl
+                       and not entry.refreshing)
+            if refresh:
+                entry.refreshing = True
+
+        if entry is None:
+            return self._fetch(secret_id)
+        if age >= self.ttl:
+            try:
+                return self._fetch(secret_id)
+            except Exception as e:
+                # Serving a slightly stale secret beats failing the request
+                logger.warning(
+                    f"Refreshing {secret_id} failed, using cached value: {e}"
+                )
+                return entry
+        if refresh:
+            self._refresh_in_background(secret_id)
+        return entry
+
+    def get(self, secret_id: str) -> str:
+        """Current secret string (raises if it was never fetched successfully)"""
+        return self._entry(secret_id).value
+
+    def derived(self, secret_id: str, derive: Callable[[str], Any]) -> Any:
+        """derive(secret) computed once per secret value"""
+        entry = self._entry(secret_id)
+        if derive not in entry.derived:
+            entry.derived[derive] = derive(entry.value)
+        return entry.derived[derive]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def webapp_secret_key(bot_token: str) -> bytes:
+    """HMAC key Telegram uses to sign Mini App initData"""
+    return hmac.new(b'WebAppData', bot_token.encode(), hashlib.sha256).digest()
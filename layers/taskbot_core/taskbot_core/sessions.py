@@ -0,0 +1,76 @@
+"""
+Verified Mini App session cache
+Telegram sends the same initData for a whole Mini App session, so once a
+string has passed HMAC validation its user id is remembered per warm
+container (LRU, keyed by a digest of the full string). Entries are honoured
+only while `auth_date` is inside the freshness window, which also applies
+to first-time validation
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+AUTH_MAX_AGE_SECONDS = int(os.environ.get('AUTH_MAX_AGE_SECONDS', str(24 * 3600)))
+MAX_SESSIONS = 1024
+
+
+class SessionCache:
+    """Thread-safe LRU of initData digest -> (user_id, auth_date)"""
+
+    def __init__(self, max_size: int = MAX_SESSIONS,
+                 max_age: int = AUTH_MAX_AGE_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._clock = clock
+        self._entries: 'OrderedDict[bytes, Tuple[int, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(init_data: str) -> bytes:
+        return hashlib.sha256(init_data.encode()).digest()
+
+    def is_fresh(self, auth_date: int) -> bool:
+        """auth_date within the window (small allowance for clock skew)"""
+        age = self._clock() - auth_date
+        return -60 <= age <= self.max_age
+
+    def get(self, init_data: str) -> Optional[int]:
+        """User id for an already verified, still fresh initData string"""
+        key = self._key(init_data)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self.is_fresh(entry[1]):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, init_data: str, user_id: int, auth_date: int) -> None:
+        with self._lock:
+            key = self._key(init_data)
+            self._entries[key] = (user_id, auth_date)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Snapshot of hits/misses/hit rate/size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'size': len(self._entries)
+            }
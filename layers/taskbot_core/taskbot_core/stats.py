@@ -0,0 +1,67 @@
+"""
+Per-user stats rollup
+One `stats` item per user in the user index table, kept current with ADD
+deltas in the same transaction as each task write, so /stats is a single
+get_item however long the task history is. Completions per day are not
+duplicated here: "this week" comes from the activity month items
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from taskbot_core.activity import get_activity
+from taskbot_core.tables import USER_INDEX_TABLE
+from taskbot_core.tag_index import MAX_INDEXED_TAGS
+
+STATS_KEY = 'stats'
+TAG_PREFIX = 'tag#'
+WEEK_DAYS = 7
+
+
+def stats_writes(user_id: int, pending: int = 0, completed: int = 0,
+                 tags: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """TransactItems adjusting the rollup: pending/completed totals, plus the
+    completed-tag counters by the `completed` delta"""
+    deltas = {'pending': pending, 'completed': completed}
+    for tag in list(dict.fromkeys(tags))[:MAX_INDEXED_TAGS]:
+        deltas[f"{TAG_PREFIX}{tag}"] = completed
+
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return []
+
+    names, values = {}, {}
+    for i, (name, delta) in enumerate(deltas.items()):
+        names[f"#s{i}"] = name
+        values[f":v{i}"] = delta
+
+    return [{'Update': {
+        'TableName': USER_INDEX_TABLE,
+        'Key': {'userId': user_id, 'indexKey': STATS_KEY},
+        'UpdateExpression': 'ADD ' + ', '.join(
+            f"#s{i} :v{i}" for i in range(len(deltas))
+        ),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values
+    }}]
+
+
+def get_stats(index_table, user_id: int,
+              now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Read the rollup: totals, completions over the last 7 days and tag counts"""
+    key = {'userId': user_id, 'indexKey': STATS_KEY}
+    item = index_table.get_item(Key=key).get('Item', {})
+    today = (now or datetime.utcnow()).date()
+    # Reads at most two month items
+    week_start = today - timedelta(days=WEEK_DAYS - 1)
+    week = get_activity(index_table, user_id, week_start, today)
+
+    return {
+        'pending': max(0, int(item.get('pending', 0))),
+        'completed': max(0, int(item.get('completed', 0))),
+        'week_completed': sum(week.values()),
+        'tags': {
+            name[len(TAG_PREFIX):]: int(count) for name, count in item.items()
+            if name.startswith(TAG_PREFIX) and int(count) > 0
+        }
+    }
@@ -0,0 +1,51 @@
+"""
+Status/priority/time ordering key
+Tasks carry `statusKey` = "<status>#<priority rank>#<remindAt>", the sort key
+of a userId GSI, so pending tasks come back already filtered and ordered by
+a single key-range query. The index is created by hand (see DEPLOYMENT.md),
+so it is only used once STATUS_INDEX_ENABLED=true; until then queries fall
+back to the base table and callers sort by `status_key` themselves
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+from boto3.dynamodb.conditions import Attr, Key
+
+STATUS_INDEX = os.environ.get('STATUS_INDEX', 'userId-statusKey-index')
+PRIORITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+REMIND_AT_DIGITS = 10  # Zero-padded epoch seconds sort lexically until 2286
+
+
+def status_index_enabled() -> bool:
+    """True once the status index exists and has been backfilled"""
+    return os.environ.get('STATUS_INDEX_ENABLED', 'false') == 'true'
+
+
+def status_key(status: str, priority: Optional[str], remind_at: Any) -> str:
+    """Sort key ordering a user's tasks by status, then priority, then remindAt"""
+    rank = PRIORITY_RANK.get(priority or 'medium', PRIORITY_RANK['medium'])
+    return f"{status}#{rank}#{int(remind_at or 0):0{REMIND_AT_DIGITS}d}"
+
+
+def status_key_condition(user_id: int, status: str):
+    """Key condition for every task of a user in one status, in list order"""
+    return Key('userId').eq(user_id) & Key('statusKey').begins_with(f"{status}#")
+
+
+def status_query(user_id: int, status: str, **kwargs) -> Dict[str, Any]:
+    """Query kwargs for one status (pass to iter_query / iter_pages)
+
+    Results are only ordered when the status index is enabled
+    """
+    if not status_index_enabled():
+        return {
+            'KeyConditionExpression': Key('userId').eq(user_id),
+            'FilterExpression': Attr('status').eq(status),
+            **kwargs
+        }
+    return {
+        'IndexName': STATUS_INDEX,
+        'KeyConditionExpression': status_key_condition(user_id, status),
+        **kwargs
+    }
@@ -0,0 +1,52 @@
+"""
+Task change feed
+Every task write stamps `updatedAt` (epoch milliseconds) and deletes leave a
+TTL'd tombstone, so clients can pull only what changed since their version.
+The change-feed index is created by hand (see DEPLOYMENT.md); until
+CHANGE_FEED_ENABLED=true every delta request is answered with a reset
+"""
+
+import os
+import time
+from decimal import Decimal
+from typing import Any, Dict
+
+UPDATED_AT_INDEX = os.environ.get('UPDATED_AT_INDEX', 'userId-updatedAt-index')
+TOMBSTONE_TTL_SECONDS = 30 * 24 * 3600
+DELETED_STATUS = 'deleted'
+
+
+def change_feed_enabled() -> bool:
+    """True once the userId-updatedAt index exists on the tasks table"""
+    return os.environ.get('CHANGE_FEED_ENABLED', 'false') == 'true'
+
+
+def change_version() -> Decimal:
+    """Current change version (epoch milliseconds)"""
+    return Decimal(int(time.time() * 1000))
+
+
+def tombstone_write(table_name: str, user_id: int, task_id: str,
+                    expected_status: str) -> Dict[str, Any]:
+    """TransactItems entry marking a task deleted; DynamoDB TTL expires it later
+
+    Conditioned on the task still having the status it was read with, so a
+    task completed or deleted meanwhile is not tombstoned on stale data.
+    """
+    return {'Update': {
+        'TableName': table_name,
+        'Key': {'userId': user_id, 'taskId': task_id},
+        'UpdateExpression': (
+            'SET #status = :deleted, updatedAt = :version, expiresAt = :expires '
+            'REMOVE remindBucket, statusKey'
+        ),
+        'ConditionExpression': '#status = :expected',
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'ExpressionAttributeValues': {
+            ':expected': expected_status,
+            ':deleted': DELETED_STATUS,
+            ':version': change_version(),
+            ':expires': int(time.time()) + TOMBSTONE_TTL_SECONDS
+        }
+    }}
+
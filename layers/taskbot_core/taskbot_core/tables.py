@@ -0,0 +1,10 @@
+"""
+Shared table names
+The stack's user index table holds several small per-user item types (tag
+index, stats rollup, activity months, AI rate limits), so its name lives
+here rather than in any one of them
+"""
+
+import os
+
+USER_INDEX_TABLE = os.environ.get('USER_INDEX_TABLE_NAME', 'telegram-bot-user-index')
@@ -0,0 +1,103 @@
+"""
+Inverted tag index
+Per-user `tag#<tag>#<taskId>` entries plus one `tags` item holding a count
+per tag, both in the user index table and written in the same transaction
+as the task itself, so `/tasks #tag` and `/tags` never scan tasks
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List
+
+from boto3.dynamodb.conditions import Key
+
+from taskbot_core.dynamo import iter_query
+from taskbot_core.tables import USER_INDEX_TABLE
+
+TAG_COUNTS_KEY = 'tags'
+TAG_ENTRY_PREFIX = 'tag#'
+# Keeps task + entries + counts under the 100-item transaction cap
+MAX_INDEXED_TAGS = 25
+
+_SINGLE_WRITES = {'Put': 'put_item', 'Update': 'update_item', 'Delete': 'delete_item'}
+
+
+def _unique(tags: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(tag for tag in tags if tag))[:MAX_INDEXED_TAGS]
+
+
+def tag_index_writes(user_id: int, task_id: str, tags: Iterable[str],
+                     delta: int) -> List[Dict[str, Any]]:
+    """TransactItems adding (delta=1) or removing (delta=-1) a task's tag entries"""
+    tags = _unique(tags)
+    if not tags:
+        return []
+
+    writes = []
+    for tag in tags:
+        key = {'userId': user_id, 'indexKey': f"{TAG_ENTRY_PREFIX}{tag}#{task_id}"}
+        if delta > 0:
+            item = {**key, 'taskId': task_id}
+            writes.append({'Put': {'TableName': USER_INDEX_TABLE, 'Item': item}})
+        else:
+            writes.append({'Delete': {'TableName': USER_INDEX_TABLE, 'Key': key}})
+
+    # One attribute per tag ("#work": 3); ADD creates missing ones at zero
+    names = {f"#t{i}": f"#{tag}" for i, tag in enumerate(tags)}
+    writes.append({'Update': {
+        'TableName': USER_INDEX_TABLE,
+        'Key': {'userId': user_id, 'indexKey': TAG_COUNTS_KEY},
+        'UpdateExpression': 'ADD ' + ', '.join(f"{name} :delta" for name in names),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': {':delta': delta}
+    }})
+    return writes
+
+
+def write_task(tasks_table, task_write: Dict[str, Any],
+               index_writes: List[Dict[str, Any]]) -> bool:
+    """Apply a task write together with its index writes, atomically
+
+    `task_write` is a single TransactItems entry ({'Put': {...}} etc.). With no
+    index writes it is sent as a plain call, which costs half a transaction.
+    Returns False, with nothing written, when the task write's own condition
+    failed.
+    """
+    client = tasks_table.meta.client
+    try:
+        if index_writes:
+            client.transact_write_items(TransactItems=[task_write, *index_writes])
+        else:
+            (kind, params), = task_write.items()
+            getattr(client, _SINGLE_WRITES[kind])(**params)
+    except client.exceptions.TransactionCanceledException as e:
+        reasons = e.response.get('CancellationReasons', [])
+        if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+            return False
+        raise
+    except client.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+
+def tag_counts(index_table, user_id: int) -> Dict[str, int]:
+    """Live tag -> pending task count for a user, from a single get_item"""
+    item = index_table.get_item(
+        Key={'userId': user_id, 'indexKey': TAG_COUNTS_KEY}
+    ).get('Item', {})
+    return {
+        name[1:]: int(count)
+        for name, count in item.items()
+        if name.startswith('#') and int(count) > 0
+    }
+
+
+def tagged_task_ids(index_table, user_id: int, tag: str) -> Iterator[str]:
+    """Ids of the user's pending tasks carrying `tag`"""
+    entries = iter_query(
+        index_table,
+        KeyConditionExpression=(
+            Key('userId').eq(user_id)
+            & Key('indexKey').begins_with(f"{TAG_ENTRY_PREFIX}{tag}#")
+        ),
+        ProjectionExpression='taskId'
+    )
+    return (entry['taskId'] for entry in entries)
@@ -0,0 +1,322 @@
+"""
+Rate-limit-aware Telegram outbound sender
+One keep-alive HTTPS pool to api.telegram.org per container (pre-warmed
+during init, reused across invocations), a global and a per-chat token
+bucket, and automatic backoff on HTTP 429 (retry_after)
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger()
+
+TELEGRAM_HOST = 'api.telegram.org'
+
+# Connection pool tuning: fail fast on a bad connect, allow for slow sends,
+# and let urllib3 retry only connection setup (a retried POST could double-send)
+CONNECT_TIMEOUT = 3.0
+READ_TIMEOUT = 10.0
+CONNECT_RETRIES = 2
+PREWARM = os.environ.get('TELEGRAM_PREWARM', 'true') == 'true'
+
+# Telegram Bot API limits: ~30 msg/s overall, 1 msg/s to the same chat
+GLOBAL_RATE = 30.0
+PER_CHAT_RATE = 1.0
+MAX_RETRIES = 3
+MAX_RETRY_AFTER = 30  # Give up rather than sleep past the Lambda timeout
+MAX_TRACKED_CHATS = 10000
+_EPSILON = 1e-9  # Float slack so refills that land a hair under 1 token still count
+
+
+def message_payload(chat_id: Any, text: str, parse_mode: Optional[str] = None,
+                    reply_markup: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """sendMessage parameters"""
+    payload = {'chat_id': chat_id, 'text': text}
+    if parse_mode:
+        payload['parse_mode'] = parse_mode
+    if reply_markup:
+        payload['reply_markup'] = reply_markup
+    return payload
+
+
+def connection_pool(maxsize: int = 10):
+    """Keep-alive HTTPS pool pinned to the Bot API host"""
+    import urllib3
+    return urllib3.HTTPSConnectionPool(
+        TELEGRAM_HOST,
+        maxsize=maxsize,
+        block=False,  # Extra connections under a burst are opened, not waited for
+        timeout=urllib3.Timeout(connect=CONNECT_TIMEOUT, read=READ_TIMEOUT),
+        retries=urllib3.Retry(total=CONNECT_RETRIES, connect=CONNECT_RETRIES, read=0,
+                              status=0, redirect=0, backoff_factor=0.1)
+    )
+
+
+def is_connect_error(error: Exception) -> bool:
+    """True if the request failed before anything was sent (safe to resend)"""
+    from urllib3.exceptions import (
+        ConnectTimeoutError,
+        MaxRetryError,
+        NewConnectionError,
+    )
+    if isinstance(error, MaxRetryError):
+        error = error.reason
+    return isinstance(error, (NewConnectionError, ConnectTimeoutError))
+
+
+def webhook_reply(method: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """API Gateway response that makes Telegram perform `method` itself
+
+    A webhook may answer with one Bot API call in its response body, which
+    saves the outbound HTTPS request. Telegram does not report whether it
+    succeeded, so only use it for best-effort replies.
+    """
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'method': method, **payload})
+    }
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is free"""
+
+    def __init__(self, rate: float, capacity: float = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now < self._paused_until:
+            self._updated = now
+            return
+        start = max(self._updated, self._paused_until)
+        self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Take one token, sleeping if needed. Returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now >= self._paused_until and self.tokens >= 1 - _EPSILON:
+                    self.tokens = max(0.0, self.tokens - 1)
+                    return waited
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds` (e.g. after a 429)"""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._paused_until = max(self._paused_until, now + seconds)
+            self.tokens = 0
+
+
+class TelegramSender:
+    """Shared outbound Telegram client with rate limiting and 429 handling"""
+
+    def __init__(self, token_provider: Callable[[], str],
+                 global_rate: float = GLOBAL_RATE,
+                 per_chat_rate: float = PER_CHAT_RATE,
+                 max_retries: int = MAX_RETRIES,
+                 http: Optional[Any] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep,
+                 pool_size: int = 10):
+        self._token_provider = token_provider
+        self._per_chat_rate = per_chat_rate
+        self._max_retries = max_retries
+        self._clock = clock
+        self._sleep = sleep
+        self._http = http
+        self._pool_size = pool_size
+        self._http_lock = threading.Lock()
+        self.global_bucket = TokenBucket(global_rate, clock=clock, sleep=sleep)
+        self._chat_buckets: 'OrderedDict[Any, TokenBucket]' = OrderedDict()
+        self._chat_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.counters = {'sent': 0, 'failed': 0, 'throttled': 0, 'retried': 0}
+
+    @property
+    def http(self):
+        """urllib3 pool, imported and built on the first request"""
+        if self._http is None:
+            with self._http_lock:
+                if self._http is None:
+                    self._http = connection_pool(self._pool_size)
+        return self._http
+
+    @http.setter
+    def http(self, pool) -> None:
+        self._http = pool
+
+    def warm(self) -> None:
+        """Open a keep-alive connection in the background (call during init)
+
+        The TCP and TLS handshakes then overlap the rest of the cold start
+        instead of delaying the first message.
+        """
+        if not PREWARM:
+            return
+
+        def connect():
+            try:
+                # Any cheap request leaves a kept-alive connection in the pool
+                self.http.request('HEAD', '/', redirect=False, retries=False)
+            except Exception as e:
+                logger.warning(f"Telegram connection warm-up failed: {e}")
+
+        threading.Thread(target=connect, daemon=True).start()
+
+    def connection_stats(
+        self, since: Optional[Dict[str, int]] = None
+    ) -> Dict[str, int]:
+        """Requests sent, connections opened and requests that reused one
+
+        Pass an earlier snapshot as `since` for the numbers in between.
+        """
+        pool = self._http
+        current = {
+            'requests': getattr(pool, 'num_requests', 0),
+            'newConnections': getattr(pool, 'num_connections', 0)
+        }
+        if since:
+            current = {
+                name: value - since.get(name, 0) for name, value in current.items()
+            }
+        current['reused'] = max(0, current['requests'] - current['newConnections'])
+        return current
+
+    def log_connection_reuse(self, handler: Callable) -> Callable:
+        """Decorate a Lambda handler to log this invocation's connection reuse"""
+        @functools.wraps(handler)
+        def wrapped(event, context):
+            before = self.connection_stats()
+            try:
+                return handler(event, context)
+            finally:
+                used = self.connection_stats(since=before)
+                if used['requests'] or used['newConnections']:
+                    logger.info(f"Telegram connections: {used}")
+        return wrapped
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.counters[name] += n
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        with self._chat_lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = TokenBucket(self._per_chat_rate, capacity=1,
+                                     clock=self._clock, sleep=self._sleep)
+                self._chat_buckets[chat_id] = bucket
+                if len(self._chat_buckets) > MAX_TRACKED_CHATS:
+                    self._chat_buckets.popitem(last=False)
+            else:
+                self._chat_buckets.move_to_end(chat_id)
+            return bucket
+
+    def _acquire(self, chat_id: Any) -> None:
+        # Per-chat first so a chatty user doesn't hold a global token while waiting
+        waited = 0.0
+        if chat_id is not None:
+            waited += self._chat_bucket(chat_id).acquire()
+        waited += self.global_bucket.acquire()
+        if waited > 0:
+            self._count('throttled')
+
+    def call(self, method: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Call a Bot API method; returns the decoded response or None on failure"""
+        chat_id = payload.get('chat_id')
+        path = f"/bot{self._token_provider()}/{method}"
+        body = json.dumps(payload)
+
+        for attempt in range(self._max_retries + 1):
+            if attempt:
+                self._count('retried')
+            self._acquire(chat_id)
+
+            try:
+                response = self.http.request(
+                    'POST', path, body=body,
+                    headers={'Content-Type': 'application/json'}
+                )
+            except Exception as e:
+                if not is_connect_error(e):
+                    # The request may already have reached Telegram; resending
+                    # it could deliver the message twice
+                    logger.error(f"Telegram {method} request error: {e}")
+                    break
+                logger.warning(f"Telegram {method} connect error: {e}")
+                self._sleep(min(2 ** attempt, MAX_RETRY_AFTER))
+                continue
+
+            if response.status == 200:
+                self._count('sent')
+                return json.loads(response.data or b'{}')
+
+            if response.status == 429:
+                retry_after = self._retry_after(response)
+                self._count('throttled')
+                if retry_after > MAX_RETRY_AFTER:
+                    logger.error(f"Telegram asked to wait {retry_after}s, giving up")
+                    break
+                logger.warning(
+                    f"Telegram 429 on {method}, retrying after {retry_after}s"
+                )
+                self.global_bucket.pause(retry_after)
+                continue
+
+            if response.status >= 500:
+                self._sleep(min(2 ** attempt, MAX_RETRY_AFTER))
+                continue
+
+            # 4xx other than 429 (blocked bot, bad markup...) will not fix itself
+            logger.error(
+                f"Telegram {method} failed: {response.status} {response.data[:200]!r}"
+            )
+            break
+
+        self._count('failed')
+        return None
+
+    def send_message(self, chat_id: Any, text: str, parse_mode: Optional[str] = None,
+                     reply_markup: Optional[Dict[str, Any]] = None) -> bool:
+        """Send a text message; returns True on success"""
+        payload = message_payload(chat_id, text, parse_mode, reply_markup)
+        return self.call('sendMessage', payload) is not None
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of sent/failed/throttled/retried counters"""
+        with self._stats_lock:
+            return dict(self.counters)
+
+    @staticmethod
+    def _retry_after(response) -> int:
+        try:
+            data = json.loads(response.data or b'{}')
+            return int(data.get('parameters', {}).get('retry_after', 1))
+        except (ValueError, TypeError):
+            return int(response.headers.get('Retry-After', 1))
@@ -0,0 +1,176 @@
+"""
+Natural-language reminder times (English and Russian)
+One precompiled pattern tokenizes the lowercased message in a single
+left-to-right pass (relative offsets, weekdays, day words, clock times); the
+tokens are then combined with the precedence the bot has always used:
+relative offset, weekday, day word, bare clock time. Matching only starts at
+word boundaries and needs no IGNORECASE, and the clock is only read once a
+token is found. It still costs somewhat more per message than the old
+substring checks, mostly because it understands more messages and building
+their datetimes is the expensive part (scripts/bench_time_parser.py)
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+DEFAULT_HOUR = 9  # Reminder time when only a day is given
+EVENING_HOUR = 20  # ..."tonight" / "вечером"
+DEFAULT_SNOOZE = timedelta(hours=1)
+
+_AMOUNT = r'(?P<amount>\d{1,4}|an?|one|один|одну|одна)'
+_UNIT = (
+    r'(?P<unit>'
+    r'(?P<half>half an? hour|полчаса)'
+    r'|(?P<hours>hours?|hrs?|h|час(?:а|ов)?|ч)'
+    r'|(?P<minutes>minutes?|mins?|m|минут[уы]?|мин)'
+    r'|(?P<days>days?|d|день|дня|дней|дн)'
+    r'|(?P<weeks>weeks?|w|недел[юиья]|нед)'
+    r')'
+)
+_OFFSET = rf'(?:{_AMOUNT}\s*)?{_UNIT}\b'
+
+_WEEKDAY = (
+    r'(?P<weekday>monday|tuesday|wednesday|thursday|friday|saturday|sunday'
+    r'|понедельник|вторник|сред[аеуы]|четверг|пятниц[аеуы]|суббот[аеуы]|воскресень[ея])'
+)
+_DAY_WORD = (
+    r'(?P<day_word>day after tomorrow|tomorrow|today|tonight'
+    r'|послезавтра|завтра|сегодня|вечером)'
+)
+_CLOCK = (
+    r'(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?'
+    r'(?:\s*(?P<meridiem>am|pm|a\.m\.|p\.m\.|утра|дня|вечера|ночи))?'
+)
+_NAMED_TIME = r'(?P<noon>noon|midday|полдень)|(?P<midnight>midnight|полночь)'
+
+# Each alternative is an outer named group, so match.lastgroup names the token
+_TOKENS = re.compile(
+    rf'(?<!\w)(?:(?P<offset>(?:in|через)\s+{_OFFSET})|{_WEEKDAY}|{_DAY_WORD}'
+    rf'|(?P<clock>{_NAMED_TIME}|{_CLOCK}))(?!\w)'
+)
+_DELAY = re.compile(rf'\s*(?:(?:in|через)\s+)?{_OFFSET}')
+
+_WEEKDAYS = {
+    'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6,
+    'пон': 0, 'вто': 1, 'сре': 2, 'чет': 3, 'пят': 4, 'суб': 5, 'вос': 6
+}
+_DAY_OFFSETS = {
+    'today': 0, 'tonight': 0, 'сегодня': 0, 'вечером': 0,
+    'tomorrow': 1, 'завтра': 1,
+    'day after tomorrow': 2, 'послезавтра': 2
+}
+_EVENING_WORDS = {'tonight', 'вечером'}
+_PM = {'pm', 'p.m.', 'дня', 'вечера'}
+_AM = {'am', 'a.m.', 'утра', 'ночи'}
+
+
+def _offset(match) -> Optional[timedelta]:
+    """timedelta for an amount+unit match, None if it is not a real offset"""
+    if match.group('half'):
+        return timedelta(minutes=30)
+
+    amount = match.group('amount')
+    if amount is None or not amount.isdigit():
+        # "in an hour" / "через час" read fine, "in m" / "через ч" are not times
+        if len(match.group('unit')) <= 1:
+            return None
+        amount = 1
+    amount = int(amount)
+
+    if match.group('hours'):
+        return timedelta(hours=amount)
+    if match.group('minutes'):
+        return timedelta(minutes=amount)
+    if match.group('days'):
+        return timedelta(days=amount)
+    return timedelta(weeks=amount)
+
+
+def _clock(match):
+    """(hour, minute) of a clock token, None for a bare number or invalid time"""
+    if match.group('noon'):
+        return 12, 0
+    if match.group('midnight'):
+        return 0, 0
+
+    minute, meridiem = match.group('minute'), match.group('meridiem')
+    if minute is None and meridiem is None:
+        return None  # "2 items" is not a time
+
+    hour, minute = int(match.group('hour')), int(minute or 0)
+    if meridiem:
+        if hour > 12:
+            return None
+        if meridiem in _PM and hour < 12:
+            hour += 12
+        elif meridiem in _AM and hour == 12:
+            hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def parse_smart_time(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Reminder time mentioned in `text` (UTC), or None
+
+    "in 2 hours", "через 2 часа", "Friday 18:00", "в понедельник",
+    "tomorrow 9am", "завтра в 7 вечера", "14:30"...
+    """
+    offset = weekday = day_word = clock = None
+    evening = False
+
+    for match in _TOKENS.finditer(text.lower()):
+        kind = match.lastgroup
+        if kind == 'offset':
+            if offset is None:
+                offset = _offset(match)
+        elif kind == 'weekday':
+            if weekday is None:
+                weekday = _WEEKDAYS[match.group('weekday')[:3]]
+        elif kind == 'day_word':
+            word = match.group('day_word')
+            evening = evening or word in _EVENING_WORDS
+            if day_word is None or day_word in _EVENING_WORDS:
+                day_word = word  # "вечером" only picks the hour once a day is named
+        elif clock is None:
+            clock = _clock(match)
+
+    if offset is None and weekday is None and day_word is None and clock is None:
+        return None  # Most task messages name no time; skip reading the clock
+    now = now or datetime.utcnow()
+
+    if offset is not None:
+        return now + offset
+
+    if weekday is not None:
+        day = now + timedelta(days=(weekday - now.weekday()) % 7 or 7)
+    elif day_word is not None:
+        day = now + timedelta(days=_DAY_OFFSETS[day_word])
+    else:
+        target = now.replace(hour=clock[0], minute=clock[1], second=0, microsecond=0)
+        return target if target >= now else target + timedelta(days=1)
+
+    if clock is None:
+        clock = (EVENING_HOUR if evening else DEFAULT_HOUR, 0)
+    target = day.replace(hour=clock[0], minute=clock[1], second=0, microsecond=0)
+    if target < now:
+        # Only "today"/"tonight" can land in the past: the next such time is tomorrow
+        target += timedelta(days=1)
+    return target
+
+
+def parse_snooze_delay(delay_str: str, now: Optional[datetime] = None) -> int:
+    """Timestamp a snooze of `delay_str` ("1h", "30m", "2 дня", "tomorrow") lands on"""
+    now = now or datetime.utcnow()
+
+    lowered = delay_str.lower()
+    match = _DELAY.match(lowered)
+    delay = _offset(match) if match else None
+    if delay is None:
+        if 'tomorrow' in lowered or 'завтра' in lowered:
+            delay = timedelta(days=1)
+        else:
+            delay = DEFAULT_SNOOZE
+
+    return int((now + delay).timestamp())
@@ -79,7 +79,7 @@ function App() {
     const { tg, user, userId, initData, isLoading: authLoading, error: authError, isReady } = useTelegram()
 
     // Get tasks
-    const { tasks, profile, loading: tasksLoading, error: tasksError, createTask, completeTask, deleteTask, refreshTasks } = useTasks(userId, initData)
+    const { tasks, profile, loading: tasksLoading, error: tasksError, createTask, completeTask, deleteTask, refreshTasks, hasMoreTasks, loadingMore, loadMoreTasks } = useTasks(userId, initData)
 
     // Check for first visit
     useEffect(() => {
@@ -298,6 +298,9 @@ function App() {
                                 loading={tasksLoading}
                                 onComplete={handleCompleteTask}
                                 onDelete={handleDeleteTask}
+                                hasMore={hasMoreTasks}
+                                loadingMore={loadingMore}
+                                onLoadMore={loadMoreTasks}
                             />
                         </motion.div>
                     )}
@@ -78,7 +78,7 @@ const AdminStats = ({ onBack, userId: propUserId }) => {
                             WebkitBackgroundClip: 'text',
                             WebkitTextFillColor: 'transparent'
                         }}>
-                            {value.toLocaleString()}
+                            {(value ?? 0).toLocaleString()}
                         </Typography>
                     </CardContent>
                 </Card>
@@ -113,6 +113,21 @@ const AdminStats = ({ onBack, userId: propUserId }) => {
                     value={stats.totalXP}
                     color="linear-gradient(45deg, #43e97b, #38f9d7)"
                 />
+                <StatCard
+                    title="Active Today"
+                    value={stats.dailyActiveUsers}
+                    color="linear-gradient(45deg, #f093fb, #f5576c)"
+                />
+                <StatCard
+                    title="Tasks Created Today"
+                    value={stats.tasksCreatedToday}
+                    color="linear-gradient(45deg, #fa709a, #fee140)"
+                />
+                <StatCard
+                    title="AI Calls Today"
+                    value={stats.aiCallsToday}
+                    color="linear-gradient(45deg, #a18cd1, #fbc2eb)"
+                />
             </Grid>
         </Box>
     );
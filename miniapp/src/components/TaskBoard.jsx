@@ -1,5 +1,5 @@
 import { useState } from 'react'
-import { Box, Typography, Paper, Grid, Chip, IconButton, Tooltip, Skeleton } from '@mui/material'
+import { Box, Typography, Paper, Grid, Chip, IconButton, Tooltip, Skeleton, Button } from '@mui/material'
 import { motion, AnimatePresence } from 'framer-motion'
 import CheckCircleIcon from '@mui/icons-material/CheckCircle'
 import DeleteIcon from '@mui/icons-material/Delete'
@@ -244,7 +244,7 @@ const TaskSkeleton = () => (
     </Paper>
 )
 
-const TaskBoard = ({ tasks, onUpdate, onComplete, onDelete, loading }) => {
+const TaskBoard = ({ tasks, onUpdate, onComplete, onDelete, loading, hasMore, loadingMore, onLoadMore }) => {
     const handleDelete = async (taskId) => {
         if (onDelete) {
             await onDelete(taskId)
@@ -369,6 +369,19 @@ const TaskBoard = ({ tasks, onUpdate, onComplete, onDelete, loading }) => {
                     </Grid>
                 ))}
             </Grid>
+            {hasMore && (
+                <Box sx={{ display: 'flex', justifyContent: 'center', mt: 1 }}>
+                    <Button
+                        variant="outlined"
+                        size="small"
+                        disabled={loadingMore}
+                        onClick={onLoadMore}
+                        sx={{ color: '#FFFFFF', borderColor: 'rgba(255,255,255,0.3)' }}
+                    >
+                        Load more tasks
+                    </Button>
+                </Box>
+            )}
         </Box>
     )
 }
@@ -2,9 +2,14 @@ import { useState, useEffect, useCallback } from 'react'
 import axios from 'axios'
 
 const API_BASE = 'https://hh2myi12y8.execute-api.us-east-1.amazonaws.com/prod'
+const PAGE_SIZE = 50
+const TASK_FIELDS = 'id,text,priority,status,remindAt,tags,completedAt'
 
 export const useTasks = (userId, authToken) => {
     const [tasks, setTasks] = useState([])
+    const [nextCursor, setNextCursor] = useState(null)
+    const [version, setVersion] = useState(null)
+    const [loadingMore, setLoadingMore] = useState(false)
     const [profile, setProfile] = useState(null)
     const [loading, setLoading] = useState(false)
     const [error, setError] = useState(null)
@@ -31,9 +36,13 @@ export const useTasks = (userId, authToken) => {
             setLoading(true)
             console.log('📋 Fetching tasks for user:', userId)
             const api = getApi()
-            const response = await api.get('/tasks')
+            const response = await api.get('/tasks', {
+                params: { limit: PAGE_SIZE, fields: TASK_FIELDS }
+            })
             console.log('✅ Tasks loaded:', response.data.tasks?.length || 0)
             setTasks(response.data.tasks || [])
+            setNextCursor(response.data.nextCursor || null)
+            setVersion(response.data.version || null)
             setError(null)
         } catch (err) {
             console.error('❌ Error fetching tasks:', err)
@@ -43,6 +52,55 @@ export const useTasks = (userId, authToken) => {
         }
     }, [userId, getApi])
 
+    // Load the next page on demand
+    const loadMoreTasks = useCallback(async () => {
+        if (!userId || !nextCursor) return
+
+        try {
+            setLoadingMore(true)
+            const api = getApi()
+            const response = await api.get('/tasks', {
+                params: { limit: PAGE_SIZE, fields: TASK_FIELDS, cursor: nextCursor }
+            })
+            setTasks(prev => [...prev, ...(response.data.tasks || [])])
+            setNextCursor(response.data.nextCursor || null)
+        } catch (err) {
+            console.error('❌ Error loading more tasks:', err)
+            setError(err.message)
+        } finally {
+            setLoadingMore(false)
+        }
+    }, [userId, nextCursor, getApi])
+
+    // Pull only what changed since the last sync and merge it in place
+    const syncTasks = useCallback(async () => {
+        if (!userId) return
+        if (!version) return fetchTasks()
+
+        try {
+            const api = getApi()
+            const response = await api.get('/tasks/changes', { params: { since: version } })
+            const { changes = [], deleted = [], reset } = response.data
+            if (reset) return fetchTasks()
+
+            const removed = new Set(deleted)
+            const changed = new Map(changes.map(task => [task.id, task]))
+            setTasks(prev => {
+                const merged = prev
+                    .filter(task => !removed.has(task.id))
+                    .map(task => changed.get(task.id) || task)
+                const known = new Set(merged.map(task => task.id))
+                const added = changes.filter(task => !known.has(task.id))
+                return [...added, ...merged]
+            })
+            setVersion(response.data.version)
+            setError(null)
+        } catch (err) {
+            console.error('❌ Error syncing tasks:', err)
+            await fetchTasks()
+        }
+    }, [userId, version, getApi, fetchTasks])
+
     const fetchProfile = useCallback(async () => {
         if (!userId) return
 
@@ -74,7 +132,7 @@ export const useTasks = (userId, authToken) => {
             const api = getApi()
             const response = await api.post('/tasks', taskData)
             console.log('✅ Task created')
-            await fetchTasks() // Refresh list
+            await syncTasks() // Refresh list
             return response.data.task
         } catch (err) {
             console.error('❌ Error creating task:', err)
@@ -89,7 +147,7 @@ export const useTasks = (userId, authToken) => {
             const api = getApi()
             const response = await api.put(`/tasks/${taskId}/complete`)
             console.log('✅ Task completed', response.data.gamification)
-            await fetchTasks()
+            await syncTasks()
             await fetchProfile() // Refresh profile XP
             return response.data.gamification // Return XP data for notification
         } catch (err) {
@@ -105,7 +163,7 @@ export const useTasks = (userId, authToken) => {
             const api = getApi()
             const response = await api.delete(`/tasks/${taskId}`)
             console.log('✅ Task deleted', response.data.gamification)
-            await fetchTasks()
+            await syncTasks()
             await fetchProfile() // Refresh profile XP
             return response.data.gamification // Return XP penalty for notification
         } catch (err) {
@@ -122,6 +180,9 @@ export const useTasks = (userId, authToken) => {
         createTask,
         completeTask,
         deleteTask,
-        refreshTasks: fetchTasks
+        refreshTasks: fetchTasks,
+        hasMoreTasks: Boolean(nextCursor),
+        loadingMore,
+        loadMoreTasks
     }
 }
@@ -0,0 +1,67 @@
+"""
+Move legacy `activityLog` maps out of user profiles into per-month items
+Run once after upgrading (see DEPLOYMENT.md); re-running only picks up
+profiles that still carry a map
+"""
+
+import os
+import sys
+from collections import defaultdict
+from datetime import date
+
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'layers', 'taskbot_core'))
+
+from taskbot_core.activity import expires_at, month_key  # noqa: E402
+from taskbot_core.dynamo import iter_scan  # noqa: E402
+
+USERS_TABLE = os.environ.get('USERS_TABLE_NAME', 'telegram-bot-user-settings')
+USER_INDEX_TABLE = os.environ['USER_INDEX_TABLE_NAME']
+
+
+def backfill(users_table, index_table) -> int:
+    """Write activity months for every profile with a log; returns profiles migrated"""
+    migrated = 0
+    profiles = iter_scan(
+        users_table,
+        FilterExpression='attribute_exists(activityLog)',
+        ProjectionExpression='userId, activityLog'
+    )
+
+    for profile in profiles:
+        months = defaultdict(dict)
+        for day, count in profile['activityLog'].items():
+            try:
+                parsed = date.fromisoformat(day)
+            except ValueError:
+                continue
+            months[parsed.replace(day=1)][f"d{parsed.day:02d}"] = int(count)
+
+        # ADD rather than put so completions logged since the upgrade are kept
+        for month, days in months.items():
+            names = {f"#d{i}": name for i, name in enumerate(days)}
+            values = {f":d{i}": count for i, count in enumerate(days.values())}
+            index_table.update_item(
+                Key={'userId': profile['userId'], 'indexKey': month_key(month)},
+                UpdateExpression=(
+                    'ADD ' + ', '.join(f"#d{i} :d{i}" for i in range(len(days)))
+                    + ' SET expiresAt = if_not_exists(expiresAt, :expires)'
+                ),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={**values, ':expires': expires_at(month)}
+            )
+
+        users_table.update_item(
+            Key={'userId': profile['userId']},
+            UpdateExpression='REMOVE activityLog'
+        )
+        migrated += 1
+
+    return migrated
+
+
+if __name__ == '__main__':
+    dynamodb = boto3.resource('dynamodb')
+    count = backfill(dynamodb.Table(USERS_TABLE), dynamodb.Table(USER_INDEX_TABLE))
+    print(f"✅ Migrated activity logs for {count} profiles")
@@ -0,0 +1,40 @@
+"""
+Seed the global metric totals from the users table
+Run once right after deploying the metrics table (see DEPLOYMENT.md);
+re-running resets the totals to what the users table says
+"""
+
+import os
+import sys
+
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'layers', 'taskbot_core'))
+
+from taskbot_core.dynamo import iter_scan  # noqa: E402
+from taskbot_core.metrics import METRIC_SHARDS, TOTALS  # noqa: E402
+
+USERS_TABLE = os.environ.get('USERS_TABLE_NAME', 'telegram-bot-user-settings')
+METRICS_TABLE = os.environ['METRICS_TABLE_NAME']
+
+
+def backfill(users_table, metrics_table) -> dict:
+    """Write users/XP/completed totals to shard 0 and clear the other shards"""
+    totals = {'users': 0, 'totalXP': 0, 'tasksCompleted': 0}
+    for item in iter_scan(users_table, ProjectionExpression='totalXP, tasksCompleted'):
+        totals['users'] += 1
+        totals['totalXP'] += int(item.get('totalXP', 0))
+        totals['tasksCompleted'] += int(item.get('tasksCompleted', 0))
+
+    with metrics_table.batch_writer() as batch:
+        batch.put_item(Item={'metric': TOTALS, 'shard': 0, **totals})
+        for shard in range(1, METRIC_SHARDS):
+            batch.delete_item(Key={'metric': TOTALS, 'shard': shard})
+
+    return totals
+
+
+if __name__ == '__main__':
+    dynamodb = boto3.resource('dynamodb')
+    totals = backfill(dynamodb.Table(USERS_TABLE), dynamodb.Table(METRICS_TABLE))
+    print(f"✅ Seeded metric totals: {totals}")
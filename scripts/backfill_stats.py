@@ -0,0 +1,50 @@
+"""
+Rebuild per-user stats rollups from existing tasks
+Run once after upgrading (see DEPLOYMENT.md); safe to re-run,
+each user's rollup is recomputed from scratch
+"""
+
+import os
+import sys
+from collections import Counter, defaultdict
+
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'layers', 'taskbot_core'))
+
+from taskbot_core.dynamo import iter_scan  # noqa: E402
+from taskbot_core.stats import STATS_KEY, TAG_PREFIX  # noqa: E402
+
+TASKS_TABLE = os.environ.get('TASKS_TABLE_NAME', 'telegram-bot-tasks')
+USER_INDEX_TABLE = os.environ['USER_INDEX_TABLE_NAME']
+
+
+def backfill(tasks_table, index_table) -> int:
+    """Write a fresh stats item for every user with tasks; returns users written"""
+    rollups = defaultdict(Counter)
+    tasks = iter_scan(
+        tasks_table,
+        ProjectionExpression='userId, #status, tags',
+        ExpressionAttributeNames={'#status': 'status'}
+    )
+
+    for task in tasks:
+        stats = rollups[task['userId']]
+        if task.get('status') == 'pending':
+            stats['pending'] += 1
+        elif task.get('status') == 'done':
+            stats['completed'] += 1
+            for tag in set(task.get('tags', [])):
+                stats[f"{TAG_PREFIX}{tag}"] += 1
+
+    with index_table.batch_writer() as batch:
+        for user_id, stats in rollups.items():
+            batch.put_item(Item={'userId': user_id, 'indexKey': STATS_KEY, **stats})
+
+    return len(rollups)
+
+
+if __name__ == '__main__':
+    dynamodb = boto3.resource('dynamodb')
+    users = backfill(dynamodb.Table(TASKS_TABLE), dynamodb.Table(USER_INDEX_TABLE))
+    print(f"✅ Rebuilt stats for {users} users")
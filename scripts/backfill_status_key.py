@@ -0,0 +1,56 @@
+"""
+Backfill statusKey on existing tasks
+Tasks created before the status index existed are invisible to it;
+run once after adding userId-statusKey-index (see DEPLOYMENT.md)
+"""
+
+import os
+import sys
+
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'layers', 'taskbot_core'))
+
+from taskbot_core.dynamo import iter_scan  # noqa: E402
+from taskbot_core.status_index import status_key  # noqa: E402
+from taskbot_core.sync import DELETED_STATUS  # noqa: E402
+
+TASKS_TABLE = os.environ.get('TASKS_TABLE_NAME', 'telegram-bot-tasks')
+
+
+def backfill(table) -> int:
+    """Stamp statusKey on every live task that lacks one; returns count"""
+    updated = 0
+    missing = iter_scan(
+        table,
+        FilterExpression='attribute_not_exists(statusKey) AND #status <> :deleted',
+        ProjectionExpression='userId, taskId, #status, priority, remindAt',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={':deleted': DELETED_STATUS}
+    )
+
+    for task in missing:
+        try:
+            table.update_item(
+                Key={'userId': task['userId'], 'taskId': task['taskId']},
+                UpdateExpression='SET statusKey = :status_key',
+                # Leave tasks alone if a Lambda wrote a fresher key meanwhile
+                ConditionExpression='attribute_not_exists(statusKey)',
+                ExpressionAttributeValues={
+                    ':status_key': status_key(
+                        task.get('status', 'pending'),
+                        task.get('priority'),
+                        task.get('remindAt'),
+                    )
+                }
+            )
+            updated += 1
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            continue
+
+    return updated
+
+
+if __name__ == '__main__':
+    count = backfill(boto3.resource('dynamodb').Table(TASKS_TABLE))
+    print(f"✅ Backfilled statusKey on {count} tasks")
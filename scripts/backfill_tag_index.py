@@ -0,0 +1,56 @@
+"""
+Rebuild the tag index from existing tasks
+Run once after deploying the user index table (see DEPLOYMENT.md);
+safe to re-run, counts are recomputed from scratch
+"""
+
+import os
+import sys
+from collections import Counter, defaultdict
+
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'layers', 'taskbot_core'))
+
+from taskbot_core.dynamo import iter_scan  # noqa: E402
+from taskbot_core.tag_index import TAG_COUNTS_KEY, TAG_ENTRY_PREFIX  # noqa: E402
+
+TASKS_TABLE = os.environ.get('TASKS_TABLE_NAME', 'telegram-bot-tasks')
+USER_INDEX_TABLE = os.environ['USER_INDEX_TABLE_NAME']
+
+
+def backfill(tasks_table, index_table) -> int:
+    """Write tag entries and counts for every pending task; returns users indexed"""
+    counts = defaultdict(Counter)
+    pending = iter_scan(
+        tasks_table,
+        FilterExpression='#status = :pending AND size(tags) > :zero',
+        ProjectionExpression='userId, taskId, tags',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={':pending': 'pending', ':zero': 0}
+    )
+
+    with index_table.batch_writer(overwrite_by_pkeys=['userId', 'indexKey']) as batch:
+        for task in pending:
+            for tag in set(task['tags']):
+                counts[task['userId']][tag] += 1
+                batch.put_item(Item={
+                    'userId': task['userId'],
+                    'indexKey': f"{TAG_ENTRY_PREFIX}{tag}#{task['taskId']}",
+                    'taskId': task['taskId']
+                })
+
+        for user_id, tags in counts.items():
+            batch.put_item(Item={
+                'userId': user_id,
+                'indexKey': TAG_COUNTS_KEY,
+                **{f"#{tag}": count for tag, count in tags.items()}
+            })
+
+    return len(counts)
+
+
+if __name__ == '__main__':
+    dynamodb = boto3.resource('dynamodb')
+    users = backfill(dynamodb.Table(TASKS_TABLE), dynamodb.Table(USER_INDEX_TABLE))
+    print(f"✅ Indexed tags for {users} users")
@@ -0,0 +1,130 @@
+"""
+Micro-benchmark for the reminder time parser
+Times taskbot_core.timeparse.parse_smart_time against the previous
+multi-regex implementation over a corpus of typical task messages (with and
+without a time, English and Russian) and reports per-message cost and how
+many messages each one understood, plus a like-for-like cost over only the
+messages both of them understand.
+Usage: python scripts/bench_time_parser.py [--rounds N]
+"""
+
+import os
+import re
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'layers', 'taskbot_core'))
+
+from taskbot_core.timeparse import parse_smart_time  # noqa: E402
+
+CORPUS = [
+    "Meeting in 2 hours #work",
+    "Buy milk Friday 18:00",
+    "Call dentist tomorrow 14:00",
+    "in 30 min check the oven",
+    "Submit the report by 17:30 #work #urgent",
+    "Pay rent on Monday",
+    "call mom tonight",
+    "standup tomorrow 9am",
+    "gym at 7 pm",
+    "renew passport in 3 days",
+    "water the plants",
+    "Read chapter 4 of the book",
+    "#shopping eggs, bread, 2 bottles of water",
+    "Review PR 1234 before the release",
+    "через 2 часа позвонить врачу",
+    "в понедельник сдать отчёт",
+    "завтра в 7 вечера встреча",
+    "купить хлеб завтра",
+    "через полчаса выключить духовку",
+    "в среду в 10:00 планёрка #работа",
+    "оплатить счёт послезавтра",
+    "через 2 недели продлить подписку",
+    "позвонить бабушке в воскресенье вечером",
+    "в 9 утра пробежка",
+    "прочитать статью",
+    "купить 3 пачки молока #покупки",
+]
+
+
+def legacy_parse_smart_time(text):
+    """parse_smart_time as it was before the single-pass parser"""
+    text_lower = text.lower()
+    now = datetime.utcnow()
+
+    if match := re.search(r'in (\d+) ?(h|hour|hours)', text_lower):
+        return now + timedelta(hours=int(match.group(1)))
+
+    if match := re.search(r'in (\d+) ?(m|min|minute|minutes)', text_lower):
+        return now + timedelta(minutes=int(match.group(1)))
+
+    days_map = {
+        'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+        'friday': 4, 'saturday': 5, 'sunday': 6,
+        'понедельник': 0, 'вторник': 1, 'среда': 2, 'четверг': 3,
+        'пятница': 4, 'суббота': 5, 'воскресенье': 6
+    }
+
+    for day_name, day_num in days_map.items():
+        if day_name in text_lower:
+            days_ahead = (day_num - now.weekday()) % 7 or 7
+            target_date = now + timedelta(days=days_ahead)
+            time_match = re.search(r'(\d{1,2}):(\d{2})', text)
+            if time_match:
+                return target_date.replace(hour=int(time_match.group(1)),
+                                           minute=int(time_match.group(2)), second=0)
+            return target_date.replace(hour=9, minute=0, second=0)
+
+    if 'tomorrow' in text_lower or 'завтра' in text_lower:
+        target = now + timedelta(days=1)
+        time_match = re.search(r'(\d{1,2}):(\d{2})', text)
+        if time_match:
+            return target.replace(hour=int(time_match.group(1)),
+                                  minute=int(time_match.group(2)), second=0)
+        return target.replace(hour=9, minute=0, second=0)
+
+    if time_match := re.search(r'(\d{1,2}):(\d{2})', text):
+        hour, minute = int(time_match.group(1)), int(time_match.group(2))
+        target = now.replace(hour=hour, minute=minute, second=0)
+        if target < now:
+            target += timedelta(days=1)
+        return target
+
+    return None
+
+
+def bench(parse, rounds: int, corpus=CORPUS):
+    """(microseconds per message, messages parsed); best of 5 to damp noise"""
+    seconds = min(timeit.repeat(
+        lambda: [parse(text) for text in corpus], number=rounds, repeat=5
+    ))
+    parsed = sum(parse(text) is not None for text in corpus)
+    return seconds / (rounds * len(corpus)) * 1e6, parsed
+
+
+def main(argv):
+    rounds = int(argv[argv.index('--rounds') + 1]) if '--rounds' in argv else 2000
+
+    # Messages without a time walk every legacy branch: its worst case
+    untimed = [text for text in CORPUS if parse_smart_time(text) is None]
+    # Understanding a message costs a datetime; compare on equal work too
+    both = [
+        text for text in CORPUS
+        if parse_smart_time(text) is not None
+        and legacy_parse_smart_time(text) is not None
+    ]
+    print(f"{len(CORPUS)} messages ({len(untimed)} without a time, "
+          f"{len(both)} understood by both) x {rounds} rounds")
+    parsers = [('legacy', legacy_parse_smart_time), ('single-pass', parse_smart_time)]
+    for name, parse in parsers:
+        per_message, parsed = bench(parse, rounds)
+        per_untimed, _ = bench(parse, rounds, untimed)
+        per_both, _ = bench(parse, rounds, both)
+        print(f"  {name:12} {per_message:6.2f} µs/message "
+              f"({per_untimed:.2f} without a time, {per_both:.2f} understood by both), "
+              f"understood {parsed}/{len(CORPUS)}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
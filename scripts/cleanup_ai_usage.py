@@ -0,0 +1,44 @@
+"""
+Strip the legacy per-day `ai_usage_YYYY-MM-DD` counters from user profiles
+AI rate limits now live in short-lived items in the user index table (see
+DEPLOYMENT.md); safe to re-run, profiles without counters are skipped
+"""
+
+import os
+import sys
+
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'layers', 'taskbot_core'))
+
+from taskbot_core.dynamo import iter_scan  # noqa: E402
+
+USERS_TABLE = os.environ.get('USERS_TABLE_NAME', 'telegram-bot-user-settings')
+LEGACY_PREFIX = 'ai_usage_'
+# Attributes per UpdateExpression, well under the expression size limit
+MAX_REMOVE = 100
+
+
+def cleanup(users_table) -> int:
+    """REMOVE every legacy counter; returns profiles cleaned"""
+    cleaned = 0
+    for profile in iter_scan(users_table):
+        stale = [name for name in profile if name.startswith(LEGACY_PREFIX)]
+        for start in range(0, len(stale), MAX_REMOVE):
+            chunk = stale[start:start + MAX_REMOVE]
+            users_table.update_item(
+                Key={'userId': profile['userId']},
+                UpdateExpression='REMOVE ' + ', '.join(
+                    f"#a{i}" for i in range(len(chunk))
+                ),
+                ExpressionAttributeNames={
+                    f"#a{i}": name for i, name in enumerate(chunk)
+                }
+            )
+        cleaned += bool(stale)
+    return cleaned
+
+
+if __name__ == '__main__':
+    users = cleanup(boto3.resource('dynamodb').Table(USERS_TABLE))
+    print(f"✅ Removed legacy AI usage counters from {users} profiles")
@@ -0,0 +1,90 @@
+"""
+Import-time profile of each Lambda's cold start
+Runs `python -X importtime -c "import app"` per function (with placeholder
+environment variables) and prints the total import time, the heaviest
+top-level imports and how many AWS clients were built while importing.
+Usage: python scripts/profile_imports.py [function ...] [--top N]
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+LAYER = os.path.join(ROOT, 'layers', 'taskbot_core')
+FUNCTIONS = [
+    'webhook_handler', 'miniapp_api', 'reminder_handler', 'motivation_handler',
+    'ai_processor',
+]
+
+# Enough configuration for every app module to import without AWS access
+PLACEHOLDER_ENV = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'TASKS_TABLE_NAME': 'telegram-bot-tasks',
+    'USERS_TABLE_NAME': 'telegram-bot-user-settings',
+    'MOTIVATION_TABLE_NAME': 'telegram-bot-motivation',
+    'BOT_TOKEN_SECRET': 'telegram-bot-token',
+    'REMINDER_LAMBDA_ARN': 'arn:aws:lambda:us-east-1:000000000000:function:reminder',
+    # The warm-up handshake would otherwise overlap (and hide) the import time
+    'TELEGRAM_PREWARM': 'false',
+}
+
+PROBE = (
+    "import json, app; from taskbot_core import clients; "
+    "print(json.dumps(clients.built()))"
+)
+
+
+def parse_importtime(stderr: str):
+    """(module, nesting depth, cumulative microseconds) per import"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # Two spaces per level
+        imports.append((name.strip(), depth, int(cumulative)))
+    return imports
+
+
+def profile(function: str):
+    env = dict(os.environ, **PLACEHOLDER_ENV, PYTHONPATH=LAYER)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=os.path.join(ROOT, 'lambda', function), env=env,
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    built = json.loads(result.stdout.strip().splitlines()[-1])
+    return parse_importtime(result.stderr), built
+
+
+def main(argv):
+    top_n = 8
+    if '--top' in argv:
+        i = argv.index('--top')
+        top_n = int(argv[i + 1])
+        argv = argv[:i] + argv[i + 2:]
+
+    for function in argv or FUNCTIONS:
+        try:
+            imports, built = profile(function)
+        except RuntimeError as e:
+            print(f"❌ {function}: {e}")
+            continue
+        total = sum(us for _, depth, us in imports if depth == 0)
+        app = next(
+            (us for name, depth, us in imports if name == 'app' and depth == 0), 0
+        )
+        print(f"\n{function}: {total / 1000:.1f} ms of imports "
+              f"({app / 1000:.1f} ms for app), clients built at import: {built}")
+        # What app itself pulls in, heaviest first
+        direct = [(name, us) for name, depth, us in imports if depth == 1]
+        for name, us in sorted(direct, key=lambda x: x[1], reverse=True)[:top_n]:
+            print(f"  {us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
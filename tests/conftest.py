@@ -1,8 +1,14 @@
 import os
+import sys
 import pytest
 import boto3
 from moto import mock_aws
 
+# Shared layer code, importable the same way the Lambda runtime exposes it
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../layers/taskbot_core')
+))
+
 @pytest.fixture
 def aws_credentials():
     """Mocked AWS Credentials for moto."""
@@ -28,7 +34,100 @@ def tasks_table(dynamodb):
         AttributeDefinitions=[
             {"AttributeName": "userId", "AttributeType": "N"},
             {"AttributeName": "taskId", "AttributeType": "S"},
+            {"AttributeName": "updatedAt", "AttributeType": "N"},
+            {"AttributeName": "statusKey", "AttributeType": "S"},
+            {"AttributeName": "remindBucket", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "userId-updatedAt-index",
+                "KeySchema": [
+                    {"AttributeName": "userId", "KeyType": "HASH"},
+                    {"AttributeName": "updatedAt", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+                "ProvisionedThroughput": {
+                    "ReadCapacityUnits": 1, "WriteCapacityUnits": 1
+                },
+            },
+            {
+                "IndexName": "userId-statusKey-index",
+                "KeySchema": [
+                    {"AttributeName": "userId", "KeyType": "HASH"},
+                    {"AttributeName": "statusKey", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+                "ProvisionedThroughput": {
+                    "ReadCapacityUnits": 1, "WriteCapacityUnits": 1
+                },
+            },
+            {
+                "IndexName": "remindBucket-index",
+                "KeySchema": [
+                    {"AttributeName": "remindBucket", "KeyType": "HASH"},
+                    {"AttributeName": "taskId", "KeyType": "RANGE"},
+                ],
+                "Projection": {
+                    "ProjectionType": "INCLUDE",
+                    "NonKeyAttributes": ["text", "status", "notified", "remindAt"],
+                },
+                "ProvisionedThroughput": {
+                    "ReadCapacityUnits": 1, "WriteCapacityUnits": 1
+                },
+            },
         ],
         ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
     )
     return table
+
+@pytest.fixture
+def user_index_table(dynamodb):
+    table = dynamodb.create_table(
+        TableName="telegram-bot-user-index",
+        KeySchema=[
+            {"AttributeName": "userId", "KeyType": "HASH"},
+            {"AttributeName": "indexKey", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "userId", "AttributeType": "N"},
+            {"AttributeName": "indexKey", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return table
+
+@pytest.fixture
+def metrics_table(dynamodb):
+    table = dynamodb.create_table(
+        TableName="telegram-bot-metrics",
+        KeySchema=[
+            {"AttributeName": "metric", "KeyType": "HASH"},
+            {"AttributeName": "shard", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "metric", "AttributeType": "S"},
+            {"AttributeName": "shard", "AttributeType": "N"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return table
+
+@pytest.fixture
+def users_table(dynamodb):
+    table = dynamodb.create_table(
+        TableName="telegram-bot-user-settings",
+        KeySchema=[{"AttributeName": "userId", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "userId", "AttributeType": "N"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return table
+
+@pytest.fixture
+def processed_updates_table(dynamodb):
+    table = dynamodb.create_table(
+        TableName="telegram-bot-processed-updates",
+        KeySchema=[{"AttributeName": "updateId", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "updateId", "AttributeType": "N"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return table
@@ -0,0 +1,27 @@
+from datetime import date, datetime, timezone
+
+from taskbot_core.activity import activity_writes, get_activity
+
+
+def _complete_on(index_table, user_id, day):
+    completed_at = datetime(*day, 12, tzinfo=timezone.utc).timestamp()
+    (write,) = activity_writes(user_id, completed_at)
+    index_table.meta.client.transact_write_items(TransactItems=[write])
+
+
+def test_activity_counts_per_day_and_reads_only_the_range(user_index_table):
+    for day in [(2026, 1, 31), (2026, 2, 1), (2026, 2, 1), (2026, 3, 15), (2026, 5, 2)]:
+        _complete_on(user_index_table, 1, day)
+    _complete_on(user_index_table, 2, (2026, 2, 1))
+
+    activity = get_activity(user_index_table, 1, date(2026, 1, 31), date(2026, 3, 31))
+
+    assert activity == {"2026-01-31": 1, "2026-02-01": 2, "2026-03-15": 1}
+    months = [
+        item["indexKey"] for item in user_index_table.scan()["Items"]
+        if item["userId"] == 1
+    ]
+    assert sorted(months) == [
+        "activity#2026-01", "activity#2026-02", "activity#2026-03", "activity#2026-05"
+    ]
+    assert all("expiresAt" in item for item in user_index_table.scan()["Items"])
@@ -0,0 +1,52 @@
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import urlencode
+
+from taskbot_core.auth import InitDataValidator
+from taskbot_core.secret_cache import SecretCache, webapp_secret_key
+from taskbot_core.sessions import SessionCache
+
+
+class FakeSecrets:
+    def get_secret_value(self, SecretId):
+        return {"SecretString": "123:bot-token"}
+
+
+def signed_init_data(fields, token="123:bot-token"):
+    """initData as Telegram builds it: the hash covers the decoded values"""
+    check = "\n".join(f"{k}={fields[k]}" for k in sorted(fields))
+    key = webapp_secret_key(token)
+    digest = hmac.new(key, check.encode(), hashlib.sha256).hexdigest()
+    return urlencode({**fields, "hash": digest})
+
+
+def validator():
+    return InitDataValidator(SecretCache(client=FakeSecrets()), "bot", SessionCache())
+
+
+def test_valid_init_data_returns_user_and_is_cached():
+    auth = validator()
+    init_data = signed_init_data({
+        "auth_date": str(int(time.time())),
+        "query_id": "AAE=x",
+        "user": json.dumps({"id": 42, "first_name": "Ann"}),
+    })
+
+    assert auth.validate(init_data) == 42
+    assert auth.validate(init_data) == 42
+    assert auth.sessions.stats()["hits"] == 1
+
+
+def test_tampered_or_stale_init_data_is_rejected():
+    auth = validator()
+    fields = {"auth_date": str(int(time.time())), "user": json.dumps({"id": 42})}
+    init_data = signed_init_data(fields)
+
+    assert auth.validate(init_data.replace("42", "43")) is None
+    assert auth.validate(init_data + "&extra=1") is None
+    assert auth.validate("user=%7B%7D") is None
+
+    stale = signed_init_data({**fields, "auth_date": str(int(time.time()) - 2 * 86400)})
+    assert auth.validate(stale) is None
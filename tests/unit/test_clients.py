@@ -0,0 +1,28 @@
+from taskbot_core import clients
+
+
+def test_lazy_stand_in_builds_once_on_first_use():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return {"name": "built"}
+
+    proxy = clients.Lazy(factory)
+    assert calls == []
+    assert "not built" in repr(proxy)
+
+    assert proxy.get("name") == "built"
+    assert proxy.get("name") == "built"
+    assert calls == [1]
+
+
+def test_lazy_table_is_memoised_per_name(users_table):
+    first = clients.lazy_table("telegram-bot-user-settings")
+    second = clients.lazy_table("telegram-bot-user-settings")
+
+    first.put_item(Item={"userId": 1, "xp": 5})
+    assert second.get_item(Key={"userId": 1})["Item"]["xp"] == 5
+    name = "telegram-bot-user-settings"
+    assert clients.table(name) is clients.table(name)
+    assert clients.built()["table"] >= 1
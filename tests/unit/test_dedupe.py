@@ -0,0 +1,22 @@
+from taskbot_core.dedupe import UpdateDeduper
+
+
+def test_update_is_claimed_once_across_containers(processed_updates_table):
+    warm = UpdateDeduper(processed_updates_table)
+    other = UpdateDeduper(processed_updates_table)  # a second container, empty LRU
+
+    assert warm.claim(100) is True
+    assert warm.claim(100) is False
+    assert other.claim(100) is False
+    item = processed_updates_table.get_item(Key={"updateId": 100})["Item"]
+    assert item["expiresAt"] > 0
+
+
+def test_released_update_can_be_claimed_again(processed_updates_table):
+    deduper = UpdateDeduper(processed_updates_table, max_recent=1)
+    deduper.claim(1)
+    deduper.claim(2)  # evicts 1 from the LRU, the table still remembers it
+
+    assert deduper.claim(1) is False
+    deduper.release(2)
+    assert deduper.claim(2) is True
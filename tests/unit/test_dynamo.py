@@ -0,0 +1,96 @@
+import pytest
+from taskbot_core.dynamo import iter_batch_get, iter_pages, iter_query
+from taskbot_core.status_index import status_key, status_query
+
+
+def seed(tasks_table, count, user_id=12345):
+    for i in range(count):
+        tasks_table.put_item(
+            Item={"userId": user_id, "taskId": f"t{i:03d}", "text": f"Task {i}"}
+        )
+
+
+def test_iter_query_follows_every_page(tasks_table):
+    seed(tasks_table, 25)
+
+    pages = list(iter_pages(tasks_table.query, KeyConditionExpression="userId = :uid",
+                            ExpressionAttributeValues={":uid": 12345}, Limit=10))
+    items = list(iter_query(tasks_table, KeyConditionExpression="userId = :uid",
+                            ExpressionAttributeValues={":uid": 12345}, Limit=10))
+
+    assert len(pages) == 3
+    assert len(items) == 25
+
+
+def test_iter_query_caps_items_and_pages(tasks_table):
+    seed(tasks_table, 25)
+    query = {"KeyConditionExpression": "userId = :uid",
+             "ExpressionAttributeValues": {":uid": 12345}, "Limit": 10}
+
+    assert len(list(iter_query(tasks_table, max_items=7, **query))) == 7
+    assert len(list(iter_query(tasks_table, max_pages=2, **query))) == 20
+
+
+def test_status_index_orders_pending_by_priority_then_time(tasks_table, monkeypatch):
+    monkeypatch.setenv("STATUS_INDEX_ENABLED", "true")
+    tasks = [("a", "done", "high", 100), ("b", "pending", "low", 50),
+             ("c", "pending", "high", 300), ("d", "pending", "high", 200)]
+    for task_id, status, priority, remind_at in tasks:
+        tasks_table.put_item(Item={
+            "userId": 1, "taskId": task_id, "status": status,
+            "statusKey": status_key(status, priority, remind_at),
+        })
+
+    pending = list(iter_query(tasks_table, **status_query(1, "pending")))
+
+    assert [t["taskId"] for t in pending] == ["d", "c", "b"]
+
+
+def test_status_query_falls_back_to_base_table_without_index(tasks_table, monkeypatch):
+    monkeypatch.delenv("STATUS_INDEX_ENABLED", raising=False)
+    for task_id, status in [("a", "done"), ("b", "pending"), ("c", "pending")]:
+        tasks_table.put_item(Item={"userId": 1, "taskId": task_id, "status": status})
+
+    query = status_query(1, "pending")
+    pending = list(iter_query(tasks_table, **query))
+
+    assert "IndexName" not in query
+    assert sorted(t["taskId"] for t in pending) == ["b", "c"]
+
+
+class StuckBatchGet:
+    """BatchGetItem stub that never processes task "b" """
+
+    def __init__(self):
+        self.calls = 0
+
+    def batch_get_item(self, RequestItems):
+        self.calls += 1
+        keys = RequestItems["tasks"]["Keys"]
+        stuck = [key for key in keys if key["taskId"] == "b"]
+        return {
+            "Responses": {"tasks": [key for key in keys if key["taskId"] != "b"]},
+            "UnprocessedKeys": {"tasks": {"Keys": stuck}} if stuck else {},
+        }
+
+
+def test_iter_batch_get_returns_keys_left_unprocessed(monkeypatch):
+    monkeypatch.setattr("taskbot_core.dynamo.time.sleep", lambda seconds: None)
+    dynamodb = StuckBatchGet()
+    keys = [{"userId": 1, "taskId": "a"}, {"userId": 1, "taskId": "b"}]
+    unprocessed = []
+
+    items = list(iter_batch_get(dynamodb, "tasks", keys, max_attempts=3,
+                                unprocessed=unprocessed))
+
+    assert items == [{"userId": 1, "taskId": "a"}]
+    assert unprocessed == [{"userId": 1, "taskId": "b"}]
+    assert dynamodb.calls == 3
+
+
+def test_iter_batch_get_raises_when_keys_are_dropped(monkeypatch):
+    monkeypatch.setattr("taskbot_core.dynamo.time.sleep", lambda seconds: None)
+    keys = [{"userId": 1, "taskId": "b"}]
+
+    with pytest.raises(RuntimeError):
+        list(iter_batch_get(StuckBatchGet(), "tasks", keys, max_attempts=2))
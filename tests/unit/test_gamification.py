@@ -0,0 +1,103 @@
+from datetime import datetime
+
+from taskbot_core import gamification
+
+
+def test_first_award_creates_profile_in_one_write(users_table):
+    gamification._profiles.clear()
+    noon = datetime(2026, 3, 10, 12, 0)
+
+    outcome = gamification.award_xp(users_table, 1, "high", now=noon)
+
+    profile = users_table.get_item(Key={"userId": 1})["Item"]
+    assert outcome["new_profile"] is True
+    assert outcome["unlocked_achievements"] == ["🎯 First Task"]
+    assert profile["totalXP"] == 30 + gamification.ACHIEVEMENT_XP == outcome["total_xp"]
+    assert profile["version"] == 1
+    assert "activityLog" not in profile
+
+
+def test_stale_cached_profile_retries_from_returned_item(users_table):
+    gamification._profiles.clear()
+    day = datetime(2026, 3, 10, 12, 0)
+    gamification.award_xp(users_table, 1, "medium", now=day)
+
+    # Another container completes a task, our cached copy is now one version behind
+    users_table.update_item(
+        Key={"userId": 1},
+        UpdateExpression="ADD totalXP :xp, tasksCompleted :one, version :one",
+        ExpressionAttributeValues={":xp": 20, ":one": 1},
+    )
+    outcome = gamification.award_xp(users_table, 1, "medium", now=day)
+
+    profile = users_table.get_item(Key={"userId": 1})["Item"]
+    assert outcome["new_profile"] is False
+    assert profile["totalXP"] == outcome["total_xp"] == 70 + 20 + 20
+    assert profile["tasksCompleted"] == 3
+    assert profile["version"] == 3
+
+
+def test_penalty_never_takes_xp_below_zero(users_table):
+    gamification._profiles.clear()
+    # Legacy profile without a version
+    users_table.put_item(Item={"userId": 1, "totalXP": 4})
+
+    outcome = gamification.penalize_xp(users_table, 1, gamification.XP_DELETE_PENALTY)
+
+    profile = users_table.get_item(Key={"userId": 1})["Item"]
+    assert outcome["total_xp"] == profile["totalXP"] == 0
+    assert outcome["xp_delta"] == -4
+    assert profile["daysWithoutDelete"] == 0
+
+
+def _completion(tasks_table, task_id):
+    return {"Update": {
+        "TableName": tasks_table.name,
+        "Key": {"userId": 1, "taskId": task_id},
+        "UpdateExpression": "SET #status = :done",
+        "ConditionExpression": "#status = :pending",
+        "ExpressionAttributeNames": {"#status": "status"},
+        "ExpressionAttributeValues": {":pending": "pending", ":done": "done"},
+    }}
+
+
+def test_complete_task_commits_task_and_xp_together(tasks_table, users_table):
+    gamification._profiles.clear()
+    day = datetime(2026, 3, 10, 12, 0)
+    tasks_table.put_item(Item={"userId": 1, "taskId": "a", "status": "pending"})
+    tasks_table.put_item(Item={"userId": 1, "taskId": "b", "status": "pending"})
+    gamification.award_xp(users_table, 1, "medium", now=day)
+    users_table.update_item(  # concurrent award elsewhere: cached guess is stale
+        Key={"userId": 1},
+        UpdateExpression="ADD totalXP :xp, version :one",
+        ExpressionAttributeValues={":xp": 20, ":one": 1},
+    )
+
+    def complete(task_id):
+        writes = [_completion(tasks_table, task_id)]
+        return gamification.complete_task(users_table, 1, "low", writes, now=day)
+
+    outcome = complete("a")
+    again = complete("a")
+    cached = complete("b")
+
+    profile = users_table.get_item(Key={"userId": 1})["Item"]
+    assert outcome["total_xp"] == 70 + 20 + 10
+    assert again is None  # already done: neither the task nor the profile changed
+    assert cached["total_xp"] == profile["totalXP"] == 110
+    assert profile["version"] == 4
+    task = tasks_table.get_item(Key={"userId": 1, "taskId": "b"})["Item"]
+    assert task["status"] == "done"
+
+
+def test_get_profile_creates_default_once(users_table):
+    gamification._profiles.clear()
+
+    profile, created = gamification.get_profile(users_table, 7)
+    assert created is True
+    assert profile["totalXP"] == 0 and profile["achievements"] == []
+
+    gamification.award_xp(users_table, 7, "low", now=datetime(2026, 3, 10, 12, 0))
+    profile, created = gamification.get_profile(users_table, 7)
+    assert created is False
+    assert profile["tasksCompleted"] == 1
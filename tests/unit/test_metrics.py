@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from taskbot_core import metrics
+
+
+def test_sharded_counters_sum_across_shards(metrics_table):
+    for _ in range(40):
+        metrics.increment(metrics_table, {"users": 1, "totalXP": 10})
+    metrics.increment(metrics_table, {"totalXP": -5})
+
+    assert metrics.read(metrics_table) == {"users": 40, "totalXP": 395}
+    assert len(metrics_table.scan()["Items"]) > 1
+
+
+def test_mark_active_counts_each_user_once_per_day(user_index_table, metrics_table):
+    day = datetime(2026, 3, 10, 9, 0)
+    metrics._active_seen.clear()
+
+    for user_id in (1, 2, 1):
+        metrics.mark_active(user_index_table, metrics_table, user_id, now=day)
+    metrics._active_seen.clear()  # a cold container must not double count either
+    metrics.mark_active(user_index_table, metrics_table, 1, now=day)
+
+    assert metrics.read(metrics_table, metrics.day_metric(day)) == {"activeUsers": 2}
@@ -6,9 +6,13 @@ import pytest
 # Add lambda directory to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../lambda/miniapp_api')))
 
-from app import handle_create_task, handle_get_tasks
+from app import handle_create_task, handle_get_changes, handle_get_tasks
+from taskbot_core.status_index import status_key
+from taskbot_core.sync import tombstone_write
+from taskbot_core.tag_index import write_task
 
-def test_create_task(tasks_table):
+
+def test_create_task(tasks_table, user_index_table):
     user_id = 12345
     body = {"text": "Buy milk", "priority": "high"}
     
@@ -36,3 +40,93 @@ def test_get_tasks(tasks_table):
     assert response["statusCode"] == 200
     body_json = json.loads(response["body"])
     assert len(body_json["tasks"]) == 2
+
+def test_get_tasks_paginates_with_cursor(tasks_table):
+    user_id = 12345
+    for i in range(5):
+        tasks_table.put_item(Item={"userId": user_id, "taskId": f"t{i}",
+                                   "text": f"Task {i}", "status": "pending"})
+
+    first = json.loads(
+        handle_get_tasks(user_id, {"limit": "3", "fields": "text"})["body"]
+    )
+    assert [t["id"] for t in first["tasks"]] == ["t0", "t1", "t2"]
+    assert set(first["tasks"][0]) == {"id", "text"}
+    assert first["nextCursor"]
+
+    second = json.loads(
+        handle_get_tasks(user_id, {"limit": "3", "cursor": first["nextCursor"]})["body"]
+    )
+    assert [t["id"] for t in second["tasks"]] == ["t3", "t4"]
+    assert second["nextCursor"] is None
+
+@pytest.mark.parametrize("index_enabled", ["true", "false"])
+def test_get_tasks_by_status_pages_through_one_status(tasks_table, monkeypatch,
+                                                      index_enabled):
+    monkeypatch.setenv("STATUS_INDEX_ENABLED", index_enabled)
+    user_id = 12345
+    for i, (status, priority) in enumerate([
+        ("pending", "low"), ("done", "high"), ("pending", "high"),
+        ("deleted", "high"), ("pending", "medium"),
+    ]):
+        tasks_table.put_item(Item={
+            "userId": user_id, "taskId": f"t{i}", "text": f"Task {i}",
+            "status": status, "priority": priority, "remindAt": 100 + i,
+            "statusKey": status_key(status, priority, 100 + i),
+        })
+
+    first = json.loads(handle_get_tasks(
+        user_id, {"status": "pending", "limit": "2", "fields": "status"}
+    )["body"])
+    second = json.loads(handle_get_tasks(
+        user_id, {"status": "pending", "limit": "2", "cursor": first["nextCursor"]}
+    )["body"])
+
+    ids = [t["id"] for t in first["tasks"] + second["tasks"]]
+    if index_enabled == "true":
+        assert ids == ["t2", "t4", "t0"]  # Priority order straight from the index
+    else:
+        assert sorted(ids) == ["t0", "t2", "t4"]
+    assert {t["status"] for t in first["tasks"]} == {"pending"}
+    assert second["nextCursor"] is None
+
+def test_get_tasks_rejects_foreign_cursor(tasks_table):
+    tasks_table.put_item(Item={"userId": 1, "taskId": "t0", "text": "Mine"})
+    tasks_table.put_item(Item={"userId": 1, "taskId": "t1", "text": "Mine too"})
+    cursor = json.loads(handle_get_tasks(1, {"limit": "1"})["body"])["nextCursor"]
+
+    response = handle_get_tasks(2, {"limit": "1", "cursor": cursor})
+
+    assert response["statusCode"] == 400
+
+def test_get_changes_returns_updates_and_tombstones(
+    tasks_table, user_index_table, monkeypatch
+):
+    monkeypatch.setenv("CHANGE_FEED_ENABLED", "true")
+    user_id = 12345
+    handle_create_task(user_id, {"text": "Old"})
+    handle_create_task(user_id, {"text": "Gone"})
+    listing = json.loads(handle_get_tasks(user_id)["body"])
+    gone = next(t["id"] for t in listing["tasks"] if t["text"] == "Gone")
+
+    tombstone = tombstone_write(tasks_table.name, user_id, gone, "pending")
+    write_task(tasks_table, tombstone, [])
+    handle_create_task(user_id, {"text": "New"})
+
+    since = {"since": str(listing["version"])}
+    changes = json.loads(handle_get_changes(user_id, since)["body"])
+    assert changes["reset"] is False
+    assert gone in changes["deleted"]
+    assert "New" in [t["text"] for t in changes["changes"]]
+    assert changes["version"] >= listing["version"]
+
+    remaining = json.loads(handle_get_tasks(user_id)["body"])["tasks"]
+    assert sorted(t["text"] for t in remaining) == ["New", "Old"]
+    assert handle_get_changes(user_id, {})["statusCode"] == 400
+
+def test_get_changes_resets_until_change_feed_enabled(tasks_table, monkeypatch):
+    monkeypatch.delenv("CHANGE_FEED_ENABLED", raising=False)
+
+    changes = json.loads(handle_get_changes(12345, {"since": "1"})["body"])
+
+    assert changes["reset"] is True
@@ -0,0 +1,85 @@
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+
+APP_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '../../lambda/motivation_handler/app.py'
+))
+
+
+@pytest.fixture
+def motivation(monkeypatch, users_table):
+    for name, value in {
+        "USERS_TABLE_NAME": "telegram-bot-user-settings",
+        "MOTIVATION_TABLE_NAME": "telegram-bot-motivational-messages",
+        "BOT_TOKEN_SECRET": "telegram-bot-token",
+        "TELEGRAM_PREWARM": "false",
+    }.items():
+        monkeypatch.setenv(name, value)
+    # Loaded under its own name: the mini-app tests already import an `app`
+    spec = importlib.util.spec_from_file_location("motivation_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Context:
+    """Lambda context whose remaining time is read from a list, then stays put"""
+
+    def __init__(self, *remaining_ms):
+        self.remaining = list(remaining_ms)
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining.pop(0) if len(self.remaining) > 1 else self.remaining[0]
+
+
+def sent_to(motivation, monkeypatch):
+    sent = []
+    monkeypatch.setattr(motivation, "send_telegram_message",
+                        lambda chat_id, text: sent.append(chat_id) or True)
+    return sent
+
+
+def test_broadcast_reaches_every_due_user_once(motivation, users_table, monkeypatch):
+    now = int(time.time())
+    for user_id in range(1, 41):
+        users_table.put_item(Item={"userId": user_id, "motivationEnabled": True})
+    users_table.put_item(Item={"userId": 41, "motivationEnabled": False})
+    users_table.put_item(Item={"userId": 42, "motivationEnabled": True,
+                               "lastMotivationAt": Decimal(now - 3600)})
+    users_table.put_item(Item={"userId": 43, "motivationEnabled": True,
+                               "lastMotivationAt": Decimal(now - 2 * 86400)})
+    sent = sent_to(motivation, monkeypatch)
+
+    result = motivation.lambda_handler({}, Context(60000))
+
+    body = json.loads(result["body"])
+    assert sorted(sent) == [*range(1, 41), 43]
+    assert body["sent_count"] == 41
+    assert body["deferred_segments"] == 0
+    stamped = users_table.get_item(Key={"userId": 43})["Item"]["lastMotivationAt"]
+    assert stamped > now - 60
+
+
+def test_segment_stops_between_batches_close_to_timeout(motivation, users_table,
+                                                        monkeypatch):
+    for user_id in range(1, 11):
+        users_table.put_item(Item={"userId": user_id, "motivationEnabled": True})
+    monkeypatch.setattr(motivation, "SCAN_SEGMENTS", 1)
+    monkeypatch.setattr(motivation, "SEND_BATCH_SIZE", 3)
+    sent = sent_to(motivation, monkeypatch)
+    stats = motivation.BroadcastStats()
+    # Time for two batches of one page, then the margin is reached
+    context = Context(60000, 60000, motivation.TIMEOUT_MARGIN_MS - 1)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        motivation.broadcast_segment(0, ["hi"], Decimal(time.time()),
+                                     Decimal(time.time()), pool, stats, context)
+
+    assert len(sent) == 6
+    assert (stats.due, stats.sent, stats.deferred_segments) == (6, 6, 1)
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from taskbot_core import rate_limit
+
+
+def test_burst_and_daily_limits_share_one_item(user_index_table):
+    def call(minute):
+        return rate_limit.consume(
+            user_index_table, 1, 5, 2, now=datetime(2026, 3, 10, 9, minute)
+        )
+
+    assert call(0) == (True, 4, None)
+    assert call(0) == (True, 3, None)
+    assert call(0) == (False, 3, rate_limit.BURST)  # third call in the same minute
+    assert call(1) == (True, 2, None)
+    assert call(2) == (True, 1, None)
+    assert call(3) == (True, 0, None)
+    assert call(4) == (False, 0, rate_limit.DAILY)
+
+    next_day = datetime(2026, 3, 11, 0, 0)
+    result = rate_limit.consume(user_index_table, 1, 5, 2, now=next_day)
+    assert result == (True, 4, None)
+    items = user_index_table.scan()["Items"]
+    assert sorted(item["indexKey"] for item in items) == [
+        "ai#2026-03-10", "ai#2026-03-11"
+    ]
+    assert all(item["expiresAt"] for item in items)
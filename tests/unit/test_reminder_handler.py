@@ -0,0 +1,162 @@
+import calendar
+import importlib.util
+import json
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from taskbot_core.reminders import remind_bucket
+
+APP_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '../../lambda/reminder_handler/app.py'
+))
+
+
+@pytest.fixture
+def reminder(monkeypatch, tasks_table):
+    monkeypatch.setenv("TASKS_TABLE_NAME", "telegram-bot-tasks")
+    monkeypatch.setenv("BOT_TOKEN_SECRET", "telegram-bot-token")
+    monkeypatch.setenv("TELEGRAM_PREWARM", "false")
+    # Loaded under its own name: the mini-app tests already import an `app`
+    spec = importlib.util.spec_from_file_location("reminder_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "delete_schedules", lambda task_ids: None)
+    return module
+
+
+def seed(tasks_table, *task_ids, user_id=1, **fields):
+    for task_id in task_ids:
+        tasks_table.put_item(Item={
+            "userId": user_id, "taskId": task_id, "text": f"Task {task_id}",
+            "status": "pending", "remindAt": 100, **fields,
+        })
+
+
+def records(*task_ids, user_id=1):
+    return [
+        {"messageId": f"m-{task_id}",
+         "body": json.dumps({"userId": user_id, "taskId": task_id})}
+        for task_id in task_ids
+    ]
+
+
+def test_sqs_batch_reports_only_unsent_reminders(reminder, tasks_table, monkeypatch):
+    seed(tasks_table, "a", "b", "c")
+    monkeypatch.setattr(reminder, "send_telegram_message",
+                        lambda chat_id, text: "Task b" not in text)
+
+    result = reminder.handle_sqs_batch(records("a", "b", "c", "gone"))
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": "m-b"}]}
+    notified = {
+        task_id: tasks_table.get_item(
+            Key={"userId": 1, "taskId": task_id}
+        )["Item"].get("notified")
+        for task_id in "abc"
+    }
+    assert notified == {"a": True, "b": None, "c": True}
+
+
+def test_sqs_batch_skips_tasks_already_handled(reminder, tasks_table, monkeypatch):
+    seed(tasks_table, "a")
+    seed(tasks_table, "b", notified=True)
+    seed(tasks_table, "c", status="done")
+    sent = []
+    monkeypatch.setattr(reminder, "send_telegram_message",
+                        lambda chat_id, text: sent.append(text) or True)
+
+    result = reminder.handle_sqs_batch(records("a", "b", "c"))
+
+    assert result == {"batchItemFailures": []}
+    assert len(sent) == 1
+
+
+def test_notified_write_failure_does_not_fail_sent_records(reminder, tasks_table,
+                                                           monkeypatch):
+    seed(tasks_table, "a", "b")
+    monkeypatch.setattr(reminder, "send_telegram_message", lambda chat_id, text: True)
+
+    def transact_write_items(**kwargs):
+        raise RuntimeError("throttled")
+
+    monkeypatch.setattr(reminder, "dynamodb_client", SimpleNamespace(
+        transact_write_items=transact_write_items,
+        exceptions=SimpleNamespace(TransactionCanceledException=KeyError),
+    ))
+
+    result = reminder.handle_sqs_batch(records("a", "b"))
+
+    assert result == {"batchItemFailures": []}
+
+
+def test_unprocessed_keys_are_reported_and_keep_their_schedules(reminder, tasks_table,
+                                                                monkeypatch):
+    seed(tasks_table, "a", "b")
+    real = reminder.dynamodb.batch_get_item
+
+    def batch_get_item(RequestItems):
+        # DynamoDB never gets round to task b
+        table = reminder.TASKS_TABLE_NAME
+        keys = RequestItems[table]["Keys"]
+        read = [key for key in keys if key["taskId"] != "b"]
+        response = real(RequestItems={table: {"Keys": read}}) if read else {}
+        response["UnprocessedKeys"] = {table: {"Keys": [
+            key for key in keys if key["taskId"] == "b"
+        ]}}
+        return response
+
+    deleted = []
+    monkeypatch.setattr(reminder, "dynamodb", SimpleNamespace(
+        batch_get_item=batch_get_item
+    ))
+    monkeypatch.setattr(reminder, "delete_schedules", deleted.extend)
+    monkeypatch.setattr("taskbot_core.dynamo.time.sleep", lambda seconds: None)
+    monkeypatch.setattr(reminder, "send_telegram_message", lambda chat_id, text: True)
+
+    result = reminder.handle_sqs_batch(records("a", "b"))
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": "m-b"}]}
+    assert deleted == ["a"]
+
+
+NOW = datetime(2026, 3, 10, 12, 0, 15)
+NOW_TS = calendar.timegm(NOW.timetuple())
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return NOW
+
+
+def test_dispatcher_sends_due_reminders_from_recent_buckets(reminder, tasks_table,
+                                                            monkeypatch):
+    monkeypatch.setattr(reminder, "datetime", FrozenDatetime)
+    due = {
+        # User ids spread over every shard; a few minutes back is still in reach
+        **{f"late{user_id}": (user_id, NOW_TS - 180) for user_id in range(1, 9)},
+        "now": (9, NOW_TS - 15),
+    }
+    not_due = {
+        "later-this-minute": (10, NOW_TS + 30),
+        "past-lookback": (11, NOW_TS - 10 * 60),
+    }
+    for task_id, (user_id, remind_at) in {**due, **not_due}.items():
+        seed(tasks_table, task_id, user_id=user_id, remindAt=remind_at,
+             remindBucket=remind_bucket(remind_at, user_id))
+    sent = []
+    monkeypatch.setattr(reminder, "send_telegram_message",
+                        lambda chat_id, text: sent.append(chat_id) or True)
+
+    result = reminder.dispatch_due_reminders()
+
+    assert result == {"sent": len(due), "failed": 0}
+    assert sorted(sent) == list(range(1, 10))
+    flagged = tasks_table.get_item(Key={"userId": 9, "taskId": "now"})["Item"]
+    assert flagged["notified"] is True and "remindBucket" not in flagged
+    waiting = tasks_table.get_item(
+        Key={"userId": 10, "taskId": "later-this-minute"}
+    )["Item"]
+    assert "remindBucket" in waiting
@@ -0,0 +1,52 @@
+import time
+
+from taskbot_core.secret_cache import SecretCache, webapp_secret_key
+
+
+class FakeSecrets:
+    def __init__(self):
+        self.value = "token-1"
+        self.calls = 0
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        return {"SecretString": self.value}
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_secret_and_derived_key_are_cached_until_refresh():
+    now = [0.0]
+    client = FakeSecrets()
+    cache = SecretCache(client=client, ttl=100, clock=lambda: now[0])
+
+    key = cache.derived("bot", webapp_secret_key)
+    for _ in range(5):
+        assert cache.derived("bot", webapp_secret_key) is key
+    assert client.calls == 1
+
+    # Near expiry the old value is served while a background refresh runs
+    client.value = "token-2"
+    now[0] = 85
+    assert cache.get("bot") == "token-1"
+    _wait_for(lambda: cache.get("bot") == "token-2")
+    assert client.calls == 2
+    assert cache.derived("bot", webapp_secret_key) == webapp_secret_key("token-2")
+
+
+def test_expired_secret_falls_back_to_cached_value_on_error():
+    now = [0.0]
+    client = FakeSecrets()
+    cache = SecretCache(client=client, ttl=100, clock=lambda: now[0])
+    assert cache.get("bot") == "token-1"
+
+    def fail(SecretId):
+        raise RuntimeError("secrets manager unavailable")
+    client.get_secret_value = fail
+    now[0] = 500
+
+    assert cache.get("bot") == "token-1"
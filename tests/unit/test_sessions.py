@@ -0,0 +1,29 @@
+from taskbot_core.sessions import SessionCache
+
+
+def test_session_cache_hits_until_auth_date_expires():
+    now = [1_000_000.0]
+    cache = SessionCache(max_size=2, max_age=3600, clock=lambda: now[0])
+    auth_date = int(now[0]) - 10
+
+    assert cache.get("a") is None
+    cache.put("a", 42, auth_date)
+    assert cache.get("a") == 42
+    assert cache.get("a") == 42
+    assert cache.get("a&tampered") is None
+
+    now[0] += 3600
+    assert cache.get("a") is None  # outside the freshness window: evicted
+    assert cache.stats() == {"hits": 2, "misses": 3, "hitRate": 0.4, "size": 0}
+
+
+def test_session_cache_evicts_least_recently_used():
+    cache = SessionCache(max_size=2, clock=lambda: 100.0)
+    cache.put("a", 1, 100)
+    cache.put("b", 2, 100)
+    cache.get("a")
+    cache.put("c", 3, 100)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert not cache.is_fresh(100 - cache.max_age - 1)
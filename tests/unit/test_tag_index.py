@@ -0,0 +1,69 @@
+import calendar
+from datetime import datetime, timedelta
+
+from taskbot_core.activity import activity_writes
+from taskbot_core.stats import get_stats, stats_writes
+from taskbot_core.sync import tombstone_write
+from taskbot_core.tag_index import (
+    tag_counts,
+    tag_index_writes,
+    tagged_task_ids,
+    write_task,
+)
+
+
+def create(tasks_table, task_id, tags, user_id=1):
+    item = {"userId": user_id, "taskId": task_id, "status": "pending", "tags": tags}
+    write_task(tasks_table, {"Put": {"TableName": tasks_table.name, "Item": item}},
+               tag_index_writes(user_id, task_id, tags, 1))
+
+
+def test_tag_index_tracks_create_and_delete(tasks_table, user_index_table):
+    create(tasks_table, "t1", ["work", "home"])
+    create(tasks_table, "t2", ["work"])
+    create(tasks_table, "t3", [])
+
+    assert tag_counts(user_index_table, 1) == {"work": 2, "home": 1}
+    assert sorted(tagged_task_ids(user_index_table, 1, "work")) == ["t1", "t2"]
+
+    tombstone = tombstone_write(tasks_table.name, 1, "t1", "pending")
+    removal = tag_index_writes(1, "t1", ["work", "home"], -1)
+    assert write_task(tasks_table, tombstone, removal)
+    # A second delete from the same stale read changes nothing
+    assert not write_task(tasks_table, tombstone, removal)
+    assert not write_task(tasks_table, tombstone, [])
+
+    assert tag_counts(user_index_table, 1) == {"work": 1}
+    assert list(tagged_task_ids(user_index_table, 1, "work")) == ["t2"]
+    deleted = tasks_table.get_item(Key={"userId": 1, "taskId": "t1"})["Item"]
+    assert deleted["status"] == "deleted"
+    assert tag_counts(user_index_table, 2) == {}
+
+
+def apply(table, writes):
+    table.meta.client.transact_write_items(TransactItems=writes)
+
+
+def test_stats_rollup_adds_and_reverts_completions(user_index_table):
+    now = datetime(2026, 3, 10, 12, 0)
+    apply(user_index_table, stats_writes(1, pending=2))
+    apply(user_index_table, stats_writes(1, pending=-1, completed=1, tags=["work"]))
+
+    stats = get_stats(user_index_table, 1, now=now)
+    assert stats == {"pending": 1, "completed": 1, "week_completed": 0,
+                     "tags": {"work": 1}}
+
+    apply(user_index_table, stats_writes(1, completed=-1, tags=["work"]))
+    assert get_stats(user_index_table, 1, now=now) == {
+        "pending": 1, "completed": 0, "week_completed": 0, "tags": {}
+    }
+
+
+def test_stats_week_comes_from_activity_months(user_index_table):
+    now = datetime(2026, 3, 3, 12, 0)
+    for day in (datetime(2026, 2, 20), datetime(2026, 2, 26), datetime(2026, 3, 2)):
+        apply(user_index_table, activity_writes(1, calendar.timegm(day.timetuple())))
+
+    assert get_stats(user_index_table, 1, now=now)["week_completed"] == 2
+    later = now + timedelta(days=8)
+    assert get_stats(user_index_table, 1, now=later)["week_completed"] == 0
@@ -0,0 +1,161 @@
+import json
+
+from taskbot_core.telegram import (
+    READ_TIMEOUT,
+    TelegramSender,
+    TokenBucket,
+    connection_pool,
+    message_payload,
+    webhook_reply,
+)
+from urllib3.exceptions import NewConnectionError, ReadTimeoutError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status, data):
+        self.status = status
+        self.data = json.dumps(data).encode()
+        self.headers = {}
+
+
+class FakeHttp:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.num_requests = 0
+        self.num_connections = 0
+
+    def request(self, method, url, body=None, headers=None):
+        self.requests.append(json.loads(body))
+        self.num_requests += 1
+        self.num_connections = 1  # One keep-alive connection serves every request
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def make_sender(responses, **kwargs):
+    clock = FakeClock()
+    http = FakeHttp(responses)
+    sender = TelegramSender(
+        lambda: 'token', http=http, clock=clock, sleep=clock.sleep, **kwargs
+    )
+    return sender, http, clock
+
+
+def test_token_bucket_blocks_when_empty():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0.5
+    assert clock.now == 0.5
+
+
+def test_per_chat_limit_spaces_messages_to_same_chat():
+    ok = FakeResponse(200, {'ok': True})
+    sender, _, clock = make_sender([ok, ok, ok])
+
+    assert sender.send_message(1, 'a')
+    assert sender.send_message(2, 'b')
+    assert clock.now == 0
+    assert sender.send_message(1, 'c')
+    assert clock.now == 1.0
+    assert sender.stats() == {'sent': 3, 'failed': 0, 'throttled': 1, 'retried': 0}
+
+
+def test_429_honours_retry_after_then_succeeds():
+    limited = FakeResponse(429, {'ok': False, 'parameters': {'retry_after': 5}})
+    ok = FakeResponse(200, {'ok': True})
+    sender, http, clock = make_sender([limited, ok])
+
+    assert sender.send_message(1, 'hi', parse_mode='HTML')
+    assert clock.now >= 5
+    assert http.requests[0] == {'chat_id': 1, 'text': 'hi', 'parse_mode': 'HTML'}
+    stats = sender.stats()
+    assert stats['sent'] == 1
+    assert stats['retried'] == 1
+    assert stats['throttled'] >= 1
+
+
+def test_client_error_is_not_retried():
+    blocked = FakeResponse(403, {'ok': False, 'description': 'bot was blocked'})
+    sender, http, _ = make_sender([blocked])
+
+    assert not sender.send_message(1, 'hi')
+    assert len(http.requests) == 1
+    assert sender.stats()['failed'] == 1
+
+
+def test_connect_failure_is_retried():
+    refused = NewConnectionError(None, 'connection refused')
+    sender, http, _ = make_sender([refused, FakeResponse(200, {'ok': True})])
+
+    assert sender.send_message(1, 'hi')
+    assert len(http.requests) == 2
+    assert sender.stats()['retried'] == 1
+
+
+def test_read_timeout_is_not_resent():
+    sender, http, _ = make_sender([ReadTimeoutError(None, '/', 'read timed out')])
+
+    assert not sender.send_message(1, 'hi')
+    assert len(http.requests) == 1
+    assert sender.stats()['failed'] == 1
+
+
+def test_webhook_reply_carries_the_method_call():
+    payload = message_payload(42, "hi", parse_mode="HTML")
+    response = webhook_reply("sendMessage", payload)
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {
+        "method": "sendMessage", "chat_id": 42, "text": "hi", "parse_mode": "HTML"
+    }
+
+
+def test_connection_pool_is_pinned_to_the_bot_api_with_timeouts():
+    pool = connection_pool(maxsize=4)
+
+    assert pool.host == "api.telegram.org"
+    assert pool.timeout.read_timeout == READ_TIMEOUT
+    assert pool.retries.read == 0 and pool.retries.connect > 0
+
+
+def test_connection_reuse_is_logged_per_invocation(caplog):
+    ok = FakeResponse(200, {'ok': True})
+    sender, _, _ = make_sender([ok, ok, ok])
+
+    @sender.log_connection_reuse
+    def handler(event, context):
+        for chat_id in event:
+            sender.send_message(chat_id, 'hi')
+        return 'done'
+
+    with caplog.at_level('INFO'):
+        assert handler([1], None) == 'done'
+        assert handler([2, 3], None) == 'done'
+
+    assert sender.connection_stats() == {
+        'requests': 3, 'newConnections': 1, 'reused': 2
+    }
+    logged = [
+        r.getMessage() for r in caplog.records
+        if 'Telegram connections' in r.getMessage()
+    ]
+    assert logged[-1] == (
+        "Telegram connections: {'requests': 2, 'newConnections': 0, 'reused': 2}"
+    )
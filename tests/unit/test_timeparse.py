@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+from taskbot_core.timeparse import parse_smart_time, parse_snooze_delay
+
+NOW = datetime(2026, 10, 16, 12, 30)  # A Friday
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Meeting in 2 hours #work", datetime(2026, 10, 16, 14, 30)),
+    ("через 2 часа позвонить", datetime(2026, 10, 16, 14, 30)),
+    ("через полчаса", datetime(2026, 10, 16, 13, 0)),
+    ("in an hour", datetime(2026, 10, 16, 13, 30)),
+    ("Buy milk Friday 18:00", datetime(2026, 10, 23, 18, 0)),
+    ("в понедельник", datetime(2026, 10, 19, 9, 0)),
+    ("в среду в 10:00", datetime(2026, 10, 21, 10, 0)),
+    ("Call dentist tomorrow 14:00", datetime(2026, 10, 17, 14, 0)),
+    ("завтра в 7 вечера", datetime(2026, 10, 17, 19, 0)),
+    ("в воскресенье вечером", datetime(2026, 10, 18, 20, 0)),
+    ("gym at 7 pm", datetime(2026, 10, 16, 19, 0)),
+    ("9:15", datetime(2026, 10, 17, 9, 15)),  # Already past today
+    ("tonight", datetime(2026, 10, 16, 20, 0)),
+    ("today", datetime(2026, 10, 17, 9, 0)),  # 9:00 already past
+    ("сегодня в 10:00", datetime(2026, 10, 17, 10, 0)),
+])
+def test_parses_english_and_russian_forms(text, expected):
+    assert parse_smart_time(text, NOW) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "water the plants",
+    "buy 2 items #task2",
+    "report within 2h",
+    "check in d block",
+    "25:00",
+])
+def test_messages_without_a_time(text):
+    assert parse_smart_time(text, NOW) is None
+
+
+@pytest.mark.parametrize("delay, hours", [
+    ("1h", 1), ("30m", 0.5), ("30min", 0.5), ("2 дня", 48),
+    ("week", 168), ("tomorrow", 24), ("через 3 часа", 3), ("in 2 hours", 2),
+    ("soon", 1),
+])
+def test_snooze_delay(delay, hours):
+    assert parse_snooze_delay(delay, NOW) - NOW.timestamp() == hours * 3600
+
+
+def test_evening_word_rolls_to_tomorrow_once_past():
+    late = datetime(2026, 10, 16, 21, 0)
+
+    assert parse_smart_time("вечером", late) == datetime(2026, 10, 17, 20, 0)
@@ -0,0 +1,186 @@
+import importlib.util
+import json
+import os
+
+import boto3
+import pytest
+
+APP_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '../../lambda/webhook_handler/app.py'
+))
+
+
+@pytest.fixture
+def webhook(monkeypatch, user_index_table, metrics_table):
+    for name, value in {
+        "TASKS_TABLE_NAME": "telegram-bot-tasks",
+        "USERS_TABLE_NAME": "telegram-bot-user-settings",
+        "MOTIVATION_TABLE_NAME": "telegram-bot-motivational-messages",
+        "BOT_TOKEN_SECRET": "telegram-bot-token",
+        "REMINDER_LAMBDA_ARN": "arn:aws:lambda:us-east-1:000000000000:function:r",
+        "TELEGRAM_PREWARM": "false",
+    }.items():
+        monkeypatch.setenv(name, value)
+    # Loaded under its own name: the mini-app tests already import an `app`
+    spec = importlib.util.spec_from_file_location("webhook_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_snooze_passes_a_multi_word_delay(webhook, monkeypatch):
+    calls = []
+    monkeypatch.setattr(webhook, "handle_snooze",
+                        lambda user_id, task_ref, delay: calls.append(delay) or "ok")
+
+    webhook.process_update(1, "/snooze abc123 через 3 часа")
+    webhook.process_update(1, "/snooze abc123 2 дня")
+
+    assert calls == ["через 3 часа", "2 дня"]
+
+
+def webhook_event(text, update_id=1, user_id=1):
+    return {"body": json.dumps({
+        "update_id": update_id,
+        "message": {"from": {"id": user_id}, "text": text},
+    })}
+
+
+def test_only_fixed_text_replies_go_inline(webhook, processed_updates_table,
+                                           monkeypatch):
+    sent = []
+    monkeypatch.setattr(webhook, "process_update",
+                        lambda user_id, text: webhook.reply_payload(user_id, text))
+    monkeypatch.setattr(webhook, "send_telegram_message",
+                        lambda payload: sent.append(payload["text"]) or True)
+
+    inline = webhook.lambda_handler(webhook_event("/help", update_id=1), None)
+    tasks = webhook.lambda_handler(webhook_event("/tasks", update_id=2), None)
+    created = webhook.lambda_handler(webhook_event("<b>buy</b> it", update_id=3), None)
+
+    assert json.loads(inline["body"])["method"] == "sendMessage"
+    assert json.loads(tasks["body"]) == {"ok": True}
+    assert json.loads(created["body"]) == {"ok": True}
+    assert sent == ["/tasks", "<b>buy</b> it"]
+
+
+def test_enqueue_update_keeps_each_chat_in_one_group(webhook, monkeypatch):
+    sqs = boto3.client("sqs", region_name="us-east-1")
+    queue_url = sqs.create_queue(
+        QueueName="updates.fifo", Attributes={"FifoQueue": "true"}
+    )["QueueUrl"]
+    monkeypatch.setattr(webhook, "UPDATE_QUEUE_URL", queue_url)
+
+    webhook.enqueue_update({"update_id": 7, "message": {"text": "first"}}, 42)
+    webhook.enqueue_update({"update_id": 8, "message": {"text": "second"}}, 42)
+    webhook.enqueue_update({"update_id": 7, "message": {"text": "first"}}, 42)
+
+    messages = sqs.receive_message(
+        QueueUrl=queue_url, MaxNumberOfMessages=10,
+        MessageSystemAttributeNames=["MessageGroupId"]
+    )["Messages"]
+    assert [json.loads(m["Body"])["message"]["text"] for m in messages] == [
+        "first", "second"
+    ]
+    assert {m["Attributes"]["MessageGroupId"] for m in messages} == {"42"}
+
+
+def update_record(message_id, user_id, text):
+    return {
+        "messageId": message_id,
+        "attributes": {"MessageGroupId": str(user_id)},
+        "body": json.dumps({"message": {"from": {"id": user_id}, "text": text}}),
+    }
+
+
+def test_update_batch_retries_a_failed_chat_from_its_failure(webhook, monkeypatch):
+    handled = []
+    monkeypatch.setattr(webhook, "process_update",
+                        lambda user_id, text: handled.append(text) or {"text": text})
+    monkeypatch.setattr(webhook, "send_telegram_message",
+                        lambda payload: payload["text"] != "a2")
+    records = [
+        update_record("m1", 1, "a1"),
+        update_record("m2", 1, "a2"),
+        update_record("m3", 2, "b1"),
+        update_record("m4", 1, "a3"),
+        update_record("m5", 2, "b2"),
+    ]
+
+    result = webhook.handle_update_batch(records)
+
+    assert result == {"batchItemFailures": [
+        {"itemIdentifier": "m2"}, {"itemIdentifier": "m4"}
+    ]}
+    assert handled == ["a1", "a2", "b1", "b2"]
+
+
+def add_tasks(tasks_table, *task_ids, status="pending", user_id=1):
+    for task_id in task_ids:
+        tasks_table.put_item(Item={"userId": user_id, "taskId": task_id,
+                                   "text": f"Task {task_id}", "status": status})
+
+
+def test_resolve_task_finds_a_unique_prefix(webhook, tasks_table):
+    add_tasks(tasks_table, "aaaa1111-x", "bbbb2222-y")
+    add_tasks(tasks_table, "aaaa1111-x", user_id=2)
+
+    task, reply = webhook.resolve_task(1, " AAAA11 ")
+
+    assert (task["taskId"], task["userId"], reply) == ("aaaa1111-x", 1, None)
+
+
+def test_resolve_task_lists_an_ambiguous_prefix(webhook, tasks_table):
+    add_tasks(tasks_table, "abcd1234aa", "abcd1234bb", "abcd9999cc", "ffff0000dd")
+
+    task, reply = webhook.resolve_task(1, "abcd")
+
+    assert task is None
+    # Each candidate is shortened only as far as it tells them apart
+    assert "**abcd1234a** Task abcd1234aa" in reply
+    assert "**abcd1234b** Task abcd1234bb" in reply
+    assert "**abcd9999** Task abcd9999cc" in reply
+    assert "ffff" not in reply
+
+
+def test_resolve_task_prefers_an_exact_full_id(webhook, tasks_table):
+    add_tasks(tasks_table, "abcd1234", "abcd1234-longer")
+
+    task, reply = webhook.resolve_task(1, "abcd1234")
+
+    assert (task["taskId"], reply) == ("abcd1234", None)
+
+
+def test_resolve_task_ignores_deleted_tombstones(webhook, tasks_table):
+    add_tasks(tasks_table, "dead0000-1", status="deleted")
+    add_tasks(tasks_table, "abcd0000-1", "abcd0000-2")
+    add_tasks(tasks_table, "abcd0000-3", status="deleted")
+
+    assert webhook.resolve_task(1, "dead") == (None, "⚠️ Task not found")
+    task, reply = webhook.resolve_task(1, "abcd0000-1")
+    assert task["taskId"] == "abcd0000-1"
+    _, reply = webhook.resolve_task(1, "abcd")
+    assert "abcd0000-3" not in reply
+
+
+def test_short_id_grows_only_while_ids_collide(webhook):
+    ids = ["abcdef12-1", "abcdef99-2", "12345678-3"]
+
+    assert webhook.short_id("12345678-3", ids) == "12345678"
+    assert webhook.short_id("abcdef12-1", ids) == "abcdef12"
+    assert webhook.short_id("abcdef12-1", ["abcdef12-1", "abcdef12-2"]) == "abcdef12-1"
+
+
+def test_snooze_buckets_only_pending_tasks(webhook, tasks_table, monkeypatch):
+    monkeypatch.setenv("REMINDER_DISPATCH_MODE", "bucket")
+    add_tasks(tasks_table, "pend0000-1")
+    add_tasks(tasks_table, "done0000-1", status="done")
+
+    webhook.handle_snooze(1, "pend0000", "2h")
+    webhook.handle_snooze(1, "done0000", "2h")
+
+    pending = tasks_table.get_item(Key={"userId": 1, "taskId": "pend0000-1"})["Item"]
+    done = tasks_table.get_item(Key={"userId": 1, "taskId": "done0000-1"})["Item"]
+    assert pending["remindBucket"] and pending["notified"] is False
+    assert "remindBucket" not in done and "notified" not in done
+    assert "remindAt" in done  # Still snoozed, just not bucketed